@@ -0,0 +1,70 @@
+"""
+Measure recall@k and latency of the ANN index against exact search.
+
+Query vectors are stored chunk embeddings with a little noise. Ground truth is the exact
+float32 ordering with index scans disabled (a sequential scan). Each knob value is then
+run through idx_embedding, including the re-rank stage when VECTOR_INDEX_QUANTIZATION is
+set: hnsw.ef_search for HNSW, ivfflat.probes for ivfflat.
+Run it against a populated database:
+    python -m backend.benchmarks.ann_recall --queries 100 --k 5 --values 10 20 40 80 160
+"""
+import argparse
+import time
+
+import numpy as np
+from sqlalchemy import func, select, text
+
+from backend.config import config
+from backend.database.db_models import create_db_and_table, embedding_distance, nearest_chunks, PdfEmbedding
+
+
+def exact_top_k_ids(session, embedding, k):
+    session.execute(text("SET LOCAL enable_indexscan = off"))
+    statement = select(PdfEmbedding.id).order_by(embedding_distance(embedding)).limit(k)
+    ids = [row.id for row in session.execute(statement)]
+    session.rollback()
+    return set(ids)
+
+
+def top_k_ids(session, embedding, k):
+    return [row.id for row in session.execute(nearest_chunks(embedding, [PdfEmbedding.id], limit=k))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--values", type=int, nargs="+", default=[10, 20, 40, 80, 160])
+    parser.add_argument("--noise", type=float, default=0.01)
+    args = parser.parse_args()
+
+    knob = "hnsw.ef_search" if config.VECTOR_INDEX_TYPE == "hnsw" else "ivfflat.probes"
+    rng = np.random.default_rng(0)
+    session = create_db_and_table()
+    try:
+        samples = session.execute(
+            select(PdfEmbedding.embedding).order_by(func.random()).limit(args.queries)
+        ).scalars().all()
+        queries = [np.asarray(sample) + rng.normal(0, args.noise, len(sample)) for sample in samples]
+
+        exact = [exact_top_k_ids(session, query, args.k) for query in queries]
+
+        print(f"{config.VECTOR_INDEX_TYPE} index, {config.VECTOR_DISTANCE_METRIC} distance, "
+              f"{len(queries)} queries, recall@{args.k}")
+        for value in args.values:
+            recalls, latencies = [], []
+            for query, truth in zip(queries, exact):
+                session.execute(select(func.set_config(knob, str(value), True)))
+                start = time.perf_counter()
+                found = top_k_ids(session, query, args.k)
+                latencies.append(time.perf_counter() - start)
+                session.rollback()
+                recalls.append(len(truth.intersection(found)) / max(len(truth), 1))
+            print(f"{knob} {value:4d}: recall {np.mean(recalls):.4f}  "
+                  f"p50 {np.percentile(latencies, 50) * 1000:7.2f} ms  p95 {np.percentile(latencies, 95) * 1000:7.2f} ms")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Compare concurrent similarity searches through the synchronous (threadpool) and asyncio data paths.
+
+Both paths run the same filename-scoped search against the configured database with a
+random query vector, so only the data access differs. Run it against a populated database:
+    python -m backend.benchmarks.async_search_concurrency --filename contract.pdf --concurrency 1 8 32 64
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+
+from backend.database.db_async import create_async_session, dispose_async_engine
+from backend.database.db_models import create_db_and_table, nearest_chunks, PdfEmbedding
+from backend.services.vectorStoreService import search_chunks
+
+
+def sync_search(embedding, filename):
+    session = create_db_and_table()
+    try:
+        return session.execute(nearest_chunks(
+            embedding, [PdfEmbedding.chunk_text], PdfEmbedding.filename == filename
+        )).all()
+    finally:
+        session.close()
+
+
+async def async_search(embedding, filename):
+    async with create_async_session() as session:
+        return await search_chunks(session, embedding, filename=filename)
+
+
+async def run(requests, concurrency, search):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(embedding):
+        async with semaphore:
+            start = time.perf_counter()
+            await search(embedding)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(embedding) for embedding in requests))
+    elapsed = time.perf_counter() - start
+    return len(requests) / elapsed, np.percentile(latencies, 50) * 1000, np.percentile(latencies, 95) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filename", required=True)
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    requests = [rng.standard_normal(1024).astype(np.float32).tolist() for _ in range(args.requests)]
+
+    paths = {
+        "sync + threadpool": lambda embedding: run_in_threadpool(sync_search, embedding, args.filename),
+        "asyncio": lambda embedding: async_search(embedding, args.filename),
+    }
+    for concurrency in args.concurrency:
+        for name, search in paths.items():
+            qps, p50, p95 = await run(requests, concurrency, search)
+            print(f"concurrency {concurrency:3d} {name:18s}: {qps:8.1f} searches/s  p50 {p50:7.2f} ms  p95 {p95:7.2f} ms")
+
+    await dispose_async_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
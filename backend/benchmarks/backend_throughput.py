@@ -0,0 +1,63 @@
+"""
+Compare embedding throughput and fp32 agreement of the EMBEDDING_BACKEND options.
+
+Every backend embeds the same synthetic chunks in padded batches; agreement is the cosine
+similarity of each vector with the fp32 PyTorch one. The ONNX backend needs onnx and
+onnxruntime installed and exports the model to --onnx-path on first run.
+Usage (from the project root):
+    python -m backend.benchmarks.backend_throughput --chunks 128 --batch-size 32
+"""
+import argparse
+import time
+
+import torch
+from transformers import AutoModel, AutoTokenizer
+
+from backend.benchmarks.embedding_throughput import synthetic_chunks
+from backend.config import config
+from backend.pretrainedModels.bge3_embedding import MODEL_NAME
+from backend.pretrainedModels.inferenceBackends import BACKENDS, build_model
+from backend.services.queryService import mean_pool
+
+
+def embed_all(model, tokenizer, chunks, batch_size):
+    embeddings = []
+    with torch.no_grad():
+        for start in range(0, len(chunks), batch_size):
+            inputs = tokenizer(chunks[start:start + batch_size], padding=True, truncation=True, return_tensors="pt")
+            outputs = model(**inputs.to(model.device))
+            embeddings.append(mean_pool(outputs.last_hidden_state.float(), inputs["attention_mask"]).cpu())
+    return torch.cat(embeddings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=128)
+    parser.add_argument("--batch-size", type=int, default=config.EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--onnx-path", default=config.ONNX_MODEL_PATH)
+    args = parser.parse_args()
+
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    chunks = synthetic_chunks(args.chunks)
+    baseline = None
+    print(f"{args.chunks} chunks, batch size {args.batch_size}, {torch.get_num_threads()} threads")
+    for backend in ["pytorch"] + [name for name in args.backends if name != "pytorch"]:
+        model = build_model(lambda: AutoModel.from_pretrained(MODEL_NAME), tokenizer,
+                            backend=backend, onnx_path=args.onnx_path)
+        embed_all(model, tokenizer, chunks[:args.batch_size], args.batch_size)  # warm up
+
+        start = time.perf_counter()
+        embeddings = embed_all(model, tokenizer, chunks, args.batch_size)
+        elapsed = time.perf_counter() - start
+
+        if baseline is None:
+            baseline = embeddings
+        cosine = torch.nn.functional.cosine_similarity(embeddings, baseline, dim=1)
+        print(f"{backend:13s}: {args.chunks / elapsed:8.1f} chunks/s  "
+              f"cosine to fp32 min {cosine.min().item():.5f} mean {cosine.mean().item():.5f}")
+        del model
+
+
+if __name__ == "__main__":
+    main()
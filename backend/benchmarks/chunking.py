@@ -0,0 +1,67 @@
+"""
+Compare the previous 100-word per-page chunker with chunk_pages on a PDF.
+
+Reports the chunk count, how many chunks the model truncates, and the padded tokens the
+embedding stage processes when chunks are length-sorted into batches of --batch-size.
+Usage (from the project root):
+    python -m backend.benchmarks.chunking --pdf sample.pdf --target-tokens 256 --overlap-tokens 32
+"""
+import argparse
+import time
+
+import fitz
+from transformers import AutoTokenizer
+
+from backend.config import config
+from backend.pretrainedModels.bge3_embedding import MODEL_NAME
+from backend.services.chunkingService import chunk_pages
+
+
+def word_chunks(pages, chunk_size=100):
+    """The previous chunker: fixed word windows restarted on every page."""
+    chunks = []
+    for page in pages:
+        words = page.split()
+        chunks.extend(" ".join(words[i:i + chunk_size]) for i in range(0, len(words), chunk_size))
+    return chunks
+
+
+def padded_tokens(lengths, batch_size):
+    lengths = sorted(lengths)
+    return sum(max(lengths[start:start + batch_size]) * len(lengths[start:start + batch_size])
+               for start in range(0, len(lengths), batch_size))
+
+
+def report(name, lengths, elapsed, batch_size, max_length):
+    truncated = sum(length > max_length for length in lengths)
+    lengths = [min(length, max_length) for length in lengths]
+    print(f"{name:24s}: {len(lengths):6d} chunks, {truncated:4d} truncated, "
+          f"{sum(lengths):9d} tokens, {padded_tokens(lengths, batch_size):9d} padded, {elapsed * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", required=True)
+    parser.add_argument("--target-tokens", type=int, default=config.CHUNK_TARGET_TOKENS)
+    parser.add_argument("--overlap-tokens", type=int, default=config.CHUNK_OVERLAP_TOKENS)
+    parser.add_argument("--batch-size", type=int, default=config.EMBEDDING_BATCH_SIZE)
+    args = parser.parse_args()
+
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    with fitz.open(args.pdf) as doc:
+        pages = [page.get_text() for page in doc]
+
+    start = time.perf_counter()
+    chunks = word_chunks(pages)
+    lengths = [len(ids) for ids in tokenizer(chunks)["input_ids"]]
+    report("100 words per page", lengths, time.perf_counter() - start, args.batch_size, tokenizer.model_max_length)
+
+    start = time.perf_counter()
+    chunks = chunk_pages(pages, tokenizer, args.target_tokens, args.overlap_tokens)
+    lengths = [len(chunk.input_ids) for chunk in chunks]
+    report(f"chunk_pages {args.target_tokens}/{args.overlap_tokens}", lengths, time.perf_counter() - start,
+           args.batch_size, tokenizer.model_max_length)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Compare per-chunk and batched embedding throughput.
+
+Usage (from the project root):
+    python -m backend.benchmarks.embedding_throughput --chunks 256 --batch-sizes 8 16 32 64
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from backend.services.embeddingCacheService import embedding_cache
+from backend.services.queryService import generate_embedding, generate_embeddings
+
+
+def synthetic_chunks(count, seed=0):
+    """Build 100-word chunks plus shorter page-tail chunks, like process_pdf_chunks produces."""
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(5000)]
+    chunks = []
+    for i in range(count):
+        length = 100 if i % 4 else rng.randint(5, 99)
+        chunks.append(" ".join(rng.choice(vocabulary) for _ in range(length)))
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=256)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 16, 32, 64])
+    args = parser.parse_args()
+
+    chunks = synthetic_chunks(args.chunks)
+
+    # Measure forward passes only: every run must miss the embedding cache
+    embedding_cache.max_entries = 0
+    embedding_cache.use_db = False
+
+    # Warm up so model loading is not part of either measurement
+    generate_embeddings(chunks[:2])
+
+    start = time.perf_counter()
+    baseline = np.asarray([generate_embedding(chunk) for chunk in chunks], dtype=np.float32)
+    elapsed = time.perf_counter() - start
+    print(f"per-chunk          : {len(chunks) / elapsed:8.1f} chunks/s ({elapsed:.2f}s)")
+
+    for batch_size in args.batch_sizes:
+        start = time.perf_counter()
+        batched = generate_embeddings(chunks, batch_size=batch_size)
+        batch_elapsed = time.perf_counter() - start
+
+        cosine = np.sum(baseline * batched, axis=1) / (
+            np.linalg.norm(baseline, axis=1) * np.linalg.norm(batched, axis=1))
+        print(f"batched (size {batch_size:3d}): {len(chunks) / batch_elapsed:8.1f} chunks/s "
+              f"({batch_elapsed:.2f}s, x{elapsed / batch_elapsed:.1f}, min cosine vs per-chunk {cosine.min():.5f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Compare chunk write paths in rows/s: row inserts as before, and binary COPY per flush size.
+
+Rows are written to a scratch copy of tb_embeddings with random float32 vectors, so
+only the database write is measured. Run it against the configured database:
+    python -m backend.benchmarks.ingest_throughput --rows 5000 --flush-rows 64 256 1024
+"""
+import argparse
+import time
+
+import numpy as np
+from sqlalchemy import Integer, String, column, insert, table, text
+from pgvector.sqlalchemy import Vector
+
+from backend.database.db_copy import copy_chunk_rows
+from backend.database.db_models import create_db_and_table
+from backend.services.chunkingService import Chunk
+
+SCRATCH_TABLE = "tb_embeddings_ingest_benchmark"
+
+scratch_rows = table(
+    SCRATCH_TABLE,
+    column("pdf_id", Integer),
+    column("filename", String),
+    column("chunk_index", Integer),
+    column("chunk_text", String),
+    column("embedding", Vector(1024)),
+)
+
+
+def insert_rows(session, texts, embeddings, commit_every):
+    """The previous write path: list vectors bound as text, a commit every ``commit_every`` rows."""
+    rows = []
+    for idx, chunk in enumerate(texts):
+        rows.append({"pdf_id": 1, "filename": "benchmark.pdf", "chunk_index": idx,
+                     "chunk_text": chunk, "embedding": embeddings[idx].tolist()})
+        if len(rows) == commit_every or idx == len(texts) - 1:
+            session.execute(insert(scratch_rows), rows)
+            session.commit()
+            rows.clear()
+
+
+def copy_rows(session, chunks, embeddings, flush_rows):
+    copy_chunk_rows(session, SCRATCH_TABLE, 1, "benchmark.pdf", chunks, embeddings, flush_rows=flush_rows)
+    session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--flush-rows", type=int, nargs="+", default=[64, 256, 1024])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((args.rows, 1024)).astype(np.float32)
+    texts = [" ".join(f"term{j}" for j in rng.integers(0, 5000, 100)) for _ in range(args.rows)]
+    chunks = [Chunk(chunk_text, [], 1, 1) for chunk_text in texts]
+
+    paths = {"insert, commit per 10 rows": lambda session: insert_rows(session, texts, embeddings, 10)}
+    for flush_rows in args.flush_rows:
+        paths[f"binary COPY, flush {flush_rows}"] = (
+            lambda session, flush_rows=flush_rows: copy_rows(session, chunks, embeddings, flush_rows)
+        )
+
+    session = create_db_and_table()
+    session.execute(text(f"CREATE UNLOGGED TABLE IF NOT EXISTS {SCRATCH_TABLE} (LIKE tb_embeddings INCLUDING DEFAULTS)"))
+    session.commit()
+    try:
+        for name, write in paths.items():
+            session.execute(text(f"TRUNCATE {SCRATCH_TABLE}"))
+            session.commit()
+            start = time.perf_counter()
+            write(session)
+            elapsed = time.perf_counter() - start
+            print(f"{name:28s}: {args.rows / elapsed:10.1f} rows/s ({elapsed:.2f} s)")
+    finally:
+        session.rollback()
+        session.execute(text(f"DROP TABLE IF EXISTS {SCRATCH_TABLE}"))
+        session.commit()
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Compare filename-scoped search latency through Postgres (nearest_chunks) with the local vector cache.
+
+Queries are stored embeddings of the document plus noise. The local cache exports the
+document to a temporary directory on its first search; the export time is reported
+separately. Agreement is the share of the Postgres top-k also returned locally (the
+local search is exact, the database search goes through idx_embedding):
+    python -m backend.benchmarks.local_vector_cache --filename contract.pdf --queries 200 --k 5
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import func, select
+
+from backend.database.db_models import create_db_and_table, nearest_chunks, PdfEmbedding
+from backend.services.localVectorCacheService import LocalVectorCache
+
+
+def database_search(session, query, filename, k):
+    rows = session.execute(
+        nearest_chunks(query, [PdfEmbedding.chunk_text], PdfEmbedding.filename == filename, limit=k)
+    ).all()
+    return [row.chunk_text for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filename", required=True)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--noise", type=float, default=0.01)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    session = create_db_and_table()
+    try:
+        samples = session.execute(
+            select(PdfEmbedding.embedding).where(PdfEmbedding.filename == args.filename)
+            .order_by(func.random()).limit(args.queries)
+        ).scalars().all()
+        session.rollback()
+        queries = [np.asarray(sample) + rng.normal(0, args.noise, len(sample)) for sample in samples]
+
+        latencies, expected = [], []
+        for query in queries:
+            start = time.perf_counter()
+            expected.append(database_search(session, query, args.filename, args.k))
+            latencies.append(time.perf_counter() - start)
+    finally:
+        session.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = LocalVectorCache(directory=directory, min_lookups=1, enabled=True)
+        start = time.perf_counter()
+        cache.search(args.filename, queries[0], limit=args.k)
+        export_ms = (time.perf_counter() - start) * 1000
+
+        local_latencies, agreement = [], []
+        for query, truth in zip(queries, expected):
+            start = time.perf_counter()
+            found = cache.search(args.filename, query, limit=args.k)
+            local_latencies.append(time.perf_counter() - start)
+            agreement.append(len(set(truth).intersection(found)) / max(len(truth), 1))
+        stats = cache.stats()
+
+    print(f"{args.filename}: {len(queries)} queries, top {args.k}, "
+          f"{stats['bytes'] / (1024 * 1024):.1f} MB mapped, export {export_ms:.1f} ms")
+    for name, values in (("postgres", latencies), ("local", local_latencies)):
+        print(f"{name:8s}: p50 {np.percentile(values, 50) * 1000:7.3f} ms  "
+              f"p95 {np.percentile(values, 95) * 1000:7.3f} ms")
+    print(f"agreement with postgres top {args.k}: {np.mean(agreement):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Compare in-process page text extraction with the process-pool PageExtractor.
+
+Builds a synthetic PDF of --pages text-dense pages (or uses --pdf) and times extracting
+every page serially and with each worker count. The pool is started before timing, as
+it is in the running API after the first large document.
+Usage (from the project root):
+    python -m backend.benchmarks.pdf_extraction --pages 500 --workers 2 4 8
+"""
+import argparse
+import time
+
+import fitz
+import numpy as np
+
+from backend.services.pdfExtractionService import PageExtractor
+
+
+def synthetic_pdf(pages, lines_per_page=60):
+    rng = np.random.default_rng(0)
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        body = "\n".join(" ".join(f"term{j}" for j in rng.integers(0, 5000, 12)) for _ in range(lines_per_page))
+        page.insert_textbox(page.rect + (36, 36, -36, -36), body, fontsize=7)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def timed(extractor, source):
+    start = time.perf_counter()
+    pages = list(extractor.iter_pages(source))
+    return pages, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--pdf", help="Benchmark this PDF instead of a synthetic one")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    args = parser.parse_args()
+
+    source = args.pdf or synthetic_pdf(args.pages)
+    baseline, serial_seconds = timed(PageExtractor(max_workers=1), source)
+    print(f"{'in-process':14s}: {len(baseline) / serial_seconds:8.1f} pages/s ({serial_seconds:.2f} s)")
+
+    for workers in args.workers:
+        extractor = PageExtractor(max_workers=workers, min_pages=1)
+        try:
+            timed(extractor, source)  # starts the worker processes
+            pages, elapsed = timed(extractor, source)
+        finally:
+            extractor.shutdown()
+        assert pages == baseline
+        print(f"{workers:2d} workers    : {len(pages) / elapsed:8.1f} pages/s ({elapsed:.2f} s, "
+              f"{serial_seconds / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
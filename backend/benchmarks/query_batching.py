@@ -0,0 +1,58 @@
+"""
+Compare query embedding latency/throughput with and without cross-request micro-batching.
+
+Usage (from the project root):
+    python -m backend.benchmarks.query_batching --requests 256 --concurrency 1 8 32
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.services.embeddingCacheService import embedding_cache
+from backend.services.queryService import generate_embedding, query_embedding_batcher
+
+
+def run(questions, concurrency):
+    latencies = []
+
+    def ask(question):
+        start = time.perf_counter()
+        generate_embedding(question)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(ask, questions))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return len(questions) / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--max-batch-size", type=int, default=query_embedding_batcher.max_batch_size)
+    parser.add_argument("--max-wait-ms", type=int, default=query_embedding_batcher.max_wait_ms)
+    args = parser.parse_args()
+
+    # Every question must reach the model
+    embedding_cache.max_entries = 0
+    embedding_cache.use_db = False
+    generate_embedding("warm up")
+
+    settings = {"unbatched": (1, 0), "micro-batched": (args.max_batch_size, args.max_wait_ms)}
+    for concurrency in args.concurrency:
+        for label, (max_batch_size, max_wait_ms) in settings.items():
+            query_embedding_batcher.max_batch_size = max_batch_size
+            query_embedding_batcher.max_wait_ms = max_wait_ms
+            questions = [f"question {concurrency} {label} {i} about the termination clause" for i in range(args.requests)]
+            throughput, p50, p95 = run(questions, concurrency)
+            print(f"concurrency {concurrency:3d} {label:13s}: {throughput:8.1f} q/s, "
+                  f"p50 {p50 * 1000:7.1f} ms, p95 {p95 * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
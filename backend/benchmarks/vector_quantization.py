@@ -0,0 +1,83 @@
+"""
+Report index size, recall@k and latency for each VECTOR_INDEX_QUANTIZATION mode.
+
+For every mode idx_embedding is rebuilt (ensure_vector_index(force=True)), its size is
+summed over the document partitions, and searches through nearest_chunks (candidate fetch
+plus exact re-ranking for quantized modes) are compared with an exact float32 scan. The
+index of the configured mode is rebuilt at the end. Rebuilding blocks writes to
+tb_embeddings, so run it against a test database:
+    python -m backend.benchmarks.vector_quantization --queries 100 --k 5 --candidates 40 100 200
+"""
+import argparse
+import time
+
+import numpy as np
+from sqlalchemy import func, select, text
+
+from backend.benchmarks.ann_recall import exact_top_k_ids, top_k_ids
+from backend.config import config
+from backend.database.db_models import create_db_and_table, ensure_vector_index, search_depth, PdfEmbedding
+
+
+def index_megabytes(session):
+    """Size of idx_embedding over all partitions."""
+    size = session.execute(text(
+        "SELECT coalesce(sum(pg_relation_size(relid)), 0) FROM pg_partition_tree('idx_embedding')"
+    )).scalar()
+    return size / (1024 * 1024)
+
+
+def measure(session, queries, exact, k):
+    recalls, latencies = [], []
+    for query, truth in zip(queries, exact):
+        session.execute(select(func.set_config("hnsw.ef_search", str(max(config.HNSW_EF_SEARCH, search_depth(k))), True)))
+        start = time.perf_counter()
+        found = top_k_ids(session, query, k)
+        latencies.append(time.perf_counter() - start)
+        session.rollback()
+        recalls.append(len(truth.intersection(found)) / max(len(truth), 1))
+    return np.mean(recalls), np.percentile(latencies, 50) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--modes", nargs="+", default=["none", "halfvec", "binary"])
+    parser.add_argument("--candidates", type=int, nargs="+", default=[config.VECTOR_RERANK_CANDIDATES])
+    parser.add_argument("--noise", type=float, default=0.01)
+    args = parser.parse_args()
+
+    configured = config.VECTOR_INDEX_QUANTIZATION, config.VECTOR_RERANK_CANDIDATES
+    rng = np.random.default_rng(0)
+    session = create_db_and_table()
+    try:
+        samples = session.execute(
+            select(PdfEmbedding.embedding).order_by(func.random()).limit(args.queries)
+        ).scalars().all()
+        queries = [np.asarray(sample) + rng.normal(0, args.noise, len(sample)) for sample in samples]
+        exact = [exact_top_k_ids(session, query, args.k) for query in queries]
+        table_megabytes = session.execute(text(
+            "SELECT coalesce(sum(pg_table_size(relid)), 0) FROM pg_partition_tree('tb_embeddings')"
+        )).scalar() / (1024 * 1024)
+
+        print(f"{config.VECTOR_INDEX_TYPE} index, {config.VECTOR_DISTANCE_METRIC} distance, "
+              f"{len(queries)} queries, recall@{args.k}, table {table_megabytes:.1f} MB")
+        for mode in args.modes:
+            config.VECTOR_INDEX_QUANTIZATION = mode
+            ensure_vector_index(force=True)
+            megabytes = index_megabytes(session)
+            session.rollback()
+            for candidates in (args.candidates if mode != "none" else [args.k]):
+                config.VECTOR_RERANK_CANDIDATES = candidates
+                recall, p50 = measure(session, queries, exact, args.k)
+                print(f"{mode:8s} candidates {candidates:4d}: index {megabytes:9.1f} MB  "
+                      f"recall {recall:.4f}  p50 {p50:7.2f} ms")
+    finally:
+        config.VECTOR_INDEX_QUANTIZATION, config.VECTOR_RERANK_CANDIDATES = configured
+        session.close()
+        ensure_vector_index(force=True)
+
+
+if __name__ == "__main__":
+    main()
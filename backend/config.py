@@ -1,6 +1,6 @@
 import os
 from functools import lru_cache
-from typing import Optional
+from typing import Literal, Optional
 import logging
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -22,11 +22,78 @@ class GlobalConfig(BaseConfig):
     MINIO_ENDPOINT: Optional[str] = None
     DB_FORCE_ROLLBACK: bool = False
     RAPID_API_KEY: Optional[str] = None
+    EMBEDDING_BATCH_SIZE: int = 32
+    CHUNK_TARGET_TOKENS: int = 256
+    CHUNK_OVERLAP_TOKENS: int = 32
+    EMBEDDING_BACKEND: Literal["pytorch", "pytorch_int8", "pytorch_bf16", "onnx"] = "pytorch"
+    ONNX_MODEL_PATH: str = "models/bge-m3/model.onnx"
+    ONNX_INTRA_OP_THREADS: Optional[int] = None
+    MODEL_IDLE_TIMEOUT_SECONDS: int = 900
+    MODEL_MEMORY_WATERMARK_MB: Optional[int] = None
+    MODEL_REAPER_INTERVAL_SECONDS: int = 30
+    MODEL_RELOAD_AFTER_EVICTION: bool = True
+    MODEL_WARM_UP_ON_STARTUP: bool = True
+    EMBEDDING_CACHE_SIZE: int = 10000
+    EMBEDDING_CACHE_DB_ENABLED: bool = True
+    EMBEDDING_CACHE_DB_TTL_SECONDS: int = 30 * 24 * 3600
+    EMBEDDING_CACHE_DB_MAX_ROWS: int = 100000
+    EMBEDDING_CACHE_DB_PRUNE_INTERVAL_SECONDS: int = 3600
+    QUERY_CACHE_SIZE: int = 1024
+    QUERY_CACHE_TTL_SECONDS: int = 300
+    LOCAL_VECTOR_CACHE_ENABLED: bool = False
+    LOCAL_VECTOR_CACHE_DIR: str = "/tmp/pdf_vector_cache"
+    LOCAL_VECTOR_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    LOCAL_VECTOR_CACHE_MIN_LOOKUPS: int = 3
+    LOCAL_VECTOR_CACHE_REVALIDATE_SECONDS: int = 30
+    INGESTION_WORKERS: int = 2
+    INGESTION_MAX_PENDING_JOBS: int = 32
+    INGESTION_JOB_RETENTION: int = 1000
+    INGESTION_RETRY_AFTER_SECONDS: int = 30
+    INGESTION_COPY_FLUSH_ROWS: int = 256
+    INGESTION_PIPELINE_BATCH_CHUNKS: int = 128
+    INGESTION_PIPELINE_QUEUE_DEPTH: int = 4
+    INGESTION_INCREMENTAL_UPDATES: bool = True
+    INFERENCE_INTERACTIVE_QUEUE_DEPTH: int = 64
+    INFERENCE_INGESTION_QUEUE_DEPTH: int = 4
+    QUERY_BATCH_MAX_SIZE: int = 16
+    QUERY_BATCH_MAX_WAIT_MS: int = 2
+    MAX_QUESTIONS_PER_REQUEST: int = 64
+    SEARCH_MAX_TOP_K: int = 100
+    MAX_PDF_DOWNLOAD_BYTES: int = 200 * 1024 * 1024
+    PDF_IN_MEMORY_MAX_BYTES: int = 16 * 1024 * 1024
+    PDF_EXTRACTION_WORKERS: Optional[int] = None
+    PDF_EXTRACTION_MIN_PAGES: int = 64
+    PDF_DOWNLOAD_CHUNK_BYTES: int = 1024 * 1024
+    PDF_DOWNLOAD_TIMEOUT_SECONDS: int = 60
+    MINIO_PART_SIZE: int = 10 * 1024 * 1024
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    VECTOR_DISTANCE_METRIC: Literal["cosine", "l2", "inner_product"] = "cosine"
+    VECTOR_INDEX_TYPE: Literal["hnsw", "ivfflat"] = "hnsw"
+    VECTOR_INDEX_QUANTIZATION: Literal["none", "halfvec", "binary"] = "none"
+    VECTOR_RERANK_CANDIDATES: int = 100
+    SEARCH_MODE: Literal["vector", "hybrid", "keyword"] = "vector"
+    TEXT_SEARCH_CONFIG: str = "simple"
+    HYBRID_CANDIDATES: int = 40
+    HYBRID_RRF_K: int = 60
+    HYBRID_VECTOR_WEIGHT: float = 1.0
+    HYBRID_TEXT_WEIGHT: float = 1.0
+    HNSW_M: int = 16
+    HNSW_EF_CONSTRUCTION: int = 64
+    HNSW_EF_SEARCH: int = 40
+    IVFFLAT_PROBES: int = 10
 
     @property
     def database_url(self) -> str:
         return f"postgresql+psycopg2://{self.DB_USERNAME}:{self.DB_PASSWORD}@{self.POSTGRES_URL}/{self.DB_NAME}"
 
+    @property
+    def async_database_url(self) -> str:
+        return f"postgresql+asyncpg://{self.DB_USERNAME}:{self.DB_PASSWORD}@{self.POSTGRES_URL}/{self.DB_NAME}"
+
 class DevConfig(GlobalConfig):
     POSTGRES_URL: Optional[str] = os.getenv("DEV_POSTGRES_URL")
     DB_NAME: Optional[str] = os.getenv("DEV_DB_NAME")
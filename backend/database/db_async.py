@@ -0,0 +1,64 @@
+import threading
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from backend.config import config
+from backend.database.db_models import search_settings, describe_pool, pool_counter
+
+_async_engine = None
+_async_session_factory = None
+_async_engine_lock = threading.Lock()
+async_pool_counters = {"connections_created": 0, "checkouts": 0}
+
+
+def get_async_engine():
+    """
+    Return the process-wide asyncpg engine.
+
+    Vectors go through the pgvector SQLAlchemy type, which binds and parses the pgvector
+    text format, so asyncpg needs no extra codec registration.
+    """
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        with _async_engine_lock:
+            if _async_engine is None:
+                engine = create_async_engine(
+                    config.async_database_url,
+                    pool_size=config.DB_POOL_SIZE,
+                    max_overflow=config.DB_MAX_OVERFLOW,
+                    pool_pre_ping=config.DB_POOL_PRE_PING,
+                    pool_recycle=config.DB_POOL_RECYCLE_SECONDS,
+                    pool_timeout=config.DB_POOL_TIMEOUT_SECONDS,
+                    connect_args={"server_settings": search_settings()},
+                )
+                # Pool events are raised by the synchronous engine the async one wraps
+                event.listen(engine.sync_engine, "connect", pool_counter(async_pool_counters, "connections_created"))
+                event.listen(engine.sync_engine, "checkout", pool_counter(async_pool_counters, "checkouts"))
+                _async_session_factory = async_sessionmaker(engine, expire_on_commit=False)
+                _async_engine = engine
+    return _async_engine
+
+
+def async_pool_stats():
+    """Connection pool utilization of the asyncpg engine, which serves the search and query routes."""
+    if _async_engine is None:
+        return {"initialized": False, **async_pool_counters}
+    return describe_pool(_async_engine.pool, async_pool_counters)
+
+
+def create_async_session():
+    get_async_engine()
+    return _async_session_factory()
+
+
+async def get_async_session():
+    """FastAPI dependency yielding an AsyncSession; no connection is checked out until the first query."""
+    async with create_async_session() as session:
+        yield session
+
+
+async def dispose_async_engine():
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _async_session_factory = None
@@ -0,0 +1,126 @@
+import io
+import struct
+import numpy as np
+from backend.config import config
+
+# PostgreSQL binary COPY framing: signature, flags, header extension length / end-of-data marker
+COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+COPY_TRAILER = struct.pack("!h", -1)
+
+CHUNK_COLUMNS = ("pdf_id", "filename", "chunk_index", "chunk_text", "page_start", "page_end", "embedding")
+
+_INT4_FIELD = struct.Struct("!ii")
+_LENGTH = struct.Struct("!i")
+_ROW_START = struct.Struct("!h").pack(len(CHUNK_COLUMNS))
+
+
+def encode_chunk_rows(document_id, filename, chunks, embeddings, start_index=0, chunk_indexes=None):
+    """
+    Encode chunk rows as binary COPY tuples (without the stream header and trailer).
+
+    Vectors use pgvector's binary input format (int16 dim, int16 unused, big-endian
+    float4 values) and are byteswapped as one contiguous block, so no per-float Python
+    objects are created.
+
+    :param chunks: Chunks with text, page_start and page_end (see chunkingService.Chunk).
+    :param embeddings: float32 array of shape (len(chunks), dim).
+    :param chunk_indexes: chunk_index of every row; consecutive from ``start_index`` when not given.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=">f4")
+    count, dim = embeddings.shape
+    vector_header = _LENGTH.pack(4 + 4 * dim) + struct.pack("!hh", dim, 0)
+    pdf_id_field = _INT4_FIELD.pack(4, document_id)
+    filename_bytes = filename.encode("utf-8")
+    filename_field = _LENGTH.pack(len(filename_bytes)) + filename_bytes
+
+    parts = []
+    for offset in range(count):
+        chunk = chunks[offset]
+        text_bytes = chunk.text.encode("utf-8")
+        parts += (
+            _ROW_START,
+            pdf_id_field,
+            filename_field,
+            _INT4_FIELD.pack(4, chunk_indexes[offset] if chunk_indexes is not None else start_index + offset),
+            _LENGTH.pack(len(text_bytes)),
+            text_bytes,
+            _INT4_FIELD.pack(4, chunk.page_start),
+            _INT4_FIELD.pack(4, chunk.page_end),
+            vector_header,
+            embeddings[offset].data,
+        )
+    return b"".join(parts)
+
+
+class _ChunkCopyStream(io.RawIOBase):
+    """File-like COPY source that encodes ``flush_rows`` rows at a time as the server consumes them."""
+
+    def __init__(self, blocks):
+        self._blocks = blocks
+        self._buffer = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while not self._buffer:
+            block = next(self._blocks, None)
+            if block is None:
+                return 0
+            self._buffer = memoryview(block)
+        size = min(len(target), len(self._buffer))
+        target[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def copy_chunk_batches(session, table_name, document_id, filename, batches, flush_rows=None, on_flush=None):
+    """
+    Stream a document's chunks into ``table_name`` with one binary COPY.
+
+    ``batches`` yields (chunks, embeddings) pairs and is consumed as the server reads, so
+    chunks can still be embedded while earlier ones are being written. Chunks are numbered
+    consecutively unless a batch is a (chunks, embeddings, chunk_indexes) triple. Runs on the
+    session's connection and does not commit, so the load is part of the caller's
+    transaction.
+
+    :param flush_rows: Rows encoded per write to the server (defaults to config.INGESTION_COPY_FLUSH_ROWS).
+    :param on_flush: Optional callable receiving the number of rows in each written block.
+    :return: The number of rows copied.
+    """
+    flush_rows = flush_rows or config.INGESTION_COPY_FLUSH_ROWS
+    copied = 0
+
+    def blocks():
+        nonlocal copied
+        yield COPY_SIGNATURE
+        for batch in batches:
+            chunks, embeddings = batch[:2]
+            chunk_indexes = batch[2] if len(batch) > 2 else None
+            for start in range(0, len(chunks), flush_rows):
+                stop = min(start + flush_rows, len(chunks))
+                yield encode_chunk_rows(
+                    document_id, filename, chunks[start:stop], embeddings[start:stop], copied + start,
+                    chunk_indexes[start:stop] if chunk_indexes is not None else None,
+                )
+                if on_flush:
+                    on_flush(stop - start)
+            copied += len(chunks)
+        yield COPY_TRAILER
+
+    statement = f"COPY {table_name} ({', '.join(CHUNK_COLUMNS)}) FROM STDIN WITH (FORMAT binary)"
+    dbapi_connection = session.connection().connection
+    with dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(statement, _ChunkCopyStream(blocks()), size=256 * 1024)
+    return copied
+
+
+def copy_chunk_rows(session, table_name, document_id, filename, chunks, embeddings,
+                    flush_rows=None, on_flush=None):
+    """
+    Stream an in-memory list of chunks and their embedding matrix with one binary COPY; see copy_chunk_batches.
+
+    :return: The number of rows copied.
+    """
+    return copy_chunk_batches(session, table_name, document_id, filename, [(chunks, embeddings)],
+                              flush_rows=flush_rows, on_flush=on_flush)
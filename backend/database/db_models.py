@@ -1,26 +1,767 @@
-from sqlalchemy import create_engine, Column, Integer, String, Index
+from contextlib import contextmanager
+import hashlib
+import logging
+import math
+import re
+import threading
+import uuid
+from sqlalchemy import (
+    create_engine, event, text, literal, select, update, cast, union_all, and_,
+    Column, Computed, Integer, BigInteger, Float, String, Index, DateTime, ForeignKey, Sequence, func
+)
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import Vector, HALFVEC, BIT
 from backend.config import config
 
 Base = declarative_base()
 
+# Full-text representation of a chunk; a generated column, so every write path (COPY, INSERT ... SELECT) fills it
+_TSVECTOR_EXPRESSION = f"to_tsvector('{config.TEXT_SEARCH_CONFIG}'::regconfig, chunk_text)"
+
+_DOCUMENT_ID_SEQUENCE = Sequence("tb_documents_id_seq")
+
+
+class Document(Base):
+    """
+    Catalog of ingested PDFs, one row per filename.
+
+    ``id`` comes from a sequence and is what tb_embeddings.pdf_id references.
+    ``partition_name`` is the tb_embeddings partition currently searchable for the
+    document and ``ingest_finished_at`` when it was published; ``status`` describes the
+    latest ingest attempt. ``embedding_model`` is the EMBEDDING_MODEL_ID that produced the
+    published embeddings.
+    """
+    __tablename__ = "tb_documents"
+    # The server default lets the raw INSERTs of the startup migrations omit the id
+    id = Column(Integer, _DOCUMENT_ID_SEQUENCE, server_default=_DOCUMENT_ID_SEQUENCE.next_value(), primary_key=True)
+    filename = Column(String, nullable=False, unique=True)
+    content_hash = Column(String(64), index=True)
+    chunk_count = Column(Integer, nullable=False, server_default="0")
+    byte_size = Column(BigInteger)
+    status = Column(String(16), nullable=False, server_default="ingesting")
+    partition_name = Column(String)
+    embedding_model = Column(String)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    ingest_started_at = Column(DateTime)
+    ingest_finished_at = Column(DateTime)
+
 class PdfEmbedding(Base):
+    """
+    Chunk embeddings, LIST-partitioned by filename with one partition per document.
+
+    Filename-scoped searches are pruned to the document's own partition (and its own ANN
+    index), so they cost O(document size) however large the corpus grows, and deleting a
+    document drops its partition.
+    """
     __tablename__ = "tb_embeddings"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    pdf_id = Column(Integer, autoincrement=True)
-    filename = Column(String, nullable=False)
+    pdf_id = Column(Integer, ForeignKey("tb_documents.id", ondelete="CASCADE"))
+    filename = Column(String, primary_key=True, nullable=False)
     chunk_index = Column(Integer, nullable=False)
     chunk_text = Column(String, nullable=False)
+    page_start = Column(Integer)
+    page_end = Column(Integer)
     embedding = Column(Vector(1024), nullable=False)
+    chunk_tsv = Column(postgresql.TSVECTOR, Computed(_TSVECTOR_EXPRESSION, persisted=True))
 
+    # idx_embedding is managed by ensure_vector_index, not create_all: ivfflat must not be
+    # built on an empty table and both index types follow VECTOR_DISTANCE_METRIC
     __table_args__ = (
-        Index('idx_embedding', 'embedding', postgresql_using='ivfflat', postgresql_with={"lists": 100},
-              postgresql_ops={"embedding": "vector_cosine_ops"}),
+        Index('idx_embeddings_pdf_id', 'pdf_id'),
+        Index('idx_embeddings_chunk_tsv', 'chunk_tsv', postgresql_using='gin'),
+        {"postgresql_partition_by": "LIST (filename)"},
     )
 
+class EmbeddingCacheEntry(Base):
+    """
+    Shared tier of the embedding cache. ``last_used_at`` is refreshed on hits and drives
+    the TTL and row-count pruning (see EmbeddingCache.prune_db).
+    """
+    __tablename__ = "tb_embedding_cache"
+    model_id = Column(String, primary_key=True)
+    text_hash = Column(String(64), primary_key=True)
+    embedding = Column(Vector(1024), nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    last_used_at = Column(DateTime, nullable=False, server_default=func.now(), index=True)
+
+VECTOR_OPS = {"cosine": "vector_cosine_ops", "l2": "vector_l2_ops", "inner_product": "vector_ip_ops"}
+HALFVEC_OPS = {"cosine": "halfvec_cosine_ops", "l2": "halfvec_l2_ops", "inner_product": "halfvec_ip_ops"}
+_DISTANCE_OPERATORS = {"cosine": "cosine_distance", "l2": "l2_distance", "inner_product": "max_inner_product"}
+_INDEX_BUILD_LOCK_ID = 7_413_021
+_SCHEMA_LOCK_ID = 7_413_022
+# First key of the per-document (namespace, document id) ingest locks
+_INGEST_LOCK_NAMESPACE = 7_413_023
+
+
+def _distance(column, embedding):
+    return getattr(column, _DISTANCE_OPERATORS[config.VECTOR_DISTANCE_METRIC])(embedding)
+
+
+def embedding_distance(embedding):
+    """
+    Distance between ``PdfEmbedding.embedding`` and ``embedding`` in VECTOR_DISTANCE_METRIC.
+
+    Exact searches order by this expression; with VECTOR_INDEX_QUANTIZATION at "none" it is
+    also what idx_embedding is built for. Use ``nearest_chunks`` for top-k searches so the
+    quantized index is used when configured.
+    """
+    return _distance(PdfEmbedding.embedding, embedding)
+
+
+def quantized_distance(embedding):
+    """
+    Candidate-stage distance matching the expression idx_embedding is built on for
+    VECTOR_INDEX_QUANTIZATION: the metric over half-precision vectors for "halfvec",
+    Hamming distance between sign bits for "binary".
+    """
+    dimensions = PdfEmbedding.embedding.type.dim
+    if config.VECTOR_INDEX_QUANTIZATION == "halfvec":
+        return _distance(cast(PdfEmbedding.embedding, HALFVEC(dimensions)), cast(embedding, HALFVEC(dimensions)))
+    return cast(func.binary_quantize(PdfEmbedding.embedding), BIT(dimensions)).hamming_distance(
+        func.binary_quantize(cast(embedding, Vector(dimensions)))
+    )
+
+
+def search_depth(limit):
+    """Rows the ANN index must return for a top-``limit`` search: the re-rank candidates when quantized."""
+    if config.VECTOR_INDEX_QUANTIZATION == "none":
+        return limit
+    return max(limit, config.VECTOR_RERANK_CANDIDATES)
+
+
+def nearest_chunks(embedding, columns, *criteria, limit=5):
+    """
+    Select ``columns`` and a ``score`` (exact distance in VECTOR_DISTANCE_METRIC) of the
+    ``limit`` chunks matching ``criteria`` that are closest to ``embedding``, ordered by score.
+
+    With a quantized index, VECTOR_RERANK_CANDIDATES candidates are fetched through the
+    compact index first and re-ranked by exact float distance. ``criteria`` may reference
+    outer FROM objects, so the statement can be used as a LATERAL subquery.
+    """
+    if config.VECTOR_INDEX_QUANTIZATION == "none":
+        distance = embedding_distance(embedding)
+        return select(*columns, distance.label("score")).where(*criteria).order_by(distance).limit(limit)
+
+    candidates = (
+        select(*columns, PdfEmbedding.embedding.label("candidate_embedding"))
+        .where(*criteria)
+        .order_by(quantized_distance(embedding))
+        .limit(search_depth(limit))
+        .correlate_except(PdfEmbedding)
+        .lateral("candidates")
+    )
+    distance = _distance(candidates.c.candidate_embedding, embedding)
+    return (
+        select(*[candidates.c[column.key] for column in columns], distance.label("score"))
+        .order_by(distance)
+        .limit(limit)
+    )
+
+
+def text_query(query_text):
+    """tsquery of ``query_text`` in TEXT_SEARCH_CONFIG; web search syntax, so user input never raises a syntax error."""
+    return func.websearch_to_tsquery(cast(config.TEXT_SEARCH_CONFIG, postgresql.REGCONFIG), query_text)
+
+
+def keyword_chunks(query_text, columns, *criteria, limit=5):
+    """
+    Select ``columns`` and a ``score`` (ts_rank_cd, higher is better) of the ``limit`` chunks
+    matching ``criteria`` whose text matches ``query_text``, through the chunk_tsv GIN index.
+    """
+    query = text_query(query_text)
+    rank = func.ts_rank_cd(PdfEmbedding.chunk_tsv, query)
+    return (
+        select(*columns, rank.label("score"))
+        .where(PdfEmbedding.chunk_tsv.op("@@")(query), *criteria)
+        .order_by(rank.desc())
+        .limit(limit)
+    )
+
+
+def hybrid_chunks(embedding, query_text, columns, *criteria, limit=5, vector_weight=None, text_weight=None):
+    """
+    Select ``columns`` and a ``score`` (higher is better) of the ``limit`` chunks matching
+    ``criteria`` that best answer ``query_text``, fusing vector and full-text search in one statement.
+
+    The HYBRID_CANDIDATES nearest chunks and as many best full-text matches are ranked in
+    two CTEs and fused with reciprocal-rank fusion: a chunk scores
+    weight / (HYBRID_RRF_K + rank) for each list it is in, so exact identifiers found by the
+    full-text search surface even when their embedding is not among the nearest.
+    """
+    depth = max(limit, config.HYBRID_CANDIDATES)
+    vector_weight = config.HYBRID_VECTOR_WEIGHT if vector_weight is None else vector_weight
+    text_weight = config.HYBRID_TEXT_WEIGHT if text_weight is None else text_weight
+    keys = [PdfEmbedding.id, PdfEmbedding.filename]
+
+    semantic_hits = nearest_chunks(embedding, keys, *criteria, limit=depth).subquery("semantic_hits")
+    semantic = select(
+        semantic_hits.c.id, semantic_hits.c.filename,
+        func.row_number().over(order_by=semantic_hits.c.score).label("rank"),
+    ).cte("semantic")
+    lexical_hits = keyword_chunks(query_text, keys, *criteria, limit=depth).subquery("lexical_hits")
+    lexical = select(
+        lexical_hits.c.id, lexical_hits.c.filename,
+        func.row_number().over(order_by=lexical_hits.c.score.desc()).label("rank"),
+    ).cte("lexical")
+
+    fused = union_all(*[
+        select(ranks.c.id, ranks.c.filename,
+               (literal(weight, Float) / cast(config.HYBRID_RRF_K + ranks.c.rank, Float)).label("rrf"))
+        for ranks, weight in ((semantic, vector_weight), (lexical, text_weight))
+    ]).subquery("fused")
+    score = func.sum(fused.c.rrf).label("score")
+    ranked = (
+        select(fused.c.id, fused.c.filename, score)
+        .group_by(fused.c.id, fused.c.filename)
+        .order_by(score.desc())
+        .limit(limit)
+        .subquery("ranked")
+    )
+    # criteria repeated on the outer join so it is pruned to the same partitions
+    return (
+        select(*columns, ranked.c.score)
+        .join_from(ranked, PdfEmbedding, and_(PdfEmbedding.id == ranked.c.id,
+                                             PdfEmbedding.filename == ranked.c.filename))
+        .where(*criteria)
+        .order_by(ranked.c.score.desc())
+    )
+
+
+def search_settings():
+    """Per-connection defaults for the ANN search knobs; requests may override them per transaction."""
+    # HNSW never returns more than ef_search rows, so it must cover the re-rank and hybrid candidates
+    ef_search = max(config.HNSW_EF_SEARCH, search_depth(1), config.HYBRID_CANDIDATES)
+    return {"hnsw.ef_search": str(ef_search), "ivfflat.probes": str(config.IVFFLAT_PROBES)}
+
+
+def _sql_literal(value):
+    """Quote ``value`` for DDL, which does not take bind parameters."""
+    return str(literal(value, String).compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def register_document(session, filename, content_hash=None, byte_size=None):
+    """
+    Upsert the catalog row of ``filename`` for a new ingest and return its id.
+
+    The id is assigned from the sequence the first time a filename is seen and kept on
+    re-ingests, so concurrent ingests never share or race for an id.
+    """
+    values = {
+        "content_hash": content_hash,
+        "byte_size": byte_size,
+        "status": "ingesting",
+        "ingest_started_at": func.now(),
+    }
+    statement = postgresql.insert(Document).values(filename=filename, **values).on_conflict_do_update(
+        index_elements=[Document.filename], set_=values
+    ).returning(Document.id)
+    document_id = session.execute(statement).scalar()
+    session.commit()
+    return document_id
+
+
+def find_indexed_document(session, content_hash, embedding_model, filename=None):
+    """
+    A published document whose PDF has ``content_hash`` and was embedded by ``embedding_model``, or None.
+
+    ``filename`` itself is preferred when it already matches, so re-submitting a document is
+    recognized as a no-op; otherwise the most recently published match is returned.
+    """
+    return session.query(Document).filter(
+        Document.content_hash == content_hash,
+        Document.embedding_model == embedding_model,
+        Document.status == "ready",
+        Document.partition_name.isnot(None),
+    ).order_by(
+        (Document.filename == filename).desc(), Document.ingest_finished_at.desc(), Document.id.desc()
+    ).first()
+
+
+@contextmanager
+def document_ingest_lock(document_id):
+    """
+    Hold an advisory lock on ``document_id`` while a new version of it is staged, loaded and published.
+
+    Those steps commit several times, so no transaction spans them; the lock is taken on a
+    connection of its own and released when the block exits or the connection drops. A
+    concurrent ingest of the same document waits here instead of racing for its partition.
+    """
+    with get_engine().connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("SELECT pg_advisory_lock(:namespace, :id)"),
+                           {"namespace": _INGEST_LOCK_NAMESPACE, "id": document_id})
+        try:
+            yield
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:namespace, :id)"),
+                               {"namespace": _INGEST_LOCK_NAMESPACE, "id": document_id})
+
+
+def stage_document_partition(session, document_id, filename):
+    """
+    Create the detached table a new version of the document's chunks is loaded into.
+
+    ``publish_document_partition`` attaches it once loaded, so its indexes (ivfflat
+    centroids included) are built over the loaded rows and searches never see a
+    half-loaded document. Callers hold ``document_ingest_lock``, so unattached tables of
+    the same document are leftovers of interrupted loads and are dropped.
+
+    :return: The staged table name.
+    """
+    prefix = f"tb_embeddings_doc_{document_id}_"
+    leftovers = session.execute(text(
+        "SELECT c.relname FROM pg_class c WHERE c.relkind = 'r' AND starts_with(c.relname, :prefix) "
+        "AND NOT EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = c.oid)"
+    ), {"prefix": prefix}).scalars().all()
+    for leftover in leftovers:
+        session.execute(text(f"DROP TABLE IF EXISTS {leftover}"))
+
+    name = f"{prefix}{uuid.uuid4().hex[:8]}"
+    session.execute(text(f"CREATE TABLE {name} (LIKE tb_embeddings INCLUDING DEFAULTS INCLUDING GENERATED)"))
+    # Matches the partition bound, so ATTACH PARTITION can skip its validation scan
+    session.execute(text(f"ALTER TABLE {name} ADD CONSTRAINT {name}_bound CHECK (filename = {_sql_literal(filename)})"))
+    session.commit()
+    return name
+
+
+def copy_document_chunks(session, source_filename, partition_name, document_id, filename):
+    """
+    Copy the chunks and embeddings of ``source_filename`` into a staged partition of another document.
+
+    The rows are copied server-side with INSERT ... SELECT, pruned to the source document's
+    partition, so a PDF that is already indexed is not chunked or embedded again. Does not commit.
+
+    :return: The number of rows copied.
+    """
+    result = session.execute(text(
+        f"INSERT INTO {partition_name} (pdf_id, filename, chunk_index, chunk_text, page_start, page_end, embedding) "
+        "SELECT :document_id, :filename, chunk_index, chunk_text, page_start, page_end, embedding "
+        "FROM tb_embeddings WHERE filename = :source_filename"
+    ), {"document_id": document_id, "filename": filename, "source_filename": source_filename})
+    return result.rowcount
+
+
+# Rewrites an index definition of tb_embeddings into an unnamed one on a staged table
+_INDEX_TARGET = re.compile(r"^CREATE (UNIQUE )?INDEX \S+ ON (?:ONLY )?\S+ ")
+
+
+def prepare_document_partition(session, partition_name):
+    """
+    Build the indexes and constraints of tb_embeddings on a loaded staged table, and commit.
+
+    ATTACH PARTITION adopts a matching index, primary key and foreign key instead of
+    building and validating its own while it holds tb_embeddings locked, so publishing
+    stays a catalog-only change however large the document is.
+    """
+    definitions = session.execute(text(
+        "SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i "
+        "WHERE i.indrelid = 'tb_embeddings'::regclass AND NOT i.indisprimary"
+    )).scalars().all()
+    for definition in definitions:
+        session.execute(text(_INDEX_TARGET.sub(rf"CREATE \1INDEX ON {partition_name} ", definition)))
+
+    primary_key = ", ".join(column.name for column in PdfEmbedding.__table__.primary_key.columns)
+    session.execute(text(f"ALTER TABLE {partition_name} ADD PRIMARY KEY ({primary_key})"))
+    session.execute(text(
+        f"ALTER TABLE {partition_name} ADD FOREIGN KEY (pdf_id) REFERENCES tb_documents (id) ON DELETE CASCADE"
+    ))
+    session.commit()
+
+
+def publish_document_partition(session, document_id, filename, partition_name, chunk_count, embedding_model):
+    """
+    Make a loaded partition the searchable version of the document.
+
+    The partition is prepared first, then in one short transaction the previous partition
+    is detached, the new one attached and the catalog row marked ready. The detached
+    partition is dropped after that commits, so no index build or table drop happens
+    while searches of tb_embeddings wait on the lock.
+    """
+    prepare_document_partition(session, partition_name)
+
+    previous = session.execute(
+        select(Document.partition_name).where(Document.id == document_id).with_for_update()
+    ).scalar()
+    if previous:
+        # Not CONCURRENTLY: the new partition takes over the same bound in this transaction
+        session.execute(text(f"ALTER TABLE tb_embeddings DETACH PARTITION {previous}"))
+    session.execute(text(
+        f"ALTER TABLE tb_embeddings ATTACH PARTITION {partition_name} FOR VALUES IN ({_sql_literal(filename)})"
+    ))
+    session.execute(text(f"ALTER TABLE {partition_name} DROP CONSTRAINT {partition_name}_bound"))
+    session.execute(update(Document).where(Document.id == document_id).values(
+        partition_name=partition_name,
+        chunk_count=chunk_count,
+        embedding_model=embedding_model,
+        status="ready",
+        ingest_finished_at=func.now(),
+    ))
+    session.commit()
+
+    if previous:
+        # A leftover from a failure here is unattached and dropped by the next stage_document_partition
+        session.execute(text(f"DROP TABLE IF EXISTS {previous}"))
+        session.commit()
+
+
+def chunk_text_hash(chunk_text):
+    """sha256 hex digest of a chunk's text; the same value _STORED_CHUNK_HASH computes in Postgres."""
+    return hashlib.sha256(chunk_text.encode("utf-8")).hexdigest()
+
+
+_STORED_CHUNK_HASH = "encode(sha256(convert_to(chunk_text, 'UTF8')), 'hex')"
+
+
+def lock_published_chunks(session, document_id, embedding_model):
+    """
+    Lock the catalog row of a document for an in-place update and read its published chunks.
+
+    The lock is held until the caller's transaction ends, so a concurrent ingest of the
+    same document waits instead of swapping the partition underneath the update.
+
+    :return: (partition name, {chunk text hash: [row ids]}), or (None, {}) if no version is published
+        or the published one was embedded by another model than ``embedding_model``.
+    """
+    published = session.execute(
+        select(Document.partition_name, Document.embedding_model).where(Document.id == document_id).with_for_update()
+    ).first()
+    if published is None or not published.partition_name or published.embedding_model != embedding_model:
+        return None, {}
+    partition_name = published.partition_name
+    stored = {}
+    for row_id, chunk_hash in session.execute(text(f"SELECT id, {_STORED_CHUNK_HASH} FROM {partition_name}")):
+        stored.setdefault(chunk_hash, []).append(row_id)
+    return partition_name, stored
+
+
+def apply_chunk_update(session, document_id, partition_name, kept, removed_ids, chunk_count):
+    """
+    Finish an in-place update of a published document and commit.
+
+    The rows of new chunks have been copied into ``partition_name`` earlier in the same
+    transaction; here the kept rows are renumbered, the rows of removed chunks deleted and
+    the catalog row marked ready. Searches see the previous version until the commit.
+
+    :param kept: (row id, chunk_index, page_start, page_end) of every row reused by the new version.
+    :param removed_ids: Ids of the rows the new version no longer contains.
+    """
+    if kept:
+        ids, chunk_indexes, page_starts, page_ends = (list(column) for column in zip(*kept))
+        session.execute(text(
+            f"UPDATE {partition_name} AS e SET chunk_index = m.chunk_index, "
+            "page_start = m.page_start, page_end = m.page_end "
+            "FROM unnest(CAST(:ids AS integer[]), CAST(:chunk_indexes AS integer[]), "
+            "CAST(:page_starts AS integer[]), CAST(:page_ends AS integer[])) "
+            "AS m(id, chunk_index, page_start, page_end) WHERE e.id = m.id"
+        ), {"ids": ids, "chunk_indexes": chunk_indexes, "page_starts": page_starts, "page_ends": page_ends})
+    if removed_ids:
+        session.execute(text(f"DELETE FROM {partition_name} WHERE id = ANY(:ids)"), {"ids": list(removed_ids)})
+    session.execute(update(Document).where(Document.id == document_id).values(
+        chunk_count=chunk_count,
+        status="ready",
+        ingest_finished_at=func.now(),
+    ))
+    session.commit()
+
+
+def discard_document_partition(session, document_id, partition_name):
+    """Drop a staged partition after a failed ingest and mark it failed; the previous version stays searchable."""
+    session.rollback()
+    if partition_name:
+        session.execute(text(f"DROP TABLE IF EXISTS {partition_name}"))
+    session.execute(update(Document).where(Document.id == document_id).values(status="failed"))
+    session.commit()
+
+
+def _partition_existing_table(connection):
+    """
+    Move rows of a pre-partitioning tb_embeddings into per-document partitions.
+
+    Runs inside init_db's transaction: the old table is renamed away before create_all
+    creates the partitioned one, then copied with its ids and dropped.
+    """
+    relkind = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass('tb_embeddings')")
+    ).scalar()
+    if relkind != "r":
+        return False
+
+    logging.info("Migrating tb_embeddings to per-document partitions")
+    connection.execute(text("DROP INDEX IF EXISTS idx_embedding"))
+    connection.execute(text("ALTER TABLE tb_embeddings RENAME TO tb_embeddings_unpartitioned"))
+    connection.execute(text(
+        "ALTER TABLE tb_embeddings_unpartitioned RENAME CONSTRAINT tb_embeddings_pkey TO tb_embeddings_unpartitioned_pkey"
+    ))
+    connection.execute(text("ALTER SEQUENCE IF EXISTS tb_embeddings_id_seq RENAME TO tb_embeddings_unpartitioned_id_seq"))
+    return True
+
+
+def _copy_unpartitioned_rows(connection):
+    """Catalog every document of the old table, give it a partition and copy its rows under the new document id."""
+    documents = connection.execute(text(
+        "INSERT INTO tb_documents (filename, chunk_count, status, ingest_finished_at) "
+        "SELECT filename, count(*), 'ready', now() FROM tb_embeddings_unpartitioned GROUP BY filename "
+        "RETURNING id, filename"
+    )).all()
+    for document in documents:
+        name = f"tb_embeddings_doc_{document.id}_{uuid.uuid4().hex[:8]}"
+        connection.execute(text(
+            f"CREATE TABLE {name} PARTITION OF tb_embeddings FOR VALUES IN ({_sql_literal(document.filename)})"
+        ))
+        connection.execute(update(Document).where(Document.id == document.id).values(partition_name=name))
+    connection.execute(text(
+        "INSERT INTO tb_embeddings (id, pdf_id, filename, chunk_index, chunk_text, embedding) "
+        "SELECT e.id, d.id, e.filename, e.chunk_index, e.chunk_text, e.embedding "
+        "FROM tb_embeddings_unpartitioned e JOIN tb_documents d ON d.filename = e.filename"
+    ))
+    connection.execute(text(
+        "SELECT setval('tb_embeddings_id_seq', (SELECT COALESCE(max(id), 0) + 1 FROM tb_embeddings), false)"
+    ))
+    connection.execute(text("DROP TABLE tb_embeddings_unpartitioned"))
+    logging.info(f"Moved {len(documents)} documents into partitions")
+
+
+def _catalog_partitioned_documents(connection):
+    """
+    Backfill tb_documents for a partitioned tb_embeddings created before the catalog existed,
+    repoint pdf_id at the catalog ids and add the foreign key.
+    """
+    has_foreign_key = connection.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_constraint WHERE conrelid = 'tb_embeddings'::regclass AND contype = 'f')"
+    )).scalar()
+    if has_foreign_key:
+        return
+
+    logging.info("Cataloging existing documents into tb_documents")
+    connection.execute(text(
+        "INSERT INTO tb_documents (filename, chunk_count, partition_name, status, ingest_finished_at) "
+        "SELECT filename, count(*), min(tableoid::regclass::text), 'ready', now() FROM tb_embeddings "
+        "GROUP BY filename ON CONFLICT (filename) DO NOTHING"
+    ))
+    connection.execute(text(
+        "UPDATE tb_embeddings e SET pdf_id = d.id FROM tb_documents d "
+        "WHERE d.filename = e.filename AND e.pdf_id IS DISTINCT FROM d.id"
+    ))
+    connection.execute(text(
+        "ALTER TABLE tb_embeddings ADD CONSTRAINT tb_embeddings_pdf_id_fkey "
+        "FOREIGN KEY (pdf_id) REFERENCES tb_documents (id) ON DELETE CASCADE"
+    ))
+
+
+def ivfflat_lists(row_count):
+    """pgvector's guidance: rows / 1000 lists up to 1M rows, sqrt(rows) above."""
+    if row_count > 1_000_000:
+        return int(math.sqrt(row_count))
+    return max(1, row_count // 1000)
+
+
+_engine = None
+_session_factory = None
+_schema_ready = False
+# ivfflat lists of the idx_embedding this process last found or built; see ensure_vector_index
+_ivfflat_lists_checked = None
+_schema_lock = threading.Lock()
+_engine_lock = threading.Lock()
+pool_counters = {"connections_created": 0, "checkouts": 0}
+
+
+def pool_counter(counters, counter):
+    """Pool event listener incrementing ``counters[counter]``."""
+    def listener(*args):
+        counters[counter] += 1
+    return listener
+
+
+def get_engine():
+    """Return the process-wide engine, creating it with the configured connection pool on first use."""
+    global _engine, _session_factory
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = create_engine(
+                    config.database_url,
+                    pool_size=config.DB_POOL_SIZE,
+                    max_overflow=config.DB_MAX_OVERFLOW,
+                    pool_pre_ping=config.DB_POOL_PRE_PING,
+                    pool_recycle=config.DB_POOL_RECYCLE_SECONDS,
+                    pool_timeout=config.DB_POOL_TIMEOUT_SECONDS,
+                    connect_args={"options": " ".join(f"-c {name}={value}" for name, value in search_settings().items())},
+                )
+                event.listen(engine, "connect", pool_counter(pool_counters, "connections_created"))
+                event.listen(engine, "checkout", pool_counter(pool_counters, "checkouts"))
+                _session_factory = sessionmaker(bind=engine)
+                _engine = engine
+    return _engine
+
+
+def init_db():
+    """
+    Create the pgvector extension, tables and indexes. Runs once per process, at application
+    startup or on the first session if startup could not reach the database.
+
+    Concurrent callers in the process wait for the first one; other workers wait on an
+    advisory lock, so the DDL never runs twice at the same time.
+    """
+    global _schema_ready
+    with _schema_lock:
+        if _schema_ready:
+            return
+        engine = get_engine()
+        with engine.begin() as connection:
+            connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _SCHEMA_LOCK_ID})
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+            migrating = _partition_existing_table(connection)
+            Base.metadata.create_all(connection)
+            # Catalogs created before the id had a server default get it before the migrations insert into them
+            connection.execute(text("ALTER TABLE tb_documents ALTER COLUMN id SET DEFAULT nextval('tb_documents_id_seq')"))
+            if migrating:
+                _copy_unpartitioned_rows(connection)
+            _catalog_partitioned_documents(connection)
+            # Content hash lookups back ingest deduplication; catalogs created before it lack the index
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_tb_documents_content_hash ON tb_documents (content_hash)"
+            ))
+            # Documents published before the column existed have no known model, so they are not reused
+            connection.execute(text("ALTER TABLE tb_documents ADD COLUMN IF NOT EXISTS embedding_model varchar"))
+            # Page spans were added after the first release; older chunks keep NULL spans
+            connection.execute(text(
+                "ALTER TABLE tb_embeddings ADD COLUMN IF NOT EXISTS page_start integer, "
+                "ADD COLUMN IF NOT EXISTS page_end integer"
+            ))
+            # Embedding cache rows are pruned by last use; tables created before that get the column now
+            connection.execute(text(
+                "ALTER TABLE tb_embedding_cache ADD COLUMN IF NOT EXISTS last_used_at timestamp NOT NULL DEFAULT now()"
+            ))
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_tb_embedding_cache_last_used_at ON tb_embedding_cache (last_used_at)"
+            ))
+            # Full-text search column and index for hybrid search; adding it rewrites existing partitions once
+            connection.execute(text(
+                "ALTER TABLE tb_embeddings ADD COLUMN IF NOT EXISTS chunk_tsv tsvector "
+                f"GENERATED ALWAYS AS ({_TSVECTOR_EXPRESSION}) STORED"
+            ))
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_embeddings_chunk_tsv ON tb_embeddings USING gin (chunk_tsv)"
+            ))
+        ensure_vector_index()
+        _schema_ready = True
+        logging.info("Database schema is ready")
+
+
+def index_target():
+    """Indexed expression and operator class of idx_embedding for VECTOR_INDEX_QUANTIZATION."""
+    dimensions = PdfEmbedding.embedding.type.dim
+    if config.VECTOR_INDEX_QUANTIZATION == "halfvec":
+        return f"(embedding::halfvec({dimensions}))", HALFVEC_OPS[config.VECTOR_DISTANCE_METRIC]
+    if config.VECTOR_INDEX_QUANTIZATION == "binary":
+        return f"(binary_quantize(embedding)::bit({dimensions}))", "bit_hamming_ops"
+    return "embedding", VECTOR_OPS[config.VECTOR_DISTANCE_METRIC]
+
+
+def ensure_vector_index(force=False):
+    """
+    Create or rebuild idx_embedding to match VECTOR_INDEX_TYPE, VECTOR_DISTANCE_METRIC,
+    VECTOR_INDEX_QUANTIZATION and, for ivfflat, the size of the document partitions.
+
+    Quantized indexes are expression indexes over the float32 column, which stays the
+    source for exact re-ranking: halfvec halves the index, binary shrinks it 32x.
+
+    The index is declared on the partitioned table, so every partition carries its own
+    copy, built when the partition is attached. ivfflat ``lists`` is sized from the
+    average chunk_count of the published documents in the tb_documents catalog and the
+    index is rebuilt once that ideal drifts 2x from the built value; until it drifts 2x
+    from the value this process last checked, the index itself is not inspected. Nothing
+    is built while there are no documents. Postgres cannot build indexes
+    on a partitioned table CONCURRENTLY, so a rebuild blocks writes while it runs; it only
+    happens on configuration changes and large shifts in document size. Only one process
+    rebuilds at a time.
+
+    :return: True if the index was (re)built.
+    """
+    global _ivfflat_lists_checked
+    engine = get_engine()
+    target, ops = index_target()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        if config.VECTOR_INDEX_TYPE == "hnsw":
+            options = {"m": config.HNSW_M, "ef_construction": config.HNSW_EF_CONSTRUCTION}
+        else:
+            # The catalog keeps chunk counts, so this never scans tb_embeddings
+            rows_per_document = connection.execute(text(
+                "SELECT avg(chunk_count) FROM tb_documents WHERE partition_name IS NOT NULL"
+            )).scalar()
+            if not rows_per_document:
+                return False
+            options = {"lists": ivfflat_lists(int(rows_per_document))}
+            if not force and _ivfflat_lists_checked and 0.5 <= options["lists"] / _ivfflat_lists_checked <= 2:
+                return False
+
+        if not connection.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": _INDEX_BUILD_LOCK_ID}).scalar():
+            return False
+        try:
+            current = connection.execute(text(
+                "SELECT am.amname, c.reloptions, pg_get_indexdef(c.oid) AS definition "
+                "FROM pg_class c JOIN pg_am am ON am.oid = c.relam WHERE c.relname = 'idx_embedding'"
+            )).first()
+
+            if current is not None and not force and current.amname == config.VECTOR_INDEX_TYPE \
+                    and f" {ops})" in current.definition:
+                built = dict(option.split("=", 1) for option in current.reloptions or [])
+                if config.VECTOR_INDEX_TYPE == "hnsw" and built == {name: str(value) for name, value in options.items()}:
+                    return False
+                if config.VECTOR_INDEX_TYPE == "ivfflat" and 0.5 <= options["lists"] / int(built.get("lists", 1)) <= 2:
+                    _ivfflat_lists_checked = int(built.get("lists", 1))
+                    return False
+
+            with_clause = ", ".join(f"{name} = {value}" for name, value in options.items())
+            logging.info(f"Building {config.VECTOR_INDEX_TYPE} index on tb_embeddings ({target} {ops}, {with_clause})")
+            # One simple-query statement runs as a single implicit transaction
+            connection.execute(text(
+                f"DROP INDEX IF EXISTS idx_embedding; "
+                f"CREATE INDEX idx_embedding ON tb_embeddings USING {config.VECTOR_INDEX_TYPE} ({target} {ops}) "
+                f"WITH ({with_clause})"
+            ))
+            _ivfflat_lists_checked = options.get("lists")
+            return True
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": _INDEX_BUILD_LOCK_ID})
+
+
 def create_db_and_table():
-    engine = create_engine(config.database_url)
-    Base.metadata.create_all(engine)
-    return sessionmaker(bind=engine)()
+    """Return a session on the pooled engine; creates the schema only if startup could not."""
+    if not _schema_ready:
+        init_db()
+    return _session_factory()
+
+
+def dispose_engine():
+    global _engine, _session_factory, _schema_ready
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+        _engine = None
+        _session_factory = None
+        _schema_ready = False
+
+
+def pool_stats():
+    """Connection pool utilization of the process-wide engine."""
+    if _engine is None:
+        return {"initialized": False, **pool_counters}
+    return describe_pool(_engine.pool, pool_counters)
+
+
+def describe_pool(pool, counters):
+    """Utilization of a pool sized by DB_POOL_SIZE and DB_MAX_OVERFLOW, with its connection/checkout ``counters``."""
+    capacity = config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW
+    checked_out = pool.checkedout()
+    return {
+        "initialized": True,
+        "pool_size": pool.size(),
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "checked_in": pool.checkedin(),
+        "checked_out": checked_out,
+        "overflow": max(pool.overflow(), 0),
+        "utilization": round(checked_out / capacity, 4) if capacity else 0.0,
+        **counters,
+    }
@@ -1,15 +1,47 @@
+from contextlib import asynccontextmanager
+import logging
 from fastapi import FastAPI, Depends, HTTPException
+from starlette.concurrency import run_in_threadpool
+from backend.config import config
 from backend.database.db_connection import connect_to_db
+from backend.database.db_models import init_db, dispose_engine
+from backend.database.db_async import dispose_async_engine
+from backend.pretrainedModels.bge3_embedding import model_manager
 from backend.routers.file_route import router as file_router
 from backend.routers.query_route import router as embedding_router
 from backend.routers.doc_route import router as doc_router
+from backend.routers.metrics_route import router as metrics_router
+from backend.routers.ingestion_route import router as ingestion_router
+from backend.services.ingestionJobService import ingestion_jobs
+from backend.services.pdfExtractionService import page_extractor
 
-app = FastAPI(docs_url=None, redoc_url=None)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await run_in_threadpool(init_db)
+    except Exception as exc:
+        # The first request retries schema creation, so a database that starts later is not fatal
+        logging.error(f"Database initialization failed at startup: {exc}")
+    model_manager.start()
+    if config.MODEL_WARM_UP_ON_STARTUP:
+        model_manager.warm_up()
+    yield
+    ingestion_jobs.shutdown()
+    page_extractor.shutdown()
+    model_manager.stop()
+    dispose_engine()
+    await dispose_async_engine()
+
+
+app = FastAPI(docs_url=None, redoc_url=None, lifespan=lifespan)
 
 app.include_router(doc_router)
 
 app.include_router(file_router, prefix="/api/v1")
 app.include_router(embedding_router, prefix="/api/v1")
+app.include_router(ingestion_router, prefix="/api/v1")
+app.include_router(metrics_router, prefix="/api/v1")
 
 @app.get("/db_connection")
 async def get_db(db=Depends(connect_to_db)):
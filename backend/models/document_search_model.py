@@ -0,0 +1,18 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator
+from backend.config import config
+
+class DocumentSearchRequest(BaseModel):
+    query: str
+    filenames: Optional[List[str]] = Field(default=None, min_length=1)
+    prefix: Optional[str] = None
+    top_k: int = Field(default=5, ge=1, le=config.SEARCH_MAX_TOP_K)
+    per_document_k: Optional[int] = Field(default=None, ge=1, le=config.SEARCH_MAX_TOP_K)
+    ef_search: Optional[int] = Field(default=None, ge=1, le=1000)
+    probes: Optional[int] = Field(default=None, ge=1)
+
+    @model_validator(mode="after")
+    def check_scope(self):
+        if self.filenames is not None and self.prefix is not None:
+            raise ValueError("Use either filenames or prefix, not both")
+        return self
@@ -0,0 +1,5 @@
+from pydantic import BaseModel
+
+class IngestionJobRequest(BaseModel):
+    URL: str
+    minio_file_name: str
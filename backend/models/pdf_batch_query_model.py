@@ -0,0 +1,9 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from backend.config import config
+
+class FilenameAndQuestionsRequest(BaseModel):
+    filename: str
+    queries: List[str] = Field(min_length=1, max_length=config.MAX_QUESTIONS_PER_REQUEST)
+    ef_search: Optional[int] = Field(default=None, ge=1, le=1000)
+    probes: Optional[int] = Field(default=None, ge=1)
@@ -1,5 +1,9 @@
-from pydantic import BaseModel
+from typing import Literal, Optional
+from pydantic import BaseModel, Field
 
 class FilenameAndQuestionRequest(BaseModel):
     filename: str
-    query: str
\ No newline at end of file
+    query: str
+    ef_search: Optional[int] = Field(default=None, ge=1, le=1000)
+    probes: Optional[int] = Field(default=None, ge=1)
+    mode: Optional[Literal["vector", "hybrid", "keyword"]] = None
@@ -1,5 +1,21 @@
+from contextlib import contextmanager
+import gc
+import logging
+import os
+import threading
+import time
 from transformers import AutoTokenizer, AutoModel
 import torch
+from backend.config import config
+from backend.pretrainedModels.inferenceBackends import build_model, effective_backend, PYTORCH
+
+MODEL_NAME = "BAAI/bge-m3"
+# Identifies the vectors this module produces (model + pooling + inference backend); used as part
+# of embedding cache keys and recorded with each published document. It names the backend that
+# actually runs, so a bf16 fallback to fp32 gets the fp32 id. The fp32 PyTorch id is unchanged so
+# existing cache rows stay valid.
+_BACKEND = effective_backend()
+EMBEDDING_MODEL_ID = f"{MODEL_NAME}:mean" + ("" if _BACKEND == PYTORCH else f":{_BACKEND}")
 
 
 class SingletonModel:
@@ -7,8 +23,234 @@ class SingletonModel:
 
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(SingletonModel, cls).__new__(cls)
-            cls._instance.tokenizer = AutoTokenizer.from_pretrained("BAAI/bge-m3")
-            cls._instance.model = AutoModel.from_pretrained("BAAI/bge-m3").to(
-                'cuda' if torch.cuda.is_available() else 'cpu')
-        return cls._instance
\ No newline at end of file
+            instance = super(SingletonModel, cls).__new__(cls)
+            instance.tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+            instance.model = build_model(
+                lambda: AutoModel.from_pretrained(MODEL_NAME).to('cuda' if torch.cuda.is_available() else 'cpu'),
+                instance.tokenizer,
+            )
+            # Published only once complete, so readers never see a half-loaded instance
+            cls._instance = instance
+        return cls._instance
+
+
+def process_memory_mb():
+    """Current memory footprint in MB: allocated CUDA memory on GPU nodes, resident set size otherwise."""
+    if torch.cuda.is_available():
+        return torch.cuda.memory_allocated() / (1024 * 1024)
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class ModelManager:
+    """
+    Keeps the embedding model resident between requests.
+
+    The model is loaded on first use (or warmed up in the background at startup) and
+    only evicted by the reaper thread when it has been idle for ``idle_timeout``
+    seconds or the process crosses ``memory_watermark_mb``. A model that is in use
+    is never evicted. After a watermark eviction the model is reloaded in the
+    background (``reload_after_eviction``) once memory is back under the watermark;
+    an idle model stays unloaded until the next request.
+
+    Loading is serialized by its own lock, so ``stats`` and the reaper never wait for
+    a multi-second load.
+    """
+
+    def __init__(self, idle_timeout=None, memory_watermark_mb=None, check_interval=None, reload_after_eviction=None):
+        self.idle_timeout = idle_timeout if idle_timeout is not None else config.MODEL_IDLE_TIMEOUT_SECONDS
+        self.memory_watermark_mb = (memory_watermark_mb if memory_watermark_mb is not None
+                                    else config.MODEL_MEMORY_WATERMARK_MB)
+        self.check_interval = check_interval if check_interval is not None else config.MODEL_REAPER_INTERVAL_SECONDS
+        self.reload_after_eviction = (reload_after_eviction if reload_after_eviction is not None
+                                      else config.MODEL_RELOAD_AFTER_EVICTION)
+
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._active_users = 0
+        self._last_used = time.monotonic()
+        self._loader = None
+        self._reaper = None
+        self._stop = threading.Event()
+
+        self.load_count = 0
+        self.evict_count = 0
+        self.idle_evictions = 0
+        self.watermark_evictions = 0
+        self.background_reloads = 0
+        self.last_load_seconds = None
+
+    @property
+    def is_loaded(self):
+        return SingletonModel._instance is not None
+
+    def _load(self):
+        with self._load_lock:
+            if SingletonModel._instance is not None:
+                return SingletonModel._instance
+            start = time.perf_counter()
+            instance = SingletonModel()
+            with self._lock:
+                self.last_load_seconds = time.perf_counter() - start
+                self.load_count += 1
+                self._last_used = time.monotonic()
+            logging.info(f"Loaded embedding model in {self.last_load_seconds:.2f}s (load #{self.load_count})")
+            return instance
+
+    def _acquire(self, hold):
+        # Read the instance and register the user under one lock, so evict cannot run in between
+        while True:
+            with self._lock:
+                instance = SingletonModel._instance
+                if instance is not None:
+                    self._last_used = time.monotonic()
+                    if hold:
+                        self._active_users += 1
+                    return instance
+            self._load()
+
+    def get(self):
+        """Return the resident model, loading it (or waiting for a background load) if needed."""
+        return self._acquire(hold=False)
+
+    @contextmanager
+    def use(self):
+        """Hold the model for the duration of a forward pass so the reaper cannot evict it."""
+        instance = self._acquire(hold=True)
+        try:
+            yield instance
+        finally:
+            with self._lock:
+                self._active_users -= 1
+                self._last_used = time.monotonic()
+                self._idle.notify_all()
+
+    def warm_up(self):
+        """Load the model in a background thread so the first request does not pay for it."""
+        with self._lock:
+            if self.is_loaded or (self._loader is not None and self._loader.is_alive()):
+                return
+            self._loader = threading.Thread(target=self._background_load, name="model-loader", daemon=True)
+            self._loader.start()
+
+    def _background_load(self):
+        try:
+            self._load()
+            with self._lock:
+                # Not counted as use, so a reloaded model can still go idle
+                self._last_used = time.monotonic()
+        except Exception as exc:
+            logging.error(f"Background model load failed: {exc}")
+        finally:
+            self._loader = None
+
+    def evict(self, reason="manual"):
+        """
+        Drop the model and free its memory once no forward pass is using it.
+
+        An "idle" or "watermark" eviction is re-checked after that wait, and skipped if the
+        model was used in the meantime and is no longer due.
+        """
+        with self._lock:
+            while self._active_users:
+                self._idle.wait()
+            if reason in ("idle", "watermark"):
+                reason = self._eviction_reason()
+                if reason is None:
+                    return False
+            instance = SingletonModel._instance
+            if instance is None:
+                return False
+            SingletonModel._instance = None
+            for attribute in ("model", "tokenizer"):
+                if hasattr(instance, attribute):
+                    delattr(instance, attribute)
+            del instance
+            self.evict_count += 1
+            if reason == "idle":
+                self.idle_evictions += 1
+            elif reason == "watermark":
+                self.watermark_evictions += 1
+
+        gc.collect()
+        torch.cuda.empty_cache()
+        logging.info(f"Evicted embedding model ({reason})")
+        return True
+
+    def _eviction_reason(self):
+        """Why the loaded, unused model is due for eviction, or None; called with the lock held."""
+        if self.idle_timeout and time.monotonic() - self._last_used >= self.idle_timeout:
+            return "idle"
+        if self.memory_watermark_mb and process_memory_mb() >= self.memory_watermark_mb:
+            return "watermark"
+        return None
+
+    def check(self):
+        """Evict the model if it has been idle too long or memory crossed the watermark."""
+        with self._lock:
+            if not self.is_loaded or self._active_users:
+                return None
+            reason = self._eviction_reason()
+            if reason is None:
+                return None
+        if not self.evict(reason):
+            return None
+        if reason == "watermark" and self.reload_after_eviction:
+            self._reload_in_background()
+        return reason
+
+    def _reload_in_background(self):
+        """Reload after a watermark eviction, unless memory is still above the watermark without the model."""
+        if process_memory_mb() >= self.memory_watermark_mb:
+            logging.warning("Memory is above the watermark without the embedding model; not reloading it")
+            return
+        with self._lock:
+            self.background_reloads += 1
+        self.warm_up()
+
+    def _reap(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.check()
+            except Exception as exc:
+                logging.error(f"Model reaper check failed: {exc}")
+
+    def start(self):
+        """Start the reaper thread that enforces the idle timeout and memory watermark."""
+        with self._lock:
+            if self._reaper is not None and self._reaper.is_alive():
+                return
+            self._stop.clear()
+            self._reaper = threading.Thread(target=self._reap, name="model-reaper", daemon=True)
+            self._reaper.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._reaper is not None:
+            self._reaper.join()
+            self._reaper = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loaded": self.is_loaded,
+                "active_users": self._active_users,
+                "idle_seconds": round(time.monotonic() - self._last_used, 3),
+                "load_count": self.load_count,
+                "evict_count": self.evict_count,
+                "idle_evictions": self.idle_evictions,
+                "watermark_evictions": self.watermark_evictions,
+                "background_reloads": self.background_reloads,
+                "last_load_seconds": self.last_load_seconds,
+                "idle_timeout_seconds": self.idle_timeout,
+                "memory_watermark_mb": self.memory_watermark_mb,
+                "memory_mb": round(process_memory_mb(), 1),
+            }
+
+
+model_manager = ModelManager()
@@ -0,0 +1,150 @@
+import importlib.util
+import logging
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+import torch
+from backend.config import config
+
+# EMBEDDING_BACKEND values; every backend is called like the transformers model,
+# model(input_ids=..., attention_mask=...), and returns an object with last_hidden_state
+PYTORCH = "pytorch"
+PYTORCH_INT8 = "pytorch_int8"
+PYTORCH_BF16 = "pytorch_bf16"
+ONNX = "onnx"
+BACKENDS = (PYTORCH, PYTORCH_INT8, PYTORCH_BF16, ONNX)
+
+
+def bf16_supported(device):
+    """Whether bf16 autocast runs natively on ``device`` rather than being emulated."""
+    if device.type == "cuda":
+        return torch.cuda.is_bf16_supported()
+    return torch.backends.mkldnn.is_available() and torch.ops.mkldnn._is_mkldnn_bf16_supported()
+
+
+def effective_backend(backend=None, device=None):
+    """
+    The backend ``build_model`` actually runs for ``backend`` on ``device``: pytorch_bf16
+    falls back to pytorch where bf16 is not native.
+    """
+    backend = backend or config.EMBEDDING_BACKEND
+    if backend == PYTORCH_BF16:
+        device = device or torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        if not bf16_supported(device):
+            return PYTORCH
+    return backend
+
+
+class AutocastModel:
+    """Runs the wrapped model's forward pass under bf16 autocast; weights stay fp32."""
+
+    def __init__(self, model):
+        self.model = model
+
+    @property
+    def device(self):
+        return self.model.device
+
+    def __call__(self, **inputs):
+        with torch.autocast(device_type=self.device.type, dtype=torch.bfloat16):
+            return self.model(**inputs)
+
+
+def quantize_int8(model):
+    """Dynamic int8 quantization of the Linear layers: int8 weights, activations quantized per batch on CPU."""
+    return torch.ao.quantization.quantize_dynamic(model.cpu(), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def export_onnx(model, tokenizer, path):
+    """
+    Export the encoder to ONNX with dynamic batch and sequence axes.
+
+    The export is written to a staging directory next to ``path`` and renamed into place,
+    so a crashed or concurrent export never leaves a truncated model that later startups load.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".onnx-export-", dir=directory)
+    try:
+        staged_model = os.path.join(staging, os.path.basename(path))
+        sample = tokenizer(["export sample"], return_tensors="pt")
+        torch.onnx.export(
+            model.cpu().eval(),
+            (),
+            staged_model,
+            kwargs={"input_ids": sample["input_ids"], "attention_mask": sample["attention_mask"]},
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            dynamo=False,
+        )
+        # Weights over 2 GB are saved as external data files beside the model; the model file is renamed
+        # last, as its presence marks a complete export
+        for name in os.listdir(staging):
+            if name != os.path.basename(path):
+                os.replace(os.path.join(staging, name), os.path.join(directory, name))
+        os.replace(staged_model, path)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+class OnnxModel:
+    """ONNX Runtime CPU session with all graph optimizations (fusions, constant folding) enabled."""
+
+    device = torch.device("cpu")
+
+    def __init__(self, path, intra_op_threads=None):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+
+    def __call__(self, **inputs):
+        feed = {name: tensor.cpu().numpy() for name, tensor in inputs.items() if name in self.input_names}
+        (last_hidden_state,) = self.session.run(["last_hidden_state"], feed)
+        return SimpleNamespace(last_hidden_state=torch.from_numpy(last_hidden_state))
+
+
+def build_model(load_model, tokenizer, backend=None, onnx_path=None):
+    """
+    Load the embedding model behind the configured inference backend.
+
+    :param load_model: Callable returning the fp32 transformers model. The ONNX backend only
+        calls it to export the model the first time.
+    :param backend: One of BACKENDS (defaults to config.EMBEDDING_BACKEND).
+    :param onnx_path: Where the ONNX export is cached (defaults to config.ONNX_MODEL_PATH).
+    """
+    backend = backend or config.EMBEDDING_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+
+    if backend == ONNX:
+        onnx_path = onnx_path or config.ONNX_MODEL_PATH
+        required = ["onnxruntime"] if os.path.exists(onnx_path) else ["onnx", "onnxruntime"]
+        missing = [package for package in required if importlib.util.find_spec(package) is None]
+        if missing:
+            raise ValueError(f"The onnx embedding backend needs the {', '.join(missing)} package(s), "
+                             f"which are not installed")
+        if not os.path.exists(onnx_path):
+            logging.info(f"Exporting embedding model to {onnx_path}")
+            export_onnx(load_model(), tokenizer, onnx_path)
+        return OnnxModel(onnx_path, config.ONNX_INTRA_OP_THREADS)
+
+    model = load_model().eval()
+    if backend == PYTORCH_INT8:
+        return quantize_int8(model)
+    if backend == PYTORCH_BF16:
+        if effective_backend(backend, model.device) != PYTORCH_BF16:
+            logging.warning(f"bf16 is not supported natively on {model.device}, using fp32")
+            return model
+        return AutocastModel(model)
+    return model
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from backend.database.db_async import get_async_session
 from backend.models.delete_file_model import FilenameRequest
 from backend.services.fileService import delete_pdf_and_records
 from backend.services.minioClientService import list_files as minio_list_files
+from backend.services.vectorStoreService import list_indexed_files
 
 router = APIRouter(
     prefix="/file",
@@ -18,7 +22,7 @@ async def delete_pdf_and_records_route(request: FilenameRequest):
     - request: An object containing the name of the file.
     """
     try:
-        result = delete_pdf_and_records(request.filename)
+        result = await delete_pdf_and_records(request.filename)
 
         if result["status"] == "success":
             return {"status": "success", "message": result["message"]}
@@ -42,7 +46,14 @@ async def list_files():
 
     - return: List of all downloaded files
     """
-    return minio_list_files()
+    return await run_in_threadpool(minio_list_files)
 
 
+@router.get("/indexed")
+async def list_indexed_files_route(session: AsyncSession = Depends(get_async_session)):
+    """
+    This route brings all files that have embeddings in PostgreSQL
 
+    - return: List of indexed files from the documents catalog with their chunk counts, ids and ingest times
+    """
+    return {"files": await list_indexed_files(session)}
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, HTTPException
+from backend.models.ingestion_job_model import IngestionJobRequest
+from backend.services.ingestionJobService import ingestion_jobs
+
+router = APIRouter(
+    prefix="/ingestion",
+    tags=["Ingestion"]
+)
+
+
+@router.post("/jobs", status_code=202)
+async def submit_ingestion_job(request: IngestionJobRequest):
+    """
+    This route queues a PDF for ingestion and returns immediately.
+
+    Parameters:
+    - request: An object containing the PDF URL and the name to store it under in MinIO.
+
+    - return: The id of the queued job; poll /ingestion/jobs/{job_id} for its progress
+    """
+    job = ingestion_jobs.submit(request.URL, request.minio_file_name)
+    return {"status": "accepted", "job_id": job.id}
+
+
+@router.get("/jobs/{job_id}")
+async def get_ingestion_job(job_id: str):
+    """
+    This route returns the status and progress of an ingestion job.
+
+    - return: Job status, error (if failed), chunks embedded/stored and elapsed time per stage
+    """
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No ingestion job found with id: {job_id}")
+    return job.to_dict()
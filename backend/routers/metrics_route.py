@@ -0,0 +1,85 @@
+from fastapi import APIRouter
+from backend.database.db_models import pool_stats
+from backend.database.db_async import async_pool_stats
+from backend.pretrainedModels.bge3_embedding import model_manager
+from backend.services.embeddingCacheService import embedding_cache
+from backend.services.queryCacheService import query_result_cache
+from backend.services.localVectorCacheService import local_vector_cache
+from backend.services.inferenceScheduler import inference_scheduler
+from backend.services.queryService import query_embedding_batcher
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"]
+)
+
+
+@router.get("/model")
+async def model_metrics():
+    """
+    This route returns the embedding model lifecycle counters.
+
+    - return: Whether the model is resident, load/evict counters and the configured eviction limits
+    """
+    return model_manager.stats()
+
+
+@router.get("/inference")
+async def inference_metrics():
+    """
+    This route returns the inference scheduler counters per priority class.
+
+    - return: Queue depth, submitted/completed/rejected counts, queue wait and service time percentiles
+    """
+    return inference_scheduler.stats()
+
+
+@router.get("/query-batching")
+async def query_batching_metrics():
+    """
+    This route returns the query embedding micro-batcher counters.
+
+    - return: Configured limits, pending questions, batches run, texts embedded and batch sizes
+    """
+    return query_embedding_batcher.stats()
+
+
+@router.get("/embedding-cache")
+async def embedding_cache_metrics():
+    """
+    This route returns the embedding cache counters.
+
+    - return: Size, hit/miss counts per tier and LRU evictions
+    """
+    return embedding_cache.stats()
+
+
+@router.get("/query-cache")
+async def query_cache_metrics():
+    """
+    This route returns the filename query result cache counters.
+
+    - return: Size, hits/misses, LRU evictions, TTL expirations and invalidations
+    """
+    return query_result_cache.stats()
+
+
+@router.get("/local-vector-cache")
+async def local_vector_cache_metrics():
+    """
+    This route returns the local vector cache counters.
+
+    - return: Mapped documents and bytes, hits/misses, loads, exports, evictions and invalidations
+    """
+    return local_vector_cache.stats()
+
+
+@router.get("/db-pool")
+async def db_pool_metrics():
+    """
+    This route returns the database connection pool utilization.
+
+    - return: Per engine ("async" serves searches and queries, "sync" ingestion and maintenance): pool size,
+      checked in/out connections, overflow and connection/checkout counters
+    """
+    return {"async": async_pool_stats(), "sync": pool_stats()}
@@ -1,10 +1,16 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database.db_async import get_async_session
 from backend.models.pdf_by_filename_model import FilenameAndQuestionRequest
 from backend.models.pdf_and_question_model import PdfAndQuestionRequest
-from backend.services.queryService import get_related_chunks_by_filename
-from backend.services.queryService import get_related_chunks
-from backend.services.minioClientService import upload_file
-from backend.services.queryService import process_pdf_chunks
+from backend.models.pdf_batch_query_model import FilenameAndQuestionsRequest
+from backend.models.document_search_model import DocumentSearchRequest
+from backend.services.queryService import get_related_chunks_by_filename_async
+from backend.services.queryService import get_related_chunks_async
+from backend.services.queryService import get_related_chunks_for_questions_async
+from backend.services.queryService import search_documents_async
+from backend.services.ingestionJobService import ingestion_jobs
 
 router = APIRouter(
     prefix="/pdf-query",
@@ -14,7 +20,8 @@ router = APIRouter(
 
 
 @router.post("/from-name/")
-async def query_pdf_by_filename(request: FilenameAndQuestionRequest):
+async def query_pdf_by_filename(request: FilenameAndQuestionRequest,
+                                session: AsyncSession = Depends(get_async_session)):
     """
         Query PDF by Filename.
 
@@ -25,15 +32,22 @@ async def query_pdf_by_filename(request: FilenameAndQuestionRequest):
         :param request: An instance of FilenameAndQuestionRequest containing the following fields:
             - filename (str): The name of the PDF file stored in the database.
             - query (str): The query string used to find related text chunks in the PDF.
+            - ef_search (int, optional): HNSW candidate list size for this request (recall vs latency).
+            - probes (int, optional): ivfflat lists to scan for this request (recall vs latency).
+            - mode (str, optional): 'vector' (embedding search), 'hybrid' (embedding and full-text search
+              fused by reciprocal rank in one SQL query, for questions with exact identifiers) or 'keyword'
+              (full-text search only, no model inference). Defaults to SEARCH_MODE.
 
         :return: A dictionary containing:
             - status (str): The status of the operation ('success' if successful).
             - related_chunks (List[str]): A list of the most related text chunks from the PDF.
-        :raises HTTPException: If an error occurs during processing, an HTTP 500 error is raised with the error details.
+        :raises HTTPException: A 503 with Retry-After if the embedding model is saturated; if an error
+            occurs during processing, an HTTP 500 error is raised with the error details.
         """
     try:
 
-        related_chunks = get_related_chunks_by_filename(request.query, request.filename)
+        related_chunks = await get_related_chunks_by_filename_async(request.query, request.filename, session,
+                                                                    request.ef_search, request.probes, request.mode)
 
         return {
             "status": "success",
@@ -45,13 +59,91 @@ async def query_pdf_by_filename(request: FilenameAndQuestionRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/from-name/batch/")
+async def query_pdf_by_filename_batch(request: FilenameAndQuestionsRequest,
+                                      session: AsyncSession = Depends(get_async_session)):
+    """
+        Query PDF by Filename with several questions.
+
+        Batch version of /from-name/: all questions are embedded in one padded forward pass and
+        all top-k searches are resolved in a single database round trip.
+
+        :param request: An instance of FilenameAndQuestionsRequest containing the following fields:
+            - filename (str): The name of the PDF file stored in the database.
+            - queries (List[str]): The questions, at most MAX_QUESTIONS_PER_REQUEST.
+            - ef_search / probes (int, optional): ANN search knobs for this request, as in /from-name/.
+
+        :return: A dictionary containing:
+            - status (str): The status of the operation ('success' if successful).
+            - results (List[dict]): One entry per question with its query and related_chunks.
+        :raises HTTPException: 404 if the file has no records, 503 with Retry-After if the embedding
+            model is saturated, 500 with the error details for any other error.
+        """
+    try:
+        related_chunks = await get_related_chunks_for_questions_async(request.queries, request.filename, session,
+                                                                      request.ef_search, request.probes)
+
+        return {
+            "status": "success",
+            "results": [
+                {"query": query, "related_chunks": chunks}
+                for query, chunks in zip(request.queries, related_chunks)
+            ]
+        }
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/search/")
+async def search_documents(request: DocumentSearchRequest,
+                           session: AsyncSession = Depends(get_async_session)):
+    """
+        Search several PDFs at once.
+
+        The question is embedded once and searched in a single query over the selected documents:
+        a list of filenames, every filename starting with a prefix, or all documents when neither is given.
+
+        :param request: An instance of DocumentSearchRequest containing the following fields:
+            - query (str): The query string used to find related text chunks.
+            - filenames (List[str], optional): The documents to search.
+            - prefix (str, optional): Search every document whose filename starts with this prefix.
+            - top_k (int): Number of hits over all documents (default 5).
+            - per_document_k (int, optional): Also return this many hits for every document.
+            - ef_search / probes (int, optional): ANN search knobs for this request, as in /from-name/.
+
+        :return: A dictionary containing:
+            - status (str): The status of the operation ('success' if successful).
+            - hits (List[dict]): filename, chunk_index, chunk_text, page_start, page_end and score (distance in VECTOR_DISTANCE_METRIC, lower is closer).
+            - documents (Dict[str, List[dict]]): Per-document hits, only when per_document_k is given.
+        :raises HTTPException: If an error occurs during processing, an HTTP 500 error is raised with the error details.
+        """
+    try:
+        results = await search_documents_async(request.query, session, request.filenames, request.prefix,
+                                               request.top_k, request.per_document_k,
+                                               request.ef_search, request.probes)
+
+        return {
+            "status": "success",
+            **results
+        }
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/from-url/")
-async def process_and_query_pdf(request: PdfAndQuestionRequest):
+async def process_and_query_pdf(request: PdfAndQuestionRequest,
+                                session: AsyncSession = Depends(get_async_session)):
     """
         Process and Query PDF from URL.
 
         This endpoint downloads a PDF from the provided URL, processes it by extracting text chunks,
         uploads the PDF to MinIO, and then queries the most related chunks based on the provided query.
+        The ingestion runs as a job on the ingestion worker pool, so the event loop keeps serving other
+        clients while it is awaited; use /ingestion/jobs to submit without waiting.
 
         :param request: An instance of PdfAndQuestionRequest containing the following fields:
             - URL (str): The URL of the PDF to download.
@@ -64,11 +156,13 @@ async def process_and_query_pdf(request: PdfAndQuestionRequest):
             - related_chunks (List[str]): A list of the most related text chunks from the processed PDF.
         :raises HTTPException: If an error occurs during processing, an HTTP 500 error is raised with the error details.
         """
-    pdf_path = "/tmp/temp_pdf.pdf"
     try:
-        upload_file(request.URL, request.minio_file_name)
-        process_pdf_chunks(pdf_path, request.minio_file_name)
-        related_chunks = get_related_chunks(request.query)
+        job = ingestion_jobs.submit(request.URL, request.minio_file_name)
+        await asyncio.wrap_future(job.future)
+        if job.status == "failed":
+            raise HTTPException(status_code=job.error_status_code, detail=job.error)
+
+        related_chunks = await get_related_chunks_async(request.query, session, document_id=job.document_id)
 
         return {
             "status": "success",
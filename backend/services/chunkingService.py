@@ -0,0 +1,121 @@
+from backend.config import config
+
+
+class Chunk:
+    """A chunk of document text with its model input ids and the (1-based, inclusive) pages it spans."""
+
+    __slots__ = ("text", "input_ids", "page_start", "page_end")
+
+    def __init__(self, text, input_ids, page_start, page_end):
+        self.text = text
+        self.input_ids = input_ids
+        self.page_start = page_start
+        self.page_end = page_end
+
+    def __repr__(self):
+        return f"Chunk(pages={self.page_start}-{self.page_end}, tokens={len(self.input_ids)})"
+
+
+def _page_tokens(page_index, page_text, tokenizer):
+    """Tokenize a page and return its tokens as (page index, id, start offset, end offset, word start)."""
+    encoded = tokenizer([page_text], add_special_tokens=False, return_offsets_mapping=True)
+    return [
+        (page_index, token_id, start, end, start == 0 or page_text[start - 1].isspace())
+        for token_id, (start, end) in zip(encoded["input_ids"][0], encoded["offset_mapping"][0])
+    ]
+
+
+def _window_end(tokens, limit):
+    """End of the window at the start of ``tokens``, moved back to a word boundary unless that halves it."""
+    end = min(limit, len(tokens))
+    if end == len(tokens):
+        return end
+    boundary = end
+    while boundary > limit // 2 and not tokens[boundary][4]:
+        boundary -= 1
+    return boundary if tokens[boundary][4] else end
+
+
+def _chunk_text(texts, tokens):
+    """Source text covered by ``tokens``, joining page pieces with a newline."""
+    pieces = []
+    for token in tokens:
+        page_index, _, start, end, _ = token
+        if pieces and pieces[-1][0] == page_index:
+            pieces[-1][2] = end
+        else:
+            pieces.append([page_index, start, end])
+    return "\n".join(texts[page_index][start:end] for page_index, start, end in pieces)
+
+
+def _cut_chunk(texts, tokens, limit, overlap_tokens, tokenizer):
+    """Cut the first chunk off ``tokens``; return it and where the next chunk starts (None after the last one)."""
+    end = _window_end(tokens, limit)
+    window = tokens[:end]
+    chunk = Chunk(
+        text=_chunk_text(texts, window),
+        input_ids=tokenizer.build_inputs_with_special_tokens([token[1] for token in window]),
+        page_start=window[0][0] + 1,
+        page_end=window[-1][0] + 1,
+    )
+    if end == len(tokens):
+        return chunk, None
+    # The overlap starts on a word boundary too
+    next_start = max(end - overlap_tokens, 1)
+    while next_start < end and not tokens[next_start][4]:
+        next_start += 1
+    return chunk, next_start
+
+
+def iter_chunks(pages, tokenizer, target_tokens=None, overlap_tokens=None):
+    """
+    Pack the text of ``pages`` into chunks of ``target_tokens`` model tokens, as a generator.
+
+    The pages form one token stream, so chunks flow across page boundaries instead of
+    leaving a short tail per page. Consecutive chunks share ``overlap_tokens`` tokens, and
+    windows end on a word boundary where possible. Every chunk carries its input ids,
+    special tokens included, so the embedding stage does not tokenize it again.
+
+    ``pages`` may be any iterable: pages are tokenized as they arrive and only the tokens of
+    the chunk being built are kept, so memory does not grow with the document.
+
+    :param pages: Text of every page, in order.
+    :param target_tokens: Tokens per chunk including special tokens (defaults to config.CHUNK_TARGET_TOKENS).
+    :param overlap_tokens: Tokens repeated between consecutive chunks (defaults to config.CHUNK_OVERLAP_TOKENS).
+    :return: A generator of Chunk.
+    """
+    target_tokens = target_tokens or config.CHUNK_TARGET_TOKENS
+    overlap_tokens = config.CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+    limit = target_tokens - tokenizer.num_special_tokens_to_add()
+    if not 0 <= overlap_tokens < limit // 2:
+        raise ValueError(f"Chunk overlap must be between 0 and {limit // 2 - 1} tokens, got {overlap_tokens}")
+
+    texts = {}
+    tokens = []
+    for page_index, page_text in enumerate(pages):
+        texts[page_index] = page_text
+        tokens += _page_tokens(page_index, page_text, tokenizer)
+        # A window is only cut once the token after it is known, to find its word boundary
+        while len(tokens) > limit:
+            chunk, next_start = _cut_chunk(texts, tokens, limit, overlap_tokens, tokenizer)
+            yield chunk
+            tokens = tokens[next_start:]
+        first_page = tokens[0][0] if tokens else page_index + 1
+        for stale_page in [index for index in texts if index < first_page]:
+            del texts[stale_page]
+
+    while tokens:
+        chunk, next_start = _cut_chunk(texts, tokens, limit, overlap_tokens, tokenizer)
+        yield chunk
+        if next_start is None:
+            break
+        tokens = tokens[next_start:]
+
+
+def chunk_pages(pages, tokenizer, target_tokens=None, overlap_tokens=None):
+    """
+    Chunk a whole document at once; see iter_chunks.
+
+    :return: A list of Chunk.
+    """
+    return list(iter_chunks(pages, tokenizer, target_tokens, overlap_tokens))
@@ -0,0 +1,101 @@
+import threading
+import time
+from backend.config import config
+
+
+class _PendingText:
+    __slots__ = ("text", "done", "embedding", "error")
+
+    def __init__(self, text):
+        self.text = text
+        self.done = False
+        self.embedding = None
+        self.error = None
+
+
+class EmbeddingBatcher:
+    """
+    Cross-request micro-batcher for query embeddings.
+
+    Concurrent callers of ``embed`` are collected into one forward pass. The first
+    caller to find the batcher idle becomes the leader: it waits until
+    ``max_batch_size`` texts are pending or ``max_wait_ms`` has passed, runs
+    ``embed_fn`` on the batch and fans the vectors back out. Texts that arrive while
+    a batch is running are picked up by the next leader, so batches grow with load
+    while a lone request only pays ``max_wait_ms``.
+    """
+
+    def __init__(self, embed_fn, max_batch_size=None, max_wait_ms=None):
+        self.embed_fn = embed_fn
+        self.max_batch_size = max_batch_size or config.QUERY_BATCH_MAX_SIZE
+        self.max_wait_ms = max_wait_ms if max_wait_ms is not None else config.QUERY_BATCH_MAX_WAIT_MS
+        self._pending = []
+        self._condition = threading.Condition()
+        self._running = False
+
+        self.batches = 0
+        self.texts = 0
+        self.largest_batch = 0
+
+    def _collect(self):
+        """Wait for the batch to fill or the wait window to close; called with the lock held."""
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while len(self._pending) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._condition.wait(remaining)
+        batch = self._pending[:self.max_batch_size]
+        del self._pending[:self.max_batch_size]
+        return batch
+
+    def embed(self, text):
+        """Embed ``text`` as part of the next batch and return its vector."""
+        item = _PendingText(text)
+        with self._condition:
+            self._pending.append(item)
+            self._condition.notify_all()
+
+        while True:
+            with self._condition:
+                while not item.done and self._running:
+                    self._condition.wait()
+                if item.done:
+                    break
+                self._running = True
+                batch = self._collect()
+
+            embeddings, error = None, None
+            try:
+                embeddings = self.embed_fn([pending.text for pending in batch])
+            except Exception as exc:
+                error = exc
+
+            with self._condition:
+                for position, pending in enumerate(batch):
+                    if error is None:
+                        pending.embedding = embeddings[position]
+                    else:
+                        pending.error = error
+                    pending.done = True
+                self.batches += 1
+                self.texts += len(batch)
+                self.largest_batch = max(self.largest_batch, len(batch))
+                self._running = False
+                self._condition.notify_all()
+
+        if item.error is not None:
+            raise item.error
+        return item.embedding
+
+    def stats(self):
+        with self._condition:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "pending": len(self._pending),
+                "batches": self.batches,
+                "texts": self.texts,
+                "largest_batch": self.largest_batch,
+                "average_batch_size": round(self.texts / self.batches, 3) if self.batches else 0.0,
+            }
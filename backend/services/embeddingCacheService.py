@@ -0,0 +1,222 @@
+import hashlib
+import logging
+import threading
+import time
+import unicodedata
+from datetime import timedelta
+from collections import OrderedDict
+import numpy as np
+from sqlalchemy import delete, select, update, func, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from backend.config import config
+from backend.database.db_models import create_db_and_table, EmbeddingCacheEntry
+from backend.pretrainedModels.bge3_embedding import EMBEDDING_MODEL_ID
+
+
+def normalize_text(text):
+    """Normalize unicode forms and whitespace so trivially different inputs share a cache key."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def text_hash(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier, content-addressed embedding cache.
+
+    Entries are keyed by (model id, sha256 of the normalized text). The first tier is
+    an in-process LRU bounded by ``max_entries``; the second is the shared
+    ``tb_embedding_cache`` table, so every worker benefits from every other worker's
+    forward passes. Database errors are logged and treated as misses.
+
+    Only lookups and writes with ``shared=True`` (query texts) use the table; ingestion
+    chunks stay in process, their vectors are already stored in tb_embeddings. Rows not
+    used for ``db_ttl_seconds`` and rows beyond ``db_max_rows`` are pruned at most every
+    ``prune_interval`` seconds, on write.
+    """
+
+    # Hits refresh last_used_at at most this often, so hot rows are not rewritten on every lookup
+    TOUCH_INTERVAL = timedelta(hours=1)
+
+    def __init__(self, model_id=EMBEDDING_MODEL_ID, max_entries=None, use_db=None, db_ttl_seconds=None,
+                 db_max_rows=None, prune_interval=None):
+        self.model_id = model_id
+        self.max_entries = max_entries if max_entries is not None else config.EMBEDDING_CACHE_SIZE
+        self.use_db = use_db if use_db is not None else config.EMBEDDING_CACHE_DB_ENABLED
+        self.db_ttl_seconds = db_ttl_seconds if db_ttl_seconds is not None else config.EMBEDDING_CACHE_DB_TTL_SECONDS
+        self.db_max_rows = db_max_rows if db_max_rows is not None else config.EMBEDDING_CACHE_DB_MAX_ROWS
+        self.prune_interval = (prune_interval if prune_interval is not None
+                               else config.EMBEDDING_CACHE_DB_PRUNE_INTERVAL_SECONDS)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_prune = None
+
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.pruned_rows = 0
+
+    def _remember(self, key, embedding):
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _fetch_from_db(self, keys):
+        session = create_db_and_table()
+        try:
+            rows = session.query(EmbeddingCacheEntry.text_hash, EmbeddingCacheEntry.embedding).filter(
+                EmbeddingCacheEntry.model_id == self.model_id,
+                EmbeddingCacheEntry.text_hash.in_(keys)
+            ).all()
+            found = {row.text_hash: np.asarray(row.embedding, dtype=np.float32) for row in rows}
+            if found:
+                session.execute(update(EmbeddingCacheEntry).where(
+                    EmbeddingCacheEntry.model_id == self.model_id,
+                    EmbeddingCacheEntry.text_hash.in_(list(found)),
+                    EmbeddingCacheEntry.last_used_at < func.now() - self.TOUCH_INTERVAL,
+                ).values(last_used_at=func.now()))
+                session.commit()
+            return found
+        finally:
+            session.close()
+
+    def _store_in_db(self, entries):
+        session = create_db_and_table()
+        try:
+            statement = insert(EmbeddingCacheEntry).values([
+                {"model_id": self.model_id, "text_hash": key, "embedding": embedding}
+                for key, embedding in entries.items()
+            ]).on_conflict_do_nothing(index_elements=["model_id", "text_hash"])
+            session.execute(statement)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def prune_db(self):
+        """Delete shared rows unused for ``db_ttl_seconds`` and the least recently used beyond ``db_max_rows``."""
+        session = create_db_and_table()
+        try:
+            expired = session.execute(delete(EmbeddingCacheEntry).where(
+                EmbeddingCacheEntry.last_used_at < func.now() - timedelta(seconds=self.db_ttl_seconds)
+            )).rowcount
+            surplus = (
+                select(EmbeddingCacheEntry.model_id, EmbeddingCacheEntry.text_hash)
+                .order_by(EmbeddingCacheEntry.last_used_at.desc())
+                .offset(self.db_max_rows)
+            )
+            trimmed = session.execute(delete(EmbeddingCacheEntry).where(
+                tuple_(EmbeddingCacheEntry.model_id, EmbeddingCacheEntry.text_hash).in_(surplus)
+            )).rowcount
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        with self._lock:
+            self.pruned_rows += expired + trimmed
+        return expired + trimmed
+
+    def _maybe_prune(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._last_prune is not None and now - self._last_prune < self.prune_interval:
+                return
+            self._last_prune = now
+        try:
+            pruned = self.prune_db()
+            if pruned:
+                logging.info(f"Pruned {pruned} rows from the embedding cache table")
+        except Exception as exc:
+            logging.warning(f"Embedding cache prune failed: {exc}")
+
+    def get_many(self, texts, shared=True):
+        """
+        Look up cached embeddings.
+
+        :param texts: The texts to look up.
+        :param shared: Whether misses of the in-process tier are looked up in the shared table.
+        :return: A list aligned with ``texts`` holding a float32 vector or None for each miss.
+        """
+        keys = [text_hash(text) for text in texts]
+        results = [None] * len(texts)
+        missing = {}
+
+        with self._lock:
+            for position, key in enumerate(keys):
+                embedding = self._entries.get(key)
+                if embedding is not None:
+                    self._entries.move_to_end(key)
+                    results[position] = embedding
+                    self.memory_hits += 1
+                else:
+                    missing.setdefault(key, []).append(position)
+
+        if missing and shared and self.use_db:
+            try:
+                found = self._fetch_from_db(list(missing))
+            except Exception as exc:
+                logging.warning(f"Embedding cache lookup failed, recomputing: {exc}")
+                found = {}
+            for key, embedding in found.items():
+                self._remember(key, embedding)
+                for position in missing.pop(key):
+                    results[position] = embedding
+                    self.db_hits += 1
+
+        self.misses += sum(len(positions) for positions in missing.values())
+        return results
+
+    def get(self, text):
+        return self.get_many([text])[0]
+
+    def put_many(self, texts, embeddings, shared=True):
+        """Store freshly computed embeddings in process and, when ``shared``, in the shared table."""
+        entries = {}
+        for text, embedding in zip(texts, embeddings):
+            key = text_hash(text)
+            embedding = np.asarray(embedding, dtype=np.float32)
+            entries[key] = embedding
+            self._remember(key, embedding)
+
+        if entries and shared and self.use_db:
+            try:
+                self._store_in_db(entries)
+            except Exception as exc:
+                logging.warning(f"Embedding cache write failed: {exc}")
+            self._maybe_prune()
+
+    def put(self, text, embedding):
+        self.put_many([text], [embedding])
+
+    def clear(self):
+        """Drop the in-process tier (the shared table is left untouched)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        hits = self.memory_hits + self.db_hits
+        lookups = hits + self.misses
+        return {
+            "model_id": self.model_id,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "pruned_rows": self.pruned_rows,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+embedding_cache = EmbeddingCache()
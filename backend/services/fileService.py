@@ -1,11 +1,14 @@
 from minio import Minio
 from minio.error import S3Error
-from sqlalchemy import delete
+from starlette.concurrency import run_in_threadpool
 from backend.config import config
-from backend.database.db_models import create_db_and_table, PdfEmbedding
+from backend.database.db_async import create_async_session
+from backend.services.queryCacheService import query_result_cache
+from backend.services.localVectorCacheService import local_vector_cache
+from backend.services.vectorStoreService import delete_records
 from fastapi import HTTPException
 
-def delete_pdf_and_records(filename):
+async def delete_pdf_and_records(filename):
     minio_client = Minio(
         config.MINIO_ENDPOINT,
         access_key=config.MINIO_ACCESS_KEY,
@@ -14,32 +17,36 @@ def delete_pdf_and_records(filename):
     )
 
     try:
-        minio_client.remove_object(config.MINIO_BUCKET_NAME, filename)
+        await run_in_threadpool(minio_client.remove_object, config.MINIO_BUCKET_NAME, filename)
         print(f"Successfully deleted {filename} from MinIO bucket {config.MINIO_BUCKET_NAME}")
     except S3Error as e:
         print(f"Error deleting the file from MinIO: {e}")
         return {"status": "error", "message": f"Failed to delete {filename} from MinIO"}
 
-    session = create_db_and_table()
+    async with create_async_session() as session:
+        try:
 
-    try:
-
-        deleted_rows = session.query(PdfEmbedding).filter(PdfEmbedding.filename == filename).delete()
+            try:
+                deleted_rows = await delete_records(session, filename)
+            finally:
+                # Only once the delete committed: a search running before that would cache the old
+                # rows again under the new version
+                query_result_cache.invalidate(filename)
+                local_vector_cache.invalidate(filename)
 
-        if deleted_rows == 0:
+            if deleted_rows == 0:
 
-            raise HTTPException(status_code=404, detail=f"No records found for filename {filename}")
+                raise HTTPException(status_code=404, detail=f"No records found for filename {filename}")
 
-        session.commit()
-        print(f"Successfully deleted records with filename {filename} from PostgreSQL")
-        return {"status": "success", "message": f"Deleted {filename} from MinIO and PostgreSQL"}
+            print(f"Successfully deleted records with filename {filename} from PostgreSQL")
+            return {"status": "success", "message": f"Deleted {filename} from MinIO and PostgreSQL"}
 
-    except HTTPException as http_exc:
+        except HTTPException as http_exc:
 
-        raise http_exc
+            raise http_exc
 
-    except Exception as e:
+        except Exception as e:
 
-        print(f"Error deleting records from PostgreSQL: {e}")
-        session.rollback()
-        return {"status": "error", "message": f"Failed to delete records for {filename} from PostgreSQL"}
+            print(f"Error deleting records from PostgreSQL: {e}")
+            await session.rollback()
+            return {"status": "error", "message": f"Failed to delete records for {filename} from PostgreSQL"}
@@ -0,0 +1,148 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from fastapi import HTTPException
+from backend.config import config
+
+INTERACTIVE = "interactive"
+INGESTION = "ingestion"
+
+
+class _ClassStats:
+    def __init__(self, window):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_seconds = deque(maxlen=window)
+        self.service_seconds = deque(maxlen=window)
+
+    @staticmethod
+    def _summary(samples):
+        if not samples:
+            return {"avg_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(samples)
+        return {
+            "avg_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+            "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+            "max_ms": round(ordered[-1] * 1000, 3),
+        }
+
+    def to_dict(self):
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "queue_wait": self._summary(self.wait_seconds),
+            "service_time": self._summary(self.service_seconds),
+        }
+
+
+class InferenceScheduler:
+    """
+    Serializes forward passes on the shared model with priority classes.
+
+    A single dispatcher thread runs one work item (one forward pass) at a time and
+    always drains the interactive queue before taking the next ingestion item, so
+    query embeddings preempt bulk ingestion between batches. Queues are bounded:
+    a full interactive queue rejects with 503 and a Retry-After estimate, while
+    ingestion callers block until there is room, which pushes backpressure back to
+    the ingestion workers.
+    """
+
+    def __init__(self, interactive_depth=None, ingestion_depth=None, stats_window=1000):
+        self.max_depth = {
+            INTERACTIVE: interactive_depth or config.INFERENCE_INTERACTIVE_QUEUE_DEPTH,
+            INGESTION: ingestion_depth or config.INFERENCE_INGESTION_QUEUE_DEPTH,
+        }
+        self._queues = {INTERACTIVE: deque(), INGESTION: deque()}
+        self._stats = {priority: _ClassStats(stats_window) for priority in self._queues}
+        self._condition = threading.Condition()
+        self._dispatcher = None
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            self._dispatcher = threading.Thread(target=self._dispatch, name="inference-dispatcher", daemon=True)
+            self._dispatcher.start()
+
+    def retry_after_seconds(self, priority):
+        """Estimate how long the current backlog of ``priority`` takes to drain."""
+        service = self._stats[priority].service_seconds
+        average = sum(service) / len(service) if service else 1.0
+        return max(1, math.ceil(len(self._queues[priority]) * average))
+
+    def run(self, priority, fn, *args):
+        """
+        Run ``fn(*args)`` on the dispatcher thread and return its result.
+
+        :raises HTTPException: 503 with Retry-After if the interactive queue is full.
+        """
+        future = Future()
+        with self._condition:
+            queue = self._queues[priority]
+            if priority == INTERACTIVE and len(queue) >= self.max_depth[priority]:
+                self._stats[priority].rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Embedding model is saturated, please retry later",
+                    headers={"Retry-After": str(self.retry_after_seconds(priority))},
+                )
+            while len(queue) >= self.max_depth[priority]:
+                self._condition.wait()
+
+            queue.append((time.monotonic(), fn, args, future))
+            self._stats[priority].submitted += 1
+            self._ensure_dispatcher()
+            self._condition.notify_all()
+
+        return future.result()
+
+    def _next_item(self):
+        with self._condition:
+            while not any(self._queues.values()):
+                self._condition.wait()
+            priority = INTERACTIVE if self._queues[INTERACTIVE] else INGESTION
+            item = self._queues[priority].popleft()
+            self._condition.notify_all()
+            return priority, item
+
+    def _dispatch(self):
+        while True:
+            priority, (enqueued_at, fn, args, future) = self._next_item()
+            started_at = time.monotonic()
+            try:
+                future.set_result(fn(*args))
+                failed = False
+            except BaseException as exc:
+                logging.error(f"{priority} inference failed: {exc}")
+                future.set_exception(exc)
+                failed = True
+            finished_at = time.monotonic()
+
+            with self._condition:
+                stats = self._stats[priority]
+                stats.wait_seconds.append(started_at - enqueued_at)
+                stats.service_seconds.append(finished_at - started_at)
+                if failed:
+                    stats.failed += 1
+                else:
+                    stats.completed += 1
+
+    def stats(self):
+        with self._condition:
+            return {
+                priority: {
+                    "queue_depth": len(self._queues[priority]),
+                    "max_queue_depth": self.max_depth[priority],
+                    **self._stats[priority].to_dict(),
+                }
+                for priority in self._queues
+            }
+
+
+inference_scheduler = InferenceScheduler()
@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from backend.config import config
+from backend.services.ingestionProgress import IngestionProgress
+from backend.services.minioClientService import upload_file
+from backend.services.queryService import process_pdf_chunks
+
+
+class IngestionJob:
+    """A single download -> extract -> embed -> store run and its progress."""
+
+    def __init__(self, URL, minio_file_name):
+        self.id = uuid.uuid4().hex
+        self.URL = URL
+        self.minio_file_name = minio_file_name
+        self.status = "queued"
+        self.document_id = None
+        self.error = None
+        self.error_status_code = None
+        self.progress = IngestionProgress()
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+
+    @property
+    def done(self):
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self):
+        now = self.finished_at or time.time()
+        return {
+            "job_id": self.id,
+            "filename": self.minio_file_name,
+            "document_id": self.document_id,
+            "status": self.status,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": round(now - (self.started_at or now), 3),
+            **self.progress.to_dict(),
+        }
+
+
+class IngestionJobManager:
+    """
+    Runs ingestion jobs on a bounded worker pool, off the event loop.
+
+    At most ``max_pending`` jobs may be queued or running; further submissions are
+    rejected with 503 and a Retry-After header. Finished jobs are kept for status
+    lookups until ``retention`` newer jobs have been submitted. Jobs live in the
+    memory of the worker process that accepted them.
+    """
+
+    def __init__(self, max_workers=None, max_pending=None, retention=None):
+        self.max_workers = max_workers or config.INGESTION_WORKERS
+        self.max_pending = max_pending or config.INGESTION_MAX_PENDING_JOBS
+        self.retention = retention or config.INGESTION_JOB_RETENTION
+        self._executor = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingestion")
+        return self._executor
+
+    def active_count(self):
+        return sum(1 for job in self._jobs.values() if not job.done)
+
+    def submit(self, URL, minio_file_name):
+        """Queue a job and return it immediately."""
+        with self._lock:
+            if self.active_count() >= self.max_pending:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Ingestion queue is full, please retry later",
+                    headers={"Retry-After": str(config.INGESTION_RETRY_AFTER_SECONDS)},
+                )
+            job = IngestionJob(URL, minio_file_name)
+            self._jobs[job.id] = job
+            self._prune()
+            job.future = self._get_executor().submit(self._run, job)
+        logging.info(f"Queued ingestion job {job.id} for {minio_file_name}")
+        return job
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(self._jobs) - self.retention)]:
+            del self._jobs[job_id]
+
+    def _run(self, job):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            with job.progress.stage("download"):
+                pdf = upload_file(job.URL, job.minio_file_name)
+            try:
+                job.document_id = process_pdf_chunks(pdf.source, job.minio_file_name, progress=job.progress,
+                                                     content_hash=pdf.sha256)
+            finally:
+                pdf.cleanup()
+            job.status = "succeeded"
+            logging.info(f"Ingestion job {job.id} for {job.minio_file_name} succeeded")
+        except HTTPException as e:
+            job.error = e.detail
+            job.error_status_code = e.status_code
+            job.status = "failed"
+        except Exception as e:
+            logging.error(f"Ingestion job {job.id} for {job.minio_file_name} failed: {e}")
+            job.error = str(e)
+            job.error_status_code = 500
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+ingestion_jobs = IngestionJobManager()
@@ -0,0 +1,183 @@
+import logging
+import queue
+import threading
+import time
+from backend.config import config
+
+_END = object()
+
+
+class PipelineAborted(Exception):
+    """Raised in the remaining stages once the pipeline is closed or aborted."""
+
+
+class StageQueue:
+    """
+    Bounded hand-off between two pipeline stages.
+
+    ``put`` blocks while the queue is full, so a fast producer waits for its consumer
+    (backpressure) and at most ``maxsize`` items are in flight between the two stages.
+    """
+
+    POLL_SECONDS = 0.1
+
+    def __init__(self, name, maxsize, pipeline):
+        self.name = name
+        self.maxsize = maxsize
+        self._queue = queue.Queue(maxsize)
+        self._pipeline = pipeline
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._occupancy_total = 0
+        self._peak = 0
+        # Time the consumer spent waiting for items; not counted as its busy time
+        self.wait_seconds = 0.0
+
+    def put(self, item):
+        while True:
+            self._pipeline.check()
+            try:
+                self._queue.put(item, timeout=self.POLL_SECONDS)
+                break
+            except queue.Full:
+                continue
+        if item is not _END:
+            occupancy = self._queue.qsize()
+            with self._lock:
+                self._puts += 1
+                self._occupancy_total += occupancy
+                self._peak = max(self._peak, occupancy)
+
+    def close(self):
+        self.put(_END)
+
+    def __iter__(self):
+        while True:
+            start = time.perf_counter()
+            while True:
+                self._pipeline.check()
+                try:
+                    item = self._queue.get(timeout=self.POLL_SECONDS)
+                    break
+                except queue.Empty:
+                    continue
+            self.wait_seconds += time.perf_counter() - start
+            if item is _END:
+                return
+            yield item
+
+    def stats(self):
+        """Capacity, peak and mean occupancy (sampled after every put)."""
+        with self._lock:
+            mean = self._occupancy_total / self._puts if self._puts else 0.0
+            return {"capacity": self.maxsize, "peak": self._peak, "mean": round(mean, 2)}
+
+
+class IngestionPipeline:
+    """
+    Runs ingestion stages concurrently, one thread per stage, connected by bounded StageQueues.
+
+    The first exception raised in any stage stops the others and is re-raised wherever
+    the pipeline is read, so a failed stage fails the ingest instead of hanging it. Busy
+    time and item counts per stage, and queue occupancy, are reported to ``progress``.
+
+    Usage:
+        with IngestionPipeline(progress) as pipeline:
+            pages = pipeline.stage("extract", page_iterable)
+            chunks = pipeline.stage("chunk", chunker(pages), upstream=pages)
+            for item in pipeline.drain("store", chunks):
+                ...
+    """
+
+    def __init__(self, progress=None, queue_depth=None):
+        self.progress = progress
+        self.queue_depth = queue_depth or config.INGESTION_PIPELINE_QUEUE_DEPTH
+        self._lock = threading.Lock()
+        self._error = None
+        self._threads = []
+        self._queues = []
+        self._busy = {}
+
+    def check(self):
+        """Raise the error of a failed stage, if any."""
+        if self._error is not None:
+            raise self._error
+
+    def fail(self, exc):
+        with self._lock:
+            if self._error is None:
+                self._error = exc
+
+    def _record(self, name, seconds, items):
+        with self._lock:
+            busy = self._busy.setdefault(name, [0.0, 0])
+            busy[0] += seconds
+            busy[1] += items
+        if self.progress:
+            self.progress.add_stage_time(name, seconds, items)
+
+    def stage(self, name, items, upstream=None, count=None):
+        """
+        Iterate ``items`` in a new thread and return the StageQueue its results are put on.
+
+        :param items: Iterable producing the stage's output, usually a generator over ``upstream``.
+        :param upstream: The StageQueue ``items`` reads from, so waiting on it is not counted as busy time.
+        :param count: Optional callable giving the number of units (pages, chunks) in an output item.
+        """
+        output = StageQueue(name, self.queue_depth, self)
+        self._queues.append(output)
+        if self.progress:
+            self.progress.track_queue(name, output)
+
+        def run():
+            iterator = iter(items)
+            try:
+                while True:
+                    start = time.perf_counter()
+                    waited = upstream.wait_seconds if upstream else 0.0
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        break
+                    waited = (upstream.wait_seconds if upstream else 0.0) - waited
+                    self._record(name, time.perf_counter() - start - waited, count(item) if count else 1)
+                    output.put(item)
+                output.close()
+            except Exception as exc:
+                self.fail(exc)
+            finally:
+                close = getattr(iterator, "close", None)
+                if close:
+                    close()
+
+        thread = threading.Thread(target=run, name=f"ingest-{name}", daemon=True)
+        self._threads.append(thread)
+        thread.start()
+        return output
+
+    def drain(self, name, upstream, count=None):
+        """Yield the items of ``upstream`` in the calling thread, timing the caller's work on each as stage ``name``."""
+        for item in upstream:
+            start = time.perf_counter()
+            yield item
+            self._record(name, time.perf_counter() - start, count(item) if count else 1)
+
+    def stats(self):
+        with self._lock:
+            stages = {
+                name: {"seconds": round(seconds, 3), "items": items,
+                       "items_per_second": round(items / seconds, 1) if seconds else None}
+                for name, (seconds, items) in self._busy.items()
+            }
+        return {"stages": stages, "queues": {stage_queue.name: stage_queue.stats() for stage_queue in self._queues}}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        # Stages still running at this point have nobody left to read their output
+        self.fail(PipelineAborted("Ingestion pipeline closed"))
+        for thread in self._threads:
+            thread.join()
+        logging.info(f"Ingestion pipeline stats: {self.stats()}")
+        return False
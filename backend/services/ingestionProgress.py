@@ -0,0 +1,84 @@
+from contextlib import contextmanager
+import threading
+import time
+
+
+class IngestionProgress:
+    """Thread-safe counters and per-stage timings for a single document ingest."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.current_stage = None
+        self.stage_seconds = {}
+        self.stage_items = {}
+        self._queues = {}
+        self.chunks_total = 0
+        self.chunks_embedded = 0
+        self.chunks_stored = 0
+        self.chunks_reused = 0
+        # Filename of an indexed document with the same content, whose chunks were reused
+        self.deduplicated_from = None
+
+    @contextmanager
+    def stage(self, name):
+        """Time a pipeline stage; repeated stages accumulate."""
+        with self._lock:
+            self.current_stage = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + elapsed
+                self.current_stage = None
+
+    def add_stage_time(self, name, seconds, items=0):
+        """Accumulate busy time and processed items of a stage that runs concurrently with others."""
+        with self._lock:
+            self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + seconds
+            self.stage_items[name] = self.stage_items.get(name, 0) + items
+
+    def track_queue(self, name, stage_queue):
+        """Report the occupancy of a pipeline queue (anything with a stats() method) under ``name``."""
+        with self._lock:
+            self._queues[name] = stage_queue
+
+    def set_total(self, chunks_total):
+        with self._lock:
+            self.chunks_total = chunks_total
+
+    def add_total(self, count):
+        with self._lock:
+            self.chunks_total += count
+
+    def add_embedded(self, count):
+        with self._lock:
+            self.chunks_embedded += count
+
+    def add_reused(self, count):
+        """Chunks whose stored embedding was kept by an in-place update."""
+        with self._lock:
+            self.chunks_reused += count
+
+    def add_stored(self, count):
+        with self._lock:
+            self.chunks_stored += count
+
+    def to_dict(self):
+        with self._lock:
+            throughput = {
+                name: round(items / self.stage_seconds[name], 1)
+                for name, items in self.stage_items.items() if self.stage_seconds.get(name)
+            }
+            return {
+                "current_stage": self.current_stage,
+                "chunks_total": self.chunks_total,
+                "chunks_embedded": self.chunks_embedded,
+                "chunks_stored": self.chunks_stored,
+                "chunks_reused": self.chunks_reused,
+                "deduplicated_from": self.deduplicated_from,
+                "stage_seconds": {name: round(seconds, 3) for name, seconds in self.stage_seconds.items()},
+                "stage_items_per_second": throughput,
+                "queues": {name: stage_queue.stats() for name, stage_queue in self._queues.items()},
+            }
@@ -0,0 +1,277 @@
+import os
+import json
+import glob
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from backend.config import config
+from backend.database.db_models import create_db_and_table, PdfEmbedding, Document
+
+
+class _MappedDocument:
+    """Embeddings of one document, memory-mapped from its .npy file, and its chunk texts."""
+
+    def __init__(self, token, path, matrix, texts, nbytes):
+        self.token = token
+        self.path = path
+        self.matrix = matrix
+        self.texts = texts
+        self.nbytes = nbytes
+        # Row norms for cosine/l2 are computed once per mapping, not per query
+        self.norms = np.linalg.norm(matrix, axis=1) if config.VECTOR_DISTANCE_METRIC != "inner_product" else None
+        self.checked_at = time.monotonic()
+
+
+class LocalVectorCache:
+    """
+    In-process vector tier for hot documents.
+
+    A document becomes hot after ``min_lookups`` vector searches. Its embeddings are then
+    exported once to a float32 .npy file (and its chunk texts to a .json file) under
+    ``directory`` and memory-mapped, so every uvicorn worker on the host shares the same
+    pages through the page cache. Searches of a hot document are exact top-k over the
+    mapping (one matmul and an argpartition) with no database round trip.
+
+    Mapped documents are evicted LRU once they exceed ``max_bytes``. Files are named
+    after the catalog state of the document (id, partition, publish time), so a
+    re-ingested document never matches an old file. ``invalidate`` drops the mapping and
+    deletes the files, which the other workers notice on their next lookup; every
+    ``revalidate_seconds`` a mapping is also checked against tb_documents.
+    """
+
+    # Filenames whose lookups are counted towards becoming hot
+    MAX_TRACKED = 4096
+
+    def __init__(self, directory=None, max_bytes=None, min_lookups=None, revalidate_seconds=None, enabled=None):
+        self.enabled = enabled if enabled is not None else config.LOCAL_VECTOR_CACHE_ENABLED
+        self.directory = directory or config.LOCAL_VECTOR_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else config.LOCAL_VECTOR_CACHE_MAX_BYTES
+        self.min_lookups = min_lookups if min_lookups is not None else config.LOCAL_VECTOR_CACHE_MIN_LOOKUPS
+        self.revalidate_seconds = (revalidate_seconds if revalidate_seconds is not None
+                                   else config.LOCAL_VECTOR_CACHE_REVALIDATE_SECONDS)
+        self._documents = OrderedDict()
+        self._lookups = OrderedDict()
+        self._versions = {}
+        self._loading = set()
+        self._too_large = set()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.exports = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _prefix(filename):
+        return hashlib.sha256(filename.encode("utf-8")).hexdigest()[:16]
+
+    def _base_path(self, filename, token):
+        return os.path.join(self.directory, f"{self._prefix(filename)}-{token}")
+
+    @staticmethod
+    def _catalog_token(session, filename):
+        """Token of the published version of ``filename`` in tb_documents, or None if it is not searchable."""
+        row = session.query(
+            Document.id, Document.partition_name, Document.ingest_finished_at, Document.chunk_count
+        ).filter(Document.filename == filename, Document.partition_name.isnot(None),
+                 Document.status != "deleting").first()
+        if row is None:
+            return None, 0
+        version = f"{row.id}:{row.partition_name}:{row.ingest_finished_at}"
+        return hashlib.sha256(version.encode("utf-8")).hexdigest()[:16], row.chunk_count
+
+    def _remove_files(self, filename, keep=None):
+        for path in glob.glob(os.path.join(self.directory, f"{self._prefix(filename)}-*")):
+            if keep is None or not path.startswith(keep):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _export(self, session, filename, base_path):
+        """Write the document's embeddings and texts in chunk order; files appear atomically."""
+        rows = session.query(PdfEmbedding.chunk_text, PdfEmbedding.embedding).filter(
+            PdfEmbedding.filename == filename
+        ).order_by(PdfEmbedding.chunk_index).all()
+        dimensions = PdfEmbedding.embedding.type.dim
+        matrix = np.asarray([row.embedding for row in rows], dtype=np.float32).reshape(len(rows), dimensions)
+        texts = [row.chunk_text for row in rows]
+
+        os.makedirs(self.directory, exist_ok=True)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(base_path + ".json" + suffix, "w", encoding="utf-8") as file:
+            json.dump(texts, file)
+        with open(base_path + ".npy" + suffix, "wb") as file:
+            np.save(file, matrix)
+        # The .npy file marks a complete export, so it is renamed last
+        os.replace(base_path + ".json" + suffix, base_path + ".json")
+        os.replace(base_path + ".npy" + suffix, base_path + ".npy")
+        self._remove_files(filename, keep=base_path)
+        with self._lock:
+            self.exports += 1
+
+    def _load(self, filename):
+        """Map ``filename``, exporting it first unless another worker already did. None if it cannot be cached."""
+        session = create_db_and_table()
+        try:
+            token, chunk_count = self._catalog_token(session, filename)
+            if token is None or token in self._too_large:
+                return None
+            if chunk_count * PdfEmbedding.embedding.type.dim * 4 > self.max_bytes:
+                logging.info(f"Not caching {filename} locally: {chunk_count} chunks exceed the byte budget")
+                self._too_large.add(token)
+                return None
+            base_path = self._base_path(filename, token)
+            if not os.path.exists(base_path + ".npy"):
+                self._export(session, filename, base_path)
+        finally:
+            session.close()
+
+        with open(base_path + ".json", encoding="utf-8") as file:
+            texts = json.load(file)
+        matrix = np.load(base_path + ".npy", mmap_mode="r")
+        nbytes = os.path.getsize(base_path + ".npy") + os.path.getsize(base_path + ".json")
+        return _MappedDocument(token, base_path + ".npy", matrix, texts, nbytes)
+
+    def _is_current(self, filename, document):
+        if not os.path.exists(document.path):
+            return False
+        if time.monotonic() - document.checked_at < self.revalidate_seconds:
+            return True
+        session = create_db_and_table()
+        try:
+            token, _ = self._catalog_token(session, filename)
+        finally:
+            session.close()
+        document.checked_at = time.monotonic()
+        return token == document.token
+
+    def _drop(self, filename):
+        document = self._documents.pop(filename, None)
+        if document is not None:
+            self._bytes -= document.nbytes
+
+    def _insert(self, filename, document):
+        self._drop(filename)
+        self._documents[filename] = document
+        self._bytes += document.nbytes
+        while self._bytes > self.max_bytes and len(self._documents) > 1:
+            _, evicted = self._documents.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def _acquire(self, filename):
+        """Return the current mapping of ``filename``, loading it once the document is hot."""
+        with self._lock:
+            document = self._documents.get(filename)
+            if document is not None:
+                self._documents.move_to_end(filename)
+            else:
+                lookups = self._lookups.pop(filename, 0) + 1
+                self._lookups[filename] = lookups
+                while len(self._lookups) > self.MAX_TRACKED:
+                    self._lookups.popitem(last=False)
+                if lookups < self.min_lookups or filename in self._loading:
+                    return None
+                self._loading.add(filename)
+            version = self._versions.get(filename, 0)
+
+        if document is not None:
+            if self._is_current(filename, document):
+                return document
+            with self._lock:
+                if self._documents.get(filename) is document:
+                    self._drop(filename)
+            return None
+
+        try:
+            document = self._load(filename)
+        except Exception as exc:
+            logging.warning(f"Local vector cache load of {filename} failed: {exc}")
+            document = None
+        finally:
+            with self._lock:
+                self._loading.discard(filename)
+        if document is None:
+            return None
+        with self._lock:
+            # A delete or re-ingest while loading makes this mapping stale
+            if version != self._versions.get(filename, 0):
+                return None
+            self._insert(filename, document)
+            self._lookups.pop(filename, None)
+            self.loads += 1
+        return document
+
+    def search(self, filename, embedding, limit=5):
+        """
+        Exact top-``limit`` chunk texts of ``filename`` for ``embedding`` in VECTOR_DISTANCE_METRIC,
+        or None when the document is not (yet) in the local tier.
+        """
+        if not self.enabled:
+            return None
+        document = self._acquire(filename)
+        if document is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        query = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        products = document.matrix @ query
+        if config.VECTOR_DISTANCE_METRIC == "inner_product":
+            distances = -products
+        elif config.VECTOR_DISTANCE_METRIC == "l2":
+            distances = document.norms ** 2 - 2 * products
+        else:
+            distances = -products / np.maximum(document.norms * np.linalg.norm(query), np.finfo(np.float32).tiny)
+
+        if len(distances) > limit:
+            top = np.argpartition(distances, limit - 1)[:limit]
+        else:
+            top = np.arange(len(distances))
+        top = top[np.argsort(distances[top], kind="stable")]
+        with self._lock:
+            self.hits += 1
+        return [document.texts[index] for index in top]
+
+    def invalidate(self, filename):
+        """Unmap ``filename`` and delete its files, so no worker serves the old version."""
+        with self._lock:
+            self._versions[filename] = self._versions.get(filename, 0) + 1
+            self._drop(filename)
+            self._lookups.pop(filename, None)
+            self.invalidations += 1
+        if self.enabled:
+            self._remove_files(filename)
+
+    def clear(self):
+        with self._lock:
+            self._documents.clear()
+            self._lookups.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "documents": len(self._documents),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "loads": self.loads,
+                "exports": self.exports,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+local_vector_cache = LocalVectorCache()
@@ -1,7 +1,11 @@
+from backend.config import config as app_config
 from backend.minioConfig import MinioConfig
 from fastapi import HTTPException
+import hashlib
+import io
 import logging
 import requests
+import tempfile
 from minio import Minio
 from minio.error import S3Error
 import os
@@ -29,16 +33,107 @@ def list_files():
         logging.error(f"Failed to list files: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to list files: {str(e)}")
 
-def upload_file(URL, minio_file_name):
+class DownloadedPdf:
+    """
+    A downloaded PDF owned by a single request.
+
+    The bytes stay in memory up to ``config.PDF_IN_MEMORY_MAX_BYTES`` and spill to a
+    private temporary file beyond that, so concurrent ingests never share a path.
+    ``source`` is what ``fitz.open`` should read: the bytes, or the temporary file path.
+    ``sha256`` is the hex digest of the content, computed while it streams in.
+    """
+
+    def __init__(self):
+        self._buffer = io.BytesIO()
+        self._file = None
+        self.data = None
+        self.path = None
+        self.size = 0
+        self.sha256 = None
+        self._digest = hashlib.sha256()
+
+    def write(self, chunk):
+        if self._file is None and self.size + len(chunk) > app_config.PDF_IN_MEMORY_MAX_BYTES:
+            self._file = tempfile.NamedTemporaryFile(prefix="pdf_", suffix=".pdf", delete=False)
+            self.path = self._file.name
+            self._file.write(self._buffer.getbuffer())
+            self._buffer = None
+        (self._file or self._buffer).write(chunk)
+        self._digest.update(chunk)
+        self.size += len(chunk)
+
+    def finish(self):
+        self.sha256 = self._digest.hexdigest()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        else:
+            self.data = self._buffer.getvalue()
+            self._buffer = None
+
+    @property
+    def source(self):
+        return self.path if self.path else self.data
+
+    def open_stream(self):
+        return open(self.path, "rb") if self.path else io.BytesIO(self.data)
+
+    def cleanup(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.data = None
+
+
+def download_pdf(URL):
+    """
+    Stream a PDF from ``URL`` in chunks, enforcing ``config.MAX_PDF_DOWNLOAD_BYTES``.
+
+    :return: A DownloadedPdf holding the content.
+    :raises HTTPException: 400 if the download fails, 413 if the PDF is larger than the limit.
+    """
+    max_bytes = app_config.MAX_PDF_DOWNLOAD_BYTES
     try:
-        response = requests.get(URL)
+        response = requests.get(URL, stream=True, timeout=app_config.PDF_DOWNLOAD_TIMEOUT_SECONDS)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         raise HTTPException(status_code=400, detail=f"Error downloading the PDF: {e}")
 
-    pdf_path = "/tmp/temp_pdf.pdf"
-    with open(pdf_path, 'wb') as pdf_file:
-        pdf_file.write(response.content)
+    pdf = DownloadedPdf()
+    try:
+        content_length = response.headers.get("Content-Length")
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"PDF is larger than the {max_bytes} byte limit")
+
+        for chunk in response.iter_content(chunk_size=app_config.PDF_DOWNLOAD_CHUNK_BYTES):
+            if not chunk:
+                continue
+            if pdf.size + len(chunk) > max_bytes:
+                raise HTTPException(status_code=413, detail=f"PDF is larger than the {max_bytes} byte limit")
+            pdf.write(chunk)
+        pdf.finish()
+    except requests.exceptions.RequestException as e:
+        pdf.cleanup()
+        raise HTTPException(status_code=400, detail=f"Error downloading the PDF: {e}")
+    except Exception:
+        pdf.cleanup()
+        raise
+    finally:
+        response.close()
+
+    return pdf
+
+
+def upload_file(URL, minio_file_name):
+    """
+    Download a PDF and stream it into the configured MinIO bucket.
+
+    :return: The DownloadedPdf, for the caller to process and then ``cleanup()``.
+    :raises HTTPException: If the download, bucket creation or upload fails.
+    """
+    pdf = download_pdf(URL)
 
     config = MinioConfig()
     minio_client = Minio(
@@ -49,20 +144,29 @@ def upload_file(URL, minio_file_name):
     )
 
     try:
-        if not minio_client.bucket_exists(config.minio_bucket_name):
-            minio_client.make_bucket(config.minio_bucket_name)
-    except S3Error as e:
-        raise HTTPException(status_code=500, detail=f"Error creating bucket: {e}")
+        try:
+            if not minio_client.bucket_exists(config.minio_bucket_name):
+                minio_client.make_bucket(config.minio_bucket_name)
+        except S3Error as e:
+            raise HTTPException(status_code=500, detail=f"Error creating bucket: {e}")
 
-    try:
-        minio_client.fput_object(
-            bucket_name=config.minio_bucket_name,
-            object_name=minio_file_name,
-            file_path=pdf_path,
-            content_type='application/pdf'
-        )
-        print(f"Successfully uploaded {minio_file_name} to MinIO bucket {config.minio_bucket_name}")
+        try:
+            with pdf.open_stream() as stream:
+                minio_client.put_object(
+                    bucket_name=config.minio_bucket_name,
+                    object_name=minio_file_name,
+                    data=stream,
+                    length=pdf.size,
+                    part_size=app_config.MINIO_PART_SIZE,
+                    content_type='application/pdf',
+                    metadata={"sha256": pdf.sha256},
+                )
+            print(f"Successfully uploaded {minio_file_name} to MinIO bucket {config.minio_bucket_name}")
 
-    except S3Error as e:
-        raise HTTPException(status_code=500, detail=f"Error uploading the PDF to MinIO: {e}")
+        except S3Error as e:
+            raise HTTPException(status_code=500, detail=f"Error uploading the PDF to MinIO: {e}")
+    except Exception:
+        pdf.cleanup()
+        raise
 
+    return pdf
@@ -0,0 +1,107 @@
+import os
+import logging
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import fitz  # PyMuPDF
+from backend.config import config
+
+
+def _open(source):
+    """Open a PDF from a path or from its bytes."""
+    if isinstance(source, (bytes, bytearray)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+
+def _extract_range(source, start, stop):
+    """Worker task: open the document independently and return the text of pages [start, stop)."""
+    with _open(source) as doc:
+        return [doc[page_number].get_text() for page_number in range(start, stop)]
+
+
+def page_ranges(page_count, tasks):
+    """Split ``page_count`` pages into at most ``tasks`` contiguous (start, stop) ranges of near-equal size."""
+    tasks = max(1, min(tasks, page_count))
+    size, remainder = divmod(page_count, tasks)
+    ranges = []
+    start = 0
+    for task in range(tasks):
+        stop = start + size + (1 if task < remainder else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+class PageExtractor:
+    """
+    Extracts PDF page text, in a process pool for documents of at least ``min_pages`` pages.
+
+    Text extraction holds the GIL, so threads do not help; each worker process opens the
+    document on its own and extracts a contiguous page range. Pages are yielded in order
+    as soon as their range is done, so callers can start on the first pages early.
+    """
+
+    # Ranges per worker: smaller ranges let the first pages arrive sooner and balance uneven pages
+    RANGES_PER_WORKER = 4
+    # PDF bytes up to this size are sent with every task; larger ones are spilled to a temp file
+    INLINE_MAX_BYTES = 64 * 1024
+
+    def __init__(self, max_workers=None, min_pages=None):
+        self.max_workers = max_workers or config.PDF_EXTRACTION_WORKERS or os.cpu_count() or 1
+        self.min_pages = min_pages or config.PDF_EXTRACTION_MIN_PAGES
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn rather than fork: the API process runs model and database threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def iter_pages(self, source):
+        """
+        Yield the text of every page of ``source`` (a path or the PDF bytes) in page order.
+        """
+        with _open(source) as doc:
+            page_count = doc.page_count
+            if self.max_workers < 2 or page_count < self.min_pages:
+                for page in doc:
+                    yield page.get_text()
+                return
+
+        logging.info(f"Extracting {page_count} pages with {self.max_workers} worker processes")
+        spilled = None
+        if isinstance(source, (bytes, bytearray)) and len(source) > self.INLINE_MAX_BYTES:
+            # Tasks then carry a path instead of pickling the whole document into each of them
+            with tempfile.NamedTemporaryFile(prefix="pdf_", suffix=".pdf", delete=False) as file:
+                file.write(source)
+            source = spilled = file.name
+        futures = []
+        try:
+            executor = self._get_executor()
+            futures = [
+                executor.submit(_extract_range, source, start, stop)
+                for start, stop in page_ranges(page_count, self.max_workers * self.RANGES_PER_WORKER)
+            ]
+            for future in futures:
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+            if spilled is not None:
+                # Workers may still be reading it if the caller stopped early; removing an open file is safe on POSIX
+                os.remove(spilled)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+page_extractor = PageExtractor()
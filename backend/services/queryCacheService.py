@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import OrderedDict
+from backend.config import config
+from backend.services.embeddingCacheService import text_hash
+
+
+class QueryResultCache:
+    """
+    In-process TTL + LRU cache for filename-scoped query results.
+
+    Keys are (filename, document version, query hash, search mode). Each filename carries a
+    version counter that ``invalidate`` bumps when the document is deleted or
+    re-ingested, so stale results are never served by this worker; other workers
+    pick the change up when their entries expire after ``ttl_seconds``.
+    """
+
+    def __init__(self, max_entries=None, ttl_seconds=None):
+        self.max_entries = max_entries if max_entries is not None else config.QUERY_CACHE_SIZE
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else config.QUERY_CACHE_TTL_SECONDS
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _key(self, filename, query, mode):
+        return filename, self._versions.get(filename, 0), text_hash(query), mode
+
+    def get(self, filename, query, mode="vector"):
+        """Return the cached result for (filename, query) in search ``mode`` or None."""
+        with self._lock:
+            key = self._key(filename, query, mode)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, result = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(result)
+
+    def version(self, filename):
+        """Current version of ``filename``; pass it to ``put`` to drop results computed before an invalidation."""
+        with self._lock:
+            return self._versions.get(filename, 0)
+
+    def put(self, filename, query, result, version=None, mode="vector"):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if version is not None and version != self._versions.get(filename, 0):
+                return
+            key = self._key(filename, query, mode)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, tuple(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, filename):
+        """Drop every cached result for ``filename`` and bump its version."""
+        with self._lock:
+            self._versions[filename] = self._versions.get(filename, 0) + 1
+            for key in [key for key in self._entries if key[0] == filename]:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+query_result_cache = QueryResultCache()
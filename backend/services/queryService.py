@@ -1,173 +1,559 @@
 import os
+import hashlib
 import logging
-import fitz  # PyMuPDF
-from backend.pretrainedModels.bge3_embedding import SingletonModel
+import numpy as np
+from backend.pretrainedModels.bge3_embedding import model_manager, EMBEDDING_MODEL_ID
 import torch
-from sqlalchemy import func
-from backend.database.db_models import create_db_and_table, PdfEmbedding
+from backend.config import config
+from backend.services.embeddingCacheService import embedding_cache, text_hash
+from backend.services.queryCacheService import query_result_cache
+from backend.services.localVectorCacheService import local_vector_cache
+from backend.services.ingestionProgress import IngestionProgress
+from backend.services.chunkingService import iter_chunks
+from backend.services.ingestionPipeline import IngestionPipeline
+from backend.services.pdfExtractionService import page_extractor
+from backend.services.embeddingBatcher import EmbeddingBatcher
+from backend.services.inferenceScheduler import inference_scheduler, INTERACTIVE, INGESTION
+from backend.database.db_models import (
+    create_db_and_table, ensure_vector_index,
+    register_document, document_ingest_lock, stage_document_partition, publish_document_partition,
+    discard_document_partition,
+    find_indexed_document, copy_document_chunks, lock_published_chunks, apply_chunk_update, chunk_text_hash
+)
+from backend.database.db_copy import copy_chunk_batches
+from backend.services import vectorStoreService
 from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
 import gc
 
+# Search modes of the filename-scoped queries (config.SEARCH_MODE)
+VECTOR = "vector"
+HYBRID = "hybrid"
+KEYWORD = "keyword"
 
-def generate_embedding(text):
-    """Generate embeddings for a given text using singleton model."""
-    model_instance = SingletonModel()
-    tokenizer = model_instance.tokenizer
-    model = model_instance.model
-
-    inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True).to(model.device)
 
+def _forward(model, inputs):
     with torch.no_grad():
-        outputs = model(**inputs)
+        return model(**inputs)
 
-    embeddings = outputs.last_hidden_state.mean(dim=1).squeeze().cpu().numpy()
 
-    # Clean up tensors to free GPU memory
-    del inputs, outputs
-    torch.cuda.empty_cache()
-    gc.collect()
+def generate_embedding(text):
+    """
+    Generate embeddings for a given text using the resident model, reusing cached vectors.
 
-    return embeddings.tolist()
+    Concurrent calls are micro-batched into one interactive forward pass, scheduled ahead
+    of any queued ingestion batches.
+    """
+    cached = embedding_cache.get(text)
+    if cached is not None:
+        return cached.tolist()
 
+    embeddings = query_embedding_batcher.embed(text)
 
-def process_pdf_chunks(pdf_path, minio_file_name, batch_size=10):
-    logging.info(f"Starting PDF processing for {pdf_path}")
+    embedding_cache.put(text, embeddings)
+    return embeddings.tolist()
 
-    doc = fitz.open(pdf_path)
-    chunks = []
 
-    chunk_size = 100
-    total_words = 0
+def mean_pool(last_hidden_state, attention_mask):
+    """Average token states over the attention mask so padding does not shift the vector."""
+    mask = attention_mask.unsqueeze(-1).to(last_hidden_state.dtype)
+    summed = (last_hidden_state * mask).sum(dim=1)
+    counts = mask.sum(dim=1).clamp(min=1e-9)
+    return summed / counts
+
+
+def generate_embeddings(texts, batch_size=None, on_progress=None, priority=INGESTION, input_ids=None):
+    """
+    Generate embeddings for a list of texts with batched forward passes.
+
+    Cached vectors are reused and identical texts are embedded only once; only interactive
+    (query) texts use the shared cache table, ingestion chunks the in-process tier. The rest
+    are tokenized once, sorted by token length and padded per batch, so chunks of
+    similar length share a batch and padding waste stays low.
+
+    :param texts: The texts to embed.
+    :param batch_size: Number of texts per forward pass (defaults to config.EMBEDDING_BATCH_SIZE).
+    :param on_progress: Optional callable receiving the number of texts that became available, per step.
+    :param priority: Inference scheduler class for the forward passes.
+    :param input_ids: Optional model input ids of every text (see chunkingService), so they are not tokenized again.
+    :return: A float32 numpy array of shape (len(texts), hidden_size), in input order.
+    """
+    texts = list(texts)
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+
+    shared = priority == INTERACTIVE
+    cached = embedding_cache.get_many(texts, shared=shared)
+    missing = {}
+    missing_count = 0
+    for position, (text, embedding) in enumerate(zip(texts, cached)):
+        if embedding is None:
+            missing.setdefault(text_hash(text), position)
+            missing_count += 1
+    if on_progress:
+        on_progress(len(texts) - missing_count)
+
+    computed = {}
+    if missing:
+        missing_texts = [texts[position] for position in missing.values()]
+        missing_input_ids = [input_ids[position] for position in missing.values()] if input_ids is not None else None
+        fresh = _embed_batches(missing_texts, batch_size or config.EMBEDDING_BATCH_SIZE,
+                               on_batch=on_progress, priority=priority, input_ids=missing_input_ids)
+        if on_progress:
+            # Duplicates of freshly embedded texts become available at the same time
+            on_progress(missing_count - len(missing_texts))
+        embedding_cache.put_many(missing_texts, fresh, shared=shared)
+        computed = dict(zip(missing, fresh))
+
+    return np.stack([
+        embedding if embedding is not None else computed[text_hash(text)]
+        for text, embedding in zip(texts, cached)
+    ]).astype(np.float32, copy=False)
+
+
+def _embed_batches(texts, batch_size, on_batch=None, priority=INGESTION, input_ids=None):
+    """
+    Run length-sorted, padded forward passes over ``texts`` and return a float32 matrix in input order.
+
+    ``texts`` are only tokenized when their ``input_ids`` are not given. Every batch is a
+    separate scheduler item, so interactive work can run between batches.
+    """
+    with model_manager.use() as model_instance:
+        tokenizer = model_instance.tokenizer
+        model = model_instance.model
+
+        if input_ids is None:
+            encoded = tokenizer(texts, truncation=True)
+            input_ids = encoded["input_ids"]
+            attention_mask = encoded["attention_mask"]
+        else:
+            attention_mask = [[1] * len(ids) for ids in input_ids]
+        order = sorted(range(len(texts)), key=lambda i: len(input_ids[i]))
+
+        embeddings = None
+        for start in range(0, len(order), batch_size):
+            batch_indices = order[start:start + batch_size]
+            inputs = tokenizer.pad(
+                {
+                    "input_ids": [input_ids[i] for i in batch_indices],
+                    "attention_mask": [attention_mask[i] for i in batch_indices],
+                },
+                return_tensors="pt",
+            ).to(model.device)
+
+            outputs = inference_scheduler.run(priority, _forward, model, inputs)
+
+            pooled = mean_pool(outputs.last_hidden_state, inputs["attention_mask"]).float().cpu().numpy()
+            if embeddings is None:
+                embeddings = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            embeddings[batch_indices] = pooled
+
+            del inputs, outputs
+            if on_batch:
+                on_batch(len(batch_indices))
+
+    return embeddings
+
+
+def _embed_query_batch(texts):
+    """Embed a micro-batch of questions in a single padded forward pass."""
+    embeddings = _embed_batches(texts, len(texts), priority=INTERACTIVE)
 
-    # Efficiently extract text from PDF and split into chunks
-    for page in doc:
-        words = page.get_text().split()
-        total_words += len(words)
-        chunks.extend([" ".join(words[i:i + chunk_size]) for i in range(0, len(words), chunk_size)])
+    # Clean up tensors to free GPU memory
+    torch.cuda.empty_cache()
+    gc.collect()
+    return embeddings
+
+
+query_embedding_batcher = EmbeddingBatcher(_embed_query_batch)
+
+
+def _content_fingerprint(pdf_path, content_hash=None):
+    """sha256 hex digest and byte size of a PDF given as bytes or a file path; a known digest is not recomputed."""
+    if isinstance(pdf_path, (bytes, bytearray)):
+        return content_hash or hashlib.sha256(pdf_path).hexdigest(), len(pdf_path)
+    if content_hash:
+        return content_hash, os.path.getsize(pdf_path)
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as pdf_file:
+        for block in iter(lambda: pdf_file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest(), os.path.getsize(pdf_path)
+
+
+def _prepend(head, rest):
+    """Yield ``head`` then ``rest``; closing it closes ``rest``."""
+    yield from head
+    yield from rest
+
+
+def _chunk_batches(pages, batch_chunks):
+    """Chunk the streamed pages with the model's tokenizer and group the chunks into lists of ``batch_chunks``."""
+    with model_manager.use() as model_instance:
+        batch = []
+        for chunk in iter_chunks(pages, model_instance.tokenizer):
+            batch.append(chunk)
+            if len(batch) == batch_chunks:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def _embed_chunk_batches(chunk_batches, progress):
+    """Embed every chunk batch, reusing the chunks' input ids, and yield (chunks, embeddings)."""
+    for chunks in chunk_batches:
+        progress.add_total(len(chunks))
+        yield chunks, generate_embeddings([chunk.text for chunk in chunks], on_progress=progress.add_embedded,
+                                          input_ids=[chunk.input_ids for chunk in chunks])
+
+
+def _reuse_indexed_document(session, indexed, minio_file_name, content_hash, byte_size, progress):
+    """
+    Publish ``minio_file_name`` with the chunks of ``indexed``, a document with the same content.
+
+    The rows are copied server-side into a fresh partition, so nothing is extracted,
+    chunked or embedded. Re-submitting a document under its own name is a no-op.
+    """
+    progress.deduplicated_from = indexed.filename
+    if indexed.filename == minio_file_name:
+        logging.info(f"PDF {minio_file_name} is already indexed with the same content, skipping")
+        return indexed.id
+
+    document_id = register_document(session, minio_file_name, content_hash, byte_size)
+    logging.info(f"PDF {minio_file_name} has the same content as {indexed.filename}, copying its chunks")
+    staged_partition = None
+    with document_ingest_lock(document_id):
+        try:
+            with progress.stage("copy"):
+                staged_partition = stage_document_partition(session, document_id, minio_file_name)
+                copied = copy_document_chunks(session, indexed.filename, staged_partition, document_id,
+                                              minio_file_name)
+                publish_document_partition(session, document_id, minio_file_name, staged_partition, copied,
+                                           EMBEDDING_MODEL_ID)
+        except Exception:
+            discard_document_partition(session, document_id, staged_partition)
+            raise
+    progress.set_total(copied)
+    progress.add_stored(copied)
+    return document_id
+
+
+def _embed_and_store(session, pdf_path, minio_file_name, content_hash, byte_size, flush_rows, progress,
+                     incremental):
+    """Extract, chunk, embed and store a document through the ingestion pipeline; return its id."""
+    min_words = 100
+
+    # Pages stream out of the extractor; only enough of them to check the word count are read up front
+    pages = page_extractor.iter_pages(pdf_path)
+    head = []
+    total_words = 0
+    for page_text in pages:
+        head.append(page_text)
+        total_words += len(page_text.split())
+        if total_words >= min_words:
+            break
 
     # Handle case where PDF does not contain enough words
-    if total_words < chunk_size:
-        os.remove(pdf_path)
+    if total_words < min_words:
+        if not isinstance(pdf_path, (bytes, bytearray)):
+            os.remove(pdf_path)
         logging.warning(f"PDF {minio_file_name} does not contain enough words to create a chunk.")
         raise ValueError(f"PDF {minio_file_name} does not contain enough words to create a chunk.")
 
-    # Setup database session
-    session = create_db_and_table()
-    latest_pdf_id = session.query(func.max(PdfEmbedding.pdf_id)).scalar() or 0
-    new_pdf_id = latest_pdf_id + 1
-    logging.info(f"Processing chunks for PDF {minio_file_name} with new PDF ID {new_pdf_id}")
-
-    # Process and store embeddings in batches
-    all_pdf_embeddings = []
-    for idx, chunk in enumerate(chunks):
+    document_id = register_document(session, minio_file_name, content_hash, byte_size)
+    logging.info(f"Processing chunks for PDF {minio_file_name} with document ID {document_id}")
+    pages = _prepend(head, pages)
+
+    if incremental:
+        partition_name, stored = lock_published_chunks(session, document_id, EMBEDDING_MODEL_ID)
+        if partition_name:
+            return _update_document_chunks(session, pages, document_id, minio_file_name, partition_name, stored,
+                                           flush_rows, progress)
+        # Nothing published yet, or by another model; release the catalog row lock and load a new partition
+        session.rollback()
+
+    staged_partition = None
+    # A concurrent ingest of the same document waits until this one is published or discarded
+    with document_ingest_lock(document_id):
         try:
-            embeddings = generate_embedding(chunk)
-            pdf_embedding = PdfEmbedding(
-                pdf_id=new_pdf_id,
-                filename=minio_file_name,
-                chunk_index=idx,
-                chunk_text=chunk,
-                embedding=embeddings
-            )
-            all_pdf_embeddings.append(pdf_embedding)
-
-            if (idx + 1) % batch_size == 0:
-                session.bulk_save_objects(all_pdf_embeddings)
-                session.commit()
-                all_pdf_embeddings.clear()
-
-        except Exception as exc:
-            logging.error(f"Chunk {idx} generated an exception: {exc}")
-
-    # Final commit for remaining chunks
-    if all_pdf_embeddings:
-        session.bulk_save_objects(all_pdf_embeddings)
-        session.commit()
-
-    session.close()
-    logging.info(f"Successfully processed and indexed PDF {minio_file_name} into PostgreSQL with pdf_id {new_pdf_id}")
-    os.remove(pdf_path)
-    logging.info(f"Deleted temporary PDF file {pdf_path}")
-
-    # Clean up
-    del chunks, all_pdf_embeddings
-    torch.cuda.empty_cache()
-    gc.collect()
-
-    # Unload model to free memory
-    unload_model()
-
-
-def unload_model():
-    """Unload the model from memory to free up resources."""
-    model_instance = SingletonModel()
-    if model_instance.model:
-        del model_instance.model
-    if model_instance.tokenizer:
-        del model_instance.tokenizer
-    SingletonModel._instance = None
-
-    torch.cuda.empty_cache()
-    gc.collect()
-
-
-def get_related_chunks(question):
-    logging.info(f"Generating embedding for question: {question}")
-    question_embedding = generate_embedding(question)
+            # Chunks are loaded into a detached partition and published once complete
+            staged_partition = stage_document_partition(session, document_id, minio_file_name)
+            stored_chunks = _run_pipeline(session, pages, staged_partition, document_id, minio_file_name,
+                                          lambda chunk_batches: _embed_chunk_batches(chunk_batches, progress),
+                                          flush_rows, progress)
+            publish_document_partition(session, document_id, minio_file_name, staged_partition, stored_chunks,
+                                       EMBEDDING_MODEL_ID)
+        except Exception:
+            discard_document_partition(session, document_id, staged_partition)
+            raise
+    return document_id
+
+
+def _run_pipeline(session, pages, table_name, document_id, minio_file_name, embed, flush_rows, progress):
+    """
+    Stream ``pages`` through extract -> chunk -> embed -> COPY into ``table_name`` and return the rows copied.
+
+    :param embed: Callable turning the chunk batch queue into the embed stage's (chunks, embeddings[, chunk_indexes]) items.
+    """
+    with progress.stage("pipeline"), IngestionPipeline(progress) as pipeline:
+        page_queue = pipeline.stage("extract", pages)
+        chunk_queue = pipeline.stage("chunk", _chunk_batches(page_queue, config.INGESTION_PIPELINE_BATCH_CHUNKS),
+                                     upstream=page_queue, count=len)
+        embedded_queue = pipeline.stage("embed", embed(chunk_queue), upstream=chunk_queue,
+                                        count=lambda item: len(item[0]))
+        return copy_chunk_batches(
+            session, table_name, document_id, minio_file_name,
+            pipeline.drain("store", embedded_queue, count=lambda item: len(item[0])),
+            flush_rows=flush_rows, on_flush=progress.add_stored,
+        )
+
+
+def _embed_changed_chunks(chunk_batches, stored, kept, progress):
+    """
+    Embed only chunks whose text is not stored yet and yield (chunks, embeddings, chunk_indexes).
+
+    A chunk whose text matches a stored row reuses that row: (row id, chunk_index,
+    page_start, page_end) is appended to ``kept`` instead.
+    """
+    chunk_index = 0
+    for chunks in chunk_batches:
+        progress.add_total(len(chunks))
+        changed, changed_indexes = [], []
+        for chunk in chunks:
+            row_ids = stored.get(chunk_text_hash(chunk.text))
+            if row_ids:
+                kept.append((row_ids.pop(), chunk_index, chunk.page_start, chunk.page_end))
+            else:
+                changed.append(chunk)
+                changed_indexes.append(chunk_index)
+            chunk_index += 1
+        progress.add_reused(len(chunks) - len(changed))
+        if changed:
+            embeddings = generate_embeddings([chunk.text for chunk in changed], on_progress=progress.add_embedded,
+                                             input_ids=[chunk.input_ids for chunk in changed])
+            yield changed, embeddings, changed_indexes
+
+
+def _update_document_chunks(session, pages, document_id, minio_file_name, partition_name, stored, flush_rows,
+                            progress):
+    """
+    Apply a new version of a published document to its partition in place, in one transaction.
+
+    Chunks whose text is already stored keep their rows and embeddings and are only
+    renumbered; new or changed chunks are embedded and copied in; rows of chunks the new
+    version no longer has are deleted. Searches see the previous version until the commit.
+    """
+    stored_ids = {row_id for row_ids in stored.values() for row_id in row_ids}
+    kept = []
+    try:
+        inserted = _run_pipeline(session, pages, partition_name, document_id, minio_file_name,
+                                 lambda chunk_batches: _embed_changed_chunks(chunk_batches, stored, kept, progress),
+                                 flush_rows, progress)
+        removed_ids = stored_ids - {row[0] for row in kept}
+        apply_chunk_update(session, document_id, partition_name, kept, removed_ids, len(kept) + inserted)
+    except Exception:
+        discard_document_partition(session, document_id, None)
+        raise
+    progress.add_stored(len(kept))
+    logging.info(f"Updated {minio_file_name} in place: {len(kept)} chunks kept, {inserted} embedded, "
+                 f"{len(removed_ids)} removed")
+    return document_id
+
+
+def process_pdf_chunks(pdf_path, minio_file_name, flush_rows=None, progress=None, content_hash=None,
+                       incremental=None):
+    """
+    Chunk, embed and store a PDF.
+
+    The document's id comes from the tb_documents catalog. Its chunks are loaded into a
+    fresh partition that replaces the previous version of the document in one transaction,
+    so re-ingesting a filename never exposes a mix of old and new chunks.
+
+    A PDF whose SHA-256 matches an already indexed document reuses that document's chunk
+    embeddings (copied server-side) instead of being embedded again. A new version of a
+    published filename is applied in place when ``incremental`` is on: only new or changed
+    chunks are embedded (see _update_document_chunks).
+
+    Otherwise extraction, chunking, embedding and the database write run as a pipeline of
+    threads joined by bounded queues (see IngestionPipeline): pages are chunked while later
+    pages are still being extracted, and embedded batches are streamed into one binary COPY
+    while the next batches are embedded. At most INGESTION_PIPELINE_QUEUE_DEPTH items of
+    INGESTION_PIPELINE_BATCH_CHUNKS chunks wait between two stages, so memory does not
+    grow with the document.
+
+    :param pdf_path: Path of the PDF (removed once processed) or the PDF bytes.
+    :param flush_rows: Rows encoded per COPY write (defaults to config.INGESTION_COPY_FLUSH_ROWS).
+    :param content_hash: SHA-256 hex digest of the PDF if already known (computed while downloading).
+    :param incremental: Update a published document in place (defaults to config.INGESTION_INCREMENTAL_UPDATES).
+    :return: The document id.
+    """
+    in_memory = isinstance(pdf_path, (bytes, bytearray))
+    logging.info(f"Starting PDF processing for {'in-memory PDF' if in_memory else pdf_path}")
+    progress = progress or IngestionProgress()
 
+    # Setup database session
     session = create_db_and_table()
-    latest_pdf_id = session.query(func.max(PdfEmbedding.pdf_id)).scalar()
-
     try:
-        query = session.query(PdfEmbedding.chunk_text).filter(
-            PdfEmbedding.pdf_id == latest_pdf_id
-        ).order_by(
-            func.l2_distance(PdfEmbedding.embedding, func.cast(question_embedding, PdfEmbedding.embedding.type))
-        ).limit(5)
-
-        result = query.all()
-        related_chunks = [row.chunk_text for row in result]
-        logging.info(f"Retrieved {len(related_chunks)} related chunks for the question.")
+        content_hash, byte_size = _content_fingerprint(pdf_path, content_hash)
+        indexed = find_indexed_document(session, content_hash, EMBEDDING_MODEL_ID, minio_file_name)
+        if indexed is not None:
+            document_id = _reuse_indexed_document(session, indexed, minio_file_name, content_hash, byte_size,
+                                                  progress)
+        else:
+            incremental = config.INGESTION_INCREMENTAL_UPDATES if incremental is None else incremental
+            document_id = _embed_and_store(session, pdf_path, minio_file_name, content_hash, byte_size,
+                                           flush_rows, progress, incremental)
     finally:
         session.close()
 
-    # Clean up
-    del question_embedding
+    query_result_cache.invalidate(minio_file_name)
+    local_vector_cache.invalidate(minio_file_name)
+    try:
+        # ivfflat centroids go stale as the table grows; rebuilt here once they drift too far
+        ensure_vector_index()
+    except Exception as exc:
+        logging.warning(f"Vector index maintenance failed: {exc}")
+    logging.info(f"Successfully processed and indexed PDF {minio_file_name} into PostgreSQL with document ID {document_id}")
+    if not in_memory:
+        os.remove(pdf_path)
+        logging.info(f"Deleted temporary PDF file {pdf_path}")
+
+    # Clean up; the model itself stays resident and is evicted by the model manager when idle
     torch.cuda.empty_cache()
     gc.collect()
+    return document_id
 
-    return related_chunks
 
+async def get_related_chunks_async(question, session, document_id=None):
+    """
+    Return the chunk texts most related to ``question``: the model runs in the threadpool, the search on the event loop.
 
-# backend/services/queryService.py
+    Searches ``document_id`` when given, otherwise the latest ingested document.
+    """
+    logging.info(f"Generating embedding for question: {question}")
+    question_embedding = await run_in_threadpool(generate_embedding, question)
 
-def get_related_chunks_by_filename(query, filename):
-    logging.info(f"Generating embedding for question: {query}")
-    session = None
-    try:
-        question_embedding = generate_embedding(query)
-        session = create_db_and_table()
-        file_exists = session.query(PdfEmbedding).filter(PdfEmbedding.filename == filename).first()
-        if not file_exists:
-            raise HTTPException(status_code=404, detail=f"No records found for filename: {filename}")
-
-        query_result = session.query(PdfEmbedding.chunk_text).filter(
-            PdfEmbedding.filename == filename
-        ).order_by(
-            func.l2_distance(PdfEmbedding.embedding, func.cast(question_embedding, PdfEmbedding.embedding.type))
-        ).limit(5)
-
-        result = query_result.all()
-        related_chunks = [row.chunk_text for row in result]
-        logging.info(f"Retrieved {len(related_chunks)} related chunks for filename {filename}.")
-    finally:
-        if session:
-            session.close()
+    document = await vectorStoreService.get_document(session, document_id)
+    if document is None:
+        return []
+    related_chunks = await vectorStoreService.search_chunks(session, question_embedding, filename=document.filename)
+    logging.info(f"Retrieved {len(related_chunks)} related chunks for the question.")
+    return related_chunks
 
-    # Clean up
-    del question_embedding
-    torch.cuda.empty_cache()
-    gc.collect()
 
+async def get_related_chunks_by_filename_async(query, filename, session, ef_search=None, probes=None, mode=None):
+    """
+    Return the chunk texts of ``filename`` most related to ``query``, through the query result cache.
+
+    ``mode`` is "vector" (embedding search), "hybrid" (vector and full-text search fused in
+    one query) or "keyword" (full-text only, the model is not used); defaults to
+    config.SEARCH_MODE. ``ef_search``/``probes`` override the ANN search knobs for this
+    request; tuned requests bypass the result cache and the local vector cache.
+    """
+    mode = mode or config.SEARCH_MODE
+    use_cache = ef_search is None and probes is None
+    if use_cache:
+        cached_chunks = query_result_cache.get(filename, query, mode)
+        if cached_chunks is not None:
+            logging.info(f"Serving cached related chunks for filename {filename}.")
+            return cached_chunks
+    cache_version = query_result_cache.version(filename)
+
+    question_embedding = None
+    if mode != KEYWORD:
+        logging.info(f"Generating embedding for question: {query}")
+        question_embedding = await run_in_threadpool(generate_embedding, query)
+
+    # Tuned requests measure the ANN index, so they are not answered by the exact local search
+    if mode == VECTOR and use_cache and local_vector_cache.enabled:
+        related_chunks = await run_in_threadpool(local_vector_cache.search, filename, question_embedding)
+        if related_chunks is not None:
+            logging.info(f"Retrieved {len(related_chunks)} related chunks for filename {filename} from the local vector cache.")
+            query_result_cache.put(filename, query, related_chunks, version=cache_version, mode=mode)
+            return related_chunks
+
+    if not await vectorStoreService.file_exists(session, filename):
+        raise HTTPException(status_code=404, detail=f"No records found for filename: {filename}")
+
+    if mode == VECTOR:
+        related_chunks = await vectorStoreService.search_chunks(session, question_embedding, filename=filename,
+                                                                ef_search=ef_search, probes=probes)
+    else:
+        related_chunks = await vectorStoreService.search_chunks_hybrid(session, query, question_embedding,
+                                                                       filename=filename, ef_search=ef_search,
+                                                                       probes=probes)
+    logging.info(f"Retrieved {len(related_chunks)} related chunks for filename {filename}.")
+
+    if use_cache:
+        query_result_cache.put(filename, query, related_chunks, version=cache_version, mode=mode)
     return related_chunks
 
+
+async def get_related_chunks_for_questions_async(queries, filename, session, ef_search=None, probes=None):
+    """
+    Answer several questions about one file with one forward pass and one search query.
+
+    Cached results are reused unless the ANN search knobs are overridden; the remaining
+    questions are embedded together and resolved by a single LATERAL search.
+
+    :return: One list of related chunks per question, in input order.
+    """
+    use_cache = ef_search is None and probes is None
+    cache_version = query_result_cache.version(filename)
+    results = [query_result_cache.get(filename, query) if use_cache else None for query in queries]
+    missing = [position for position, chunks in enumerate(results) if chunks is None]
+    if not missing:
+        logging.info(f"Serving {len(queries)} cached results for filename {filename}.")
+        return results
+
+    missing_queries = [queries[position] for position in missing]
+    logging.info(f"Generating embeddings for {len(missing_queries)} questions about {filename}")
+    question_embeddings = await run_in_threadpool(
+        generate_embeddings, missing_queries, len(missing_queries), None, INTERACTIVE
+    )
+
+    related_chunks = await vectorStoreService.search_chunks_batch(session, question_embeddings, filename,
+                                                                  ef_search=ef_search, probes=probes)
+    if not any(related_chunks):
+        raise HTTPException(status_code=404, detail=f"No records found for filename: {filename}")
+
+    for position, query, chunks in zip(missing, missing_queries, related_chunks):
+        results[position] = chunks
+        if use_cache:
+            query_result_cache.put(filename, query, chunks, version=cache_version)
+    logging.info(f"Retrieved related chunks for {len(queries)} questions about filename {filename}.")
+    return results
+
+
+async def search_documents_async(query, session, filenames=None, prefix=None, top_k=5, per_document_k=None,
+                                 ef_search=None, probes=None):
+    """
+    Search several documents (a list of filenames, a filename prefix or, with neither, all of them)
+    with a single question embedding and a single search query.
+
+    :return: A dictionary with the global top-k ``hits`` and, when ``per_document_k`` is set, the
+        top ``per_document_k`` hits of every document under ``documents``.
+    """
+    logging.info(f"Generating embedding for corpus search: {query}")
+    question_embedding = await run_in_threadpool(generate_embedding, query)
+
+    if per_document_k is None:
+        hits = await vectorStoreService.search_corpus(session, question_embedding, filenames, prefix, limit=top_k,
+                                                      ef_search=ef_search, probes=probes)
+        logging.info(f"Retrieved {len(hits)} hits for the corpus search.")
+        return {"hits": hits}
+
+    # A document's share of the global top-k is within its own top-max(k, per_document_k),
+    # so one per-document query answers both
+    candidates = await vectorStoreService.search_corpus(
+        session, question_embedding, filenames, prefix, per_document_limit=max(top_k, per_document_k),
+        ef_search=ef_search, probes=probes
+    )
+    documents = {}
+    for hit in candidates:
+        document_hits = documents.setdefault(hit["filename"], [])
+        if len(document_hits) < per_document_k:
+            document_hits.append(hit)
+    logging.info(f"Retrieved hits from {len(documents)} documents for the corpus search.")
+    return {"hits": candidates[:top_k], "documents": documents}
@@ -0,0 +1,231 @@
+from pgvector import Vector
+from sqlalchemy import select, update, delete, func, cast, true, text, Text
+from sqlalchemy.dialects.postgresql import ARRAY
+from backend.config import config
+from backend.database.db_models import Document, PdfEmbedding, nearest_chunks, hybrid_chunks, keyword_chunks, search_depth
+
+# asyncio-native data access for tb_documents/tb_embeddings; every function takes an AsyncSession
+
+# Documents with a published partition that is not being deleted, i.e. searchable ones
+_searchable = Document.partition_name.isnot(None) & (Document.status != "deleting")
+
+
+async def file_exists(session, filename):
+    result = await session.execute(
+        select(Document.id).where(Document.filename == filename, _searchable)
+    )
+    return result.first() is not None
+
+
+async def get_document(session, document_id=None):
+    """Catalog row of ``document_id`` or, without one, of the most recently ingested searchable document."""
+    statement = select(Document).where(_searchable)
+    if document_id is not None:
+        statement = statement.where(Document.id == document_id)
+    else:
+        statement = statement.order_by(Document.ingest_finished_at.desc(), Document.id.desc()).limit(1)
+    result = await session.execute(statement)
+    return result.scalars().first()
+
+
+async def set_search_params(session, limit, ef_search=None, probes=None):
+    """
+    Override the ANN search knobs for the current transaction.
+
+    ``ef_search`` is raised to the search depth of ``limit`` (the re-rank candidates with a
+    quantized index) because HNSW never returns more than ef_search rows. Nothing is sent
+    when neither knob is given; the connection defaults from config apply.
+    """
+    settings = {}
+    if ef_search is not None:
+        settings["hnsw.ef_search"] = max(ef_search, search_depth(limit))
+    if probes is not None:
+        settings["ivfflat.probes"] = probes
+    if settings:
+        await session.execute(select(*[
+            func.set_config(name, str(value), True) for name, value in settings.items()
+        ]))
+
+
+async def search_chunks(session, embedding, filename=None, pdf_id=None, limit=5, ef_search=None, probes=None):
+    """Return the chunk texts closest to ``embedding``, optionally scoped to one filename or pdf_id."""
+    await set_search_params(session, limit, ef_search, probes)
+    criteria = []
+    if filename is not None:
+        criteria.append(PdfEmbedding.filename == filename)
+    if pdf_id is not None:
+        criteria.append(PdfEmbedding.pdf_id == pdf_id)
+    statement = nearest_chunks(embedding, [PdfEmbedding.chunk_text], *criteria, limit=limit)
+
+    result = await session.execute(statement)
+    return list(result.scalars().all())
+
+
+async def search_chunks_hybrid(session, query_text, embedding=None, filename=None, limit=5, ef_search=None,
+                               probes=None):
+    """
+    Return the chunk texts that best answer ``query_text``, fusing vector and full-text search
+    in one query (see hybrid_chunks). Without ``embedding`` only the full-text search runs.
+    """
+    criteria = [PdfEmbedding.filename == filename] if filename is not None else []
+    if embedding is None:
+        statement = keyword_chunks(query_text, [PdfEmbedding.chunk_text], *criteria, limit=limit)
+    else:
+        await set_search_params(session, max(limit, config.HYBRID_CANDIDATES), ef_search, probes)
+        statement = hybrid_chunks(embedding, query_text, [PdfEmbedding.chunk_text], *criteria, limit=limit)
+
+    result = await session.execute(statement)
+    return list(result.scalars().all())
+
+
+async def search_chunks_batch(session, embeddings, filename, limit=5, ef_search=None, probes=None):
+    """
+    Top-``limit`` chunks of ``filename`` for several query vectors in one round trip.
+
+    The vectors are sent as one text array, unnested WITH ORDINALITY and joined
+    LATERAL to a per-vector nearest-neighbour subquery.
+
+    :return: One list of chunk texts per embedding, in input order.
+    """
+    await set_search_params(session, limit, ef_search, probes)
+    vector_texts = [Vector(embedding).to_text() for embedding in embeddings]
+    queries = func.unnest(cast(vector_texts, ARRAY(Text))).table_valued(
+        "vector_text", with_ordinality="position"
+    ).render_derived(name="queries")
+    hits = nearest_chunks(
+        cast(queries.c.vector_text, PdfEmbedding.embedding.type), [PdfEmbedding.chunk_text],
+        PdfEmbedding.filename == filename, limit=limit,
+    ).lateral("hits")
+    statement = (
+        select(queries.c.position, hits.c.chunk_text)
+        .select_from(queries.join(hits, true()))
+        .order_by(queries.c.position, hits.c.score)
+    )
+
+    result = await session.execute(statement)
+    related_chunks = [[] for _ in vector_texts]
+    for row in result:
+        related_chunks[row.position - 1].append(row.chunk_text)
+    return related_chunks
+
+
+def _document_scope(filenames=None, prefix=None):
+    """WHERE clause on tb_documents for a list of filenames, a filename prefix or, with neither, every document."""
+    if filenames is not None:
+        return Document.filename.in_(filenames)
+    if prefix is not None:
+        return Document.filename.startswith(prefix, autoescape=True)
+    return true()
+
+
+async def search_corpus(session, embedding, filenames=None, prefix=None, limit=5, per_document_limit=None,
+                        ef_search=None, probes=None):
+    """
+    Nearest chunks to ``embedding`` across several documents.
+
+    Without ``per_document_limit`` this is one global top-``limit`` query. With it, the
+    documents in scope are joined LATERAL to a per-document top-N subquery, so every
+    document contributes its own best chunks in the same round trip.
+
+    :return: Hits as dicts with filename, chunk_index, chunk_text, page_start, page_end and
+        score (distance in VECTOR_DISTANCE_METRIC, lower is closer), ordered by score.
+    """
+    await set_search_params(session, per_document_limit or limit, ef_search, probes)
+    columns = [PdfEmbedding.filename, PdfEmbedding.chunk_index, PdfEmbedding.chunk_text,
+               PdfEmbedding.page_start, PdfEmbedding.page_end]
+
+    if per_document_limit is None:
+        criteria = []
+        if filenames is not None:
+            criteria.append(PdfEmbedding.filename.in_(filenames))
+        elif prefix is not None:
+            # Resolved through the catalog first, so the planner prunes to the matching partitions
+            matching = (await session.execute(
+                select(Document.filename).where(_document_scope(prefix=prefix), _searchable)
+            )).scalars().all()
+            if not matching:
+                return []
+            criteria.append(PdfEmbedding.filename.in_(matching))
+        statement = nearest_chunks(embedding, columns, *criteria, limit=limit)
+    else:
+        documents = (
+            select(Document.filename).where(_document_scope(filenames, prefix), _searchable).subquery("documents")
+        )
+        hits = nearest_chunks(
+            embedding, columns[1:], PdfEmbedding.filename == documents.c.filename, limit=per_document_limit
+        ).lateral("hits")
+        statement = (
+            select(documents.c.filename, hits.c.chunk_index, hits.c.chunk_text, hits.c.page_start, hits.c.page_end,
+                   hits.c.score)
+            .select_from(documents.join(hits, true()))
+            .order_by(hits.c.score)
+        )
+
+    result = await session.execute(statement)
+    return [
+        {"filename": row.filename, "chunk_index": row.chunk_index, "chunk_text": row.chunk_text,
+         "page_start": row.page_start, "page_end": row.page_end, "score": row.score}
+        for row in result
+    ]
+
+
+async def list_indexed_files(session):
+    result = await session.execute(
+        select(Document).where(_searchable).order_by(Document.filename)
+    )
+    return [
+        {
+            "filename": document.filename,
+            "chunk_count": document.chunk_count,
+            "document_id": document.id,
+            "status": document.status,
+            "ingested_at": document.ingest_finished_at,
+        }
+        for document in result.scalars()
+    ]
+
+
+async def _detach_and_drop(session, partition_name):
+    """
+    Detach ``partition_name`` from tb_embeddings with DETACH PARTITION ... CONCURRENTLY and drop it.
+
+    CONCURRENTLY cannot run inside a transaction block, so this runs on the session's
+    connection in autocommit. A detach interrupted by a failure is completed with FINALIZE.
+    """
+    connection = await session.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+    pending = (await connection.execute(text(
+        "SELECT inhdetachpending FROM pg_inherits WHERE inhrelid = to_regclass(:name)"
+    ), {"name": partition_name})).scalar()
+    if pending is not None:
+        mode = "FINALIZE" if pending else "CONCURRENTLY"
+        await connection.execute(text(f"ALTER TABLE tb_embeddings DETACH PARTITION {partition_name} {mode}"))
+    await connection.execute(text(f"DROP TABLE IF EXISTS {partition_name}"))
+    await session.commit()
+
+
+async def delete_records(session, filename):
+    """
+    Delete ``filename`` from the catalog and drop its partition.
+
+    The document is marked deleting first, which takes it out of search. Its partition is
+    then detached concurrently, so searches of other documents are not blocked, and dropped
+    before the catalog row goes. An interrupted delete keeps the partition name in the
+    catalog and finishes when retried.
+
+    :return: How many chunks were removed, 0 if the document is unknown.
+    """
+    document = (await session.execute(
+        select(Document).where(Document.filename == filename).with_for_update()
+    )).scalars().first()
+    if document is None:
+        await session.commit()
+        return 0
+    document_id, partition_name, deleted_rows = document.id, document.partition_name, 0
+    if partition_name:
+        deleted_rows = document.chunk_count
+        await session.execute(update(Document).where(Document.id == document_id).values(status="deleting"))
+        await session.commit()
+        await _detach_and_drop(session, partition_name)
+    await session.execute(delete(Document).where(Document.id == document_id))
+    await session.commit()
+    return deleted_rows
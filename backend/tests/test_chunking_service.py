@@ -0,0 +1,90 @@
+import re
+import pytest
+
+from backend.services.chunkingService import chunk_pages, iter_chunks
+
+
+class WordPieceTokenizer:
+    """Offline stand-in for the bge-m3 tokenizer: one token per word, words over 6 characters become two."""
+
+    def __call__(self, texts, add_special_tokens, return_offsets_mapping):
+        encoded = {"input_ids": [], "offset_mapping": []}
+        for text in texts:
+            ids, offsets = [], []
+            for match in re.finditer(r"\S+", text):
+                start, end = match.span()
+                pieces = [(start, end)] if end - start <= 6 else [(start, start + 6), (start + 6, end)]
+                for piece in pieces:
+                    ids.append(len(text[piece[0]:piece[1]]) + 3)
+                    offsets.append(piece)
+            encoded["input_ids"].append(ids)
+            encoded["offset_mapping"].append(offsets)
+        return encoded
+
+    def num_special_tokens_to_add(self):
+        return 2
+
+    def build_inputs_with_special_tokens(self, ids):
+        return [0] + ids + [2]
+
+
+def test_chunks_are_packed_to_the_token_target_across_pages():
+    """
+    This test controls that chunks are filled to the token target, flow across pages and record their page span.
+    Returns: Success/Fail statement
+
+    """
+    pages = [" ".join(f"a{i}" for i in range(30)), " ".join(f"b{i}" for i in range(30))]
+
+    chunks = chunk_pages(pages, WordPieceTokenizer(), target_tokens=22, overlap_tokens=0)
+
+    assert [len(chunk.input_ids) for chunk in chunks] == [22, 22, 22]
+    assert all(chunk.input_ids[0] == 0 and chunk.input_ids[-1] == 2 for chunk in chunks)
+    # The second chunk starts on page 1 and ends on page 2 instead of leaving a 10-word tail chunk
+    assert (chunks[1].page_start, chunks[1].page_end) == (1, 2)
+    assert chunks[1].text == " ".join(f"a{i}" for i in range(20, 30)) + "\n" + " ".join(f"b{i}" for i in range(10))
+    assert chunks[2].text == " ".join(f"b{i}" for i in range(10, 30))
+
+
+def test_overlap_and_word_boundaries():
+    """
+    This test controls that consecutive chunks share the configured overlap and never split a word.
+    Returns: Success/Fail statement
+
+    """
+    pages = [" ".join(["short", "verylongword"] * 20)]
+
+    chunks = chunk_pages(pages, WordPieceTokenizer(), target_tokens=12, overlap_tokens=3)
+
+    words = set(pages[0].split())
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert set(chunk.text.split()) <= words
+        assert previous.text.split()[-1] == chunk.text.split()[1] or previous.text.split()[-1] == chunk.text.split()[0]
+    assert all(len(chunk.input_ids) <= 12 for chunk in chunks)
+    assert " ".join(chunks[-1].text.split()[-2:]) == "short verylongword"
+
+
+def test_overlap_must_leave_room_for_progress():
+    """
+    This test controls that an overlap larger than half the chunk is rejected.
+    Returns: Success/Fail statement
+
+    """
+    with pytest.raises(ValueError):
+        chunk_pages(["some text"], WordPieceTokenizer(), target_tokens=12, overlap_tokens=8)
+
+
+def test_streamed_pages_give_the_same_chunks():
+    """
+    This test controls that chunking pages from a generator gives the same chunks as chunking the page list.
+    Returns: Success/Fail statement
+
+    """
+    pages = [" ".join(f"p{page}w{i}" for i in range(13 * page)) for page in range(6)]
+
+    expected = chunk_pages(pages, WordPieceTokenizer(), target_tokens=12, overlap_tokens=2)
+    streamed = list(iter_chunks((page for page in pages), WordPieceTokenizer(), target_tokens=12, overlap_tokens=2))
+
+    assert [(c.text, c.input_ids, c.page_start, c.page_end) for c in streamed] == \
+        [(c.text, c.input_ids, c.page_start, c.page_end) for c in expected]
+    assert (expected[0].page_start, expected[-1].page_end) == (2, 6)
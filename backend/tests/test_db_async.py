@@ -0,0 +1,47 @@
+from unittest.mock import patch
+import pytest
+
+from backend.database import db_async
+from backend.config import config
+
+
+@pytest.fixture
+def fresh_async_engine_state():
+    db_async._async_engine = None
+    db_async._async_session_factory = None
+    yield
+    db_async._async_engine = None
+    db_async._async_session_factory = None
+
+
+@patch('backend.database.db_async.event')
+@patch('backend.database.db_async.create_async_engine')
+def test_async_pool_stats_report_the_request_pool(mock_create_async_engine, mock_event, fresh_async_engine_state):
+    """
+    This test controls the pool utilization metrics of the asyncpg engine serving the search routes.
+    Args:
+        mock_create_async_engine:
+        mock_event:
+        fresh_async_engine_state:
+
+    Returns: Success/Fail statement
+
+    """
+    assert db_async.async_pool_stats()["initialized"] is False
+
+    mock_pool = mock_create_async_engine.return_value.pool
+    mock_pool.size.return_value = config.DB_POOL_SIZE
+    mock_pool.checkedin.return_value = 1
+    mock_pool.checkedout.return_value = 4
+    mock_pool.overflow.return_value = -1
+    db_async.get_async_engine()
+
+    stats = db_async.async_pool_stats()
+
+    assert stats["initialized"] is True
+    assert stats["checked_out"] == 4
+    assert stats["utilization"] == round(4 / (config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW), 4)
+    # Counted on the wrapped synchronous engine, where pool events fire
+    listened = [call.args[:2] for call in mock_event.listen.call_args_list]
+    assert listened == [(mock_create_async_engine.return_value.sync_engine, "connect"),
+                        (mock_create_async_engine.return_value.sync_engine, "checkout")]
@@ -0,0 +1,116 @@
+import struct
+from unittest.mock import MagicMock
+import numpy as np
+
+from backend.database.db_copy import (
+    encode_chunk_rows, copy_chunk_rows, copy_chunk_batches, COPY_SIGNATURE, COPY_TRAILER
+)
+from backend.services.chunkingService import Chunk
+
+
+def decode_rows(data, dim):
+    """Parse binary COPY tuples produced for tb_embeddings back into Python values."""
+    rows, offset = [], 0
+    while offset < len(data):
+        (field_count,) = struct.unpack_from("!h", data, offset)
+        offset += 2
+        fields = []
+        for _ in range(field_count):
+            (length,) = struct.unpack_from("!i", data, offset)
+            offset += 4
+            fields.append(data[offset:offset + length])
+            offset += length
+        pdf_id, filename, chunk_index, chunk_text, page_start, page_end, vector = fields
+        vector_dim, unused = struct.unpack_from("!hh", vector)
+        assert (vector_dim, unused) == (dim, 0)
+        rows.append((
+            struct.unpack("!i", pdf_id)[0],
+            filename.decode("utf-8"),
+            struct.unpack("!i", chunk_index)[0],
+            chunk_text.decode("utf-8"),
+            (struct.unpack("!i", page_start)[0], struct.unpack("!i", page_end)[0]),
+            np.frombuffer(vector[4:], dtype=">f4").astype(np.float32),
+        ))
+    return rows
+
+
+def test_encode_chunk_rows_uses_pgvector_binary_format():
+    """
+    This test controls that chunk rows are encoded as binary COPY tuples with pgvector's binary vector layout.
+    Returns: Success/Fail statement
+
+    """
+    embeddings = np.array([[0.5, -1.25, 3.0], [1.0, 2.0, 4.0]], dtype=np.float32)
+
+    chunks = [Chunk("first chunk", [0, 5, 2], 1, 1), Chunk("ikinci parça", [0, 6, 2], 1, 2)]
+
+    data = encode_chunk_rows(7, "contract.pdf", chunks, embeddings, start_index=10)
+    rows = decode_rows(data, dim=3)
+
+    assert [row[:5] for row in rows] == [
+        (7, "contract.pdf", 10, "first chunk", (1, 1)),
+        (7, "contract.pdf", 11, "ikinci parça", (1, 2)),
+    ]
+    assert np.array_equal(rows[0][5], embeddings[0])
+    assert np.array_equal(rows[1][5], embeddings[1])
+
+
+def test_copy_chunk_rows_streams_one_binary_copy():
+    """
+    This test controls that a document is written with one binary COPY, flushed in blocks of flush_rows rows.
+    Returns: Success/Fail statement
+
+    """
+    mock_session = MagicMock()
+    cursor = mock_session.connection.return_value.connection.cursor.return_value.__enter__.return_value
+    streamed = {}
+
+    def copy_expert(statement, stream, size):
+        streamed["statement"] = statement
+        streamed["data"] = b"".join(iter(lambda: stream.read(7), b""))
+
+    cursor.copy_expert.side_effect = copy_expert
+    flushed = []
+    chunks = [Chunk(f"chunk {i}", [0, i, 2], i + 1, i + 1) for i in range(5)]
+    embeddings = np.arange(10, dtype=np.float32).reshape(5, 2)
+
+    copied = copy_chunk_rows(mock_session, "tb_embeddings_doc_1_0a1b2c3d", 1, "a.pdf", chunks, embeddings,
+                             flush_rows=2, on_flush=flushed.append)
+
+    assert copied == 5
+    assert flushed == [2, 2, 1]
+    assert streamed["statement"] == (
+        "COPY tb_embeddings_doc_1_0a1b2c3d (pdf_id, filename, chunk_index, chunk_text, page_start, page_end, embedding) "
+        "FROM STDIN WITH (FORMAT binary)"
+    )
+    data = streamed["data"]
+    assert data.startswith(COPY_SIGNATURE) and data.endswith(COPY_TRAILER)
+    rows = decode_rows(data[len(COPY_SIGNATURE):-len(COPY_TRAILER)], dim=2)
+    assert [row[2] for row in rows] == [0, 1, 2, 3, 4]
+    assert [row[4] for row in rows] == [(page, page) for page in range(1, 6)]
+    assert np.array_equal(np.stack([row[5] for row in rows]), embeddings)
+    # The load is part of the caller's transaction
+    mock_session.commit.assert_not_called()
+
+
+def test_copy_chunk_batches_numbers_chunks_across_batches():
+    """
+    This test controls that batches arriving from the pipeline are written as one COPY with continuous chunk indexes.
+    Returns: Success/Fail statement
+
+    """
+    mock_session = MagicMock()
+    cursor = mock_session.connection.return_value.connection.cursor.return_value.__enter__.return_value
+    streamed = {}
+    cursor.copy_expert.side_effect = lambda statement, stream, size: streamed.setdefault("data", stream.read())
+    chunks = [Chunk(f"chunk {i}", [0, i, 2], 1, 1) for i in range(5)]
+    embeddings = np.arange(10, dtype=np.float32).reshape(5, 2)
+    # A generator, as produced by the embedding stage
+    batches = ((chunks[start:start + 3], embeddings[start:start + 3]) for start in (0, 3))
+
+    copied = copy_chunk_batches(mock_session, "tb_embeddings_doc_1_0a1b2c3d", 1, "a.pdf", batches, flush_rows=2)
+
+    assert copied == 5
+    cursor.copy_expert.assert_called_once()
+    rows = decode_rows(streamed["data"][len(COPY_SIGNATURE):-len(COPY_TRAILER)], dim=2)
+    assert [(row[2], row[3]) for row in rows] == [(i, f"chunk {i}") for i in range(5)]
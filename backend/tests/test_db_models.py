@@ -0,0 +1,492 @@
+import hashlib
+import os
+import threading
+import time
+from unittest.mock import patch, MagicMock
+import pytest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+from backend.database import db_models
+from backend.config import config
+
+
+@pytest.fixture
+def fresh_engine_state():
+    db_models._engine = None
+    db_models._session_factory = None
+    db_models._schema_ready = False
+    yield
+    db_models._engine = None
+    db_models._session_factory = None
+    db_models._schema_ready = False
+
+
+@patch('backend.database.db_models.event')
+@patch('backend.database.db_models.Base')
+@patch('backend.database.db_models.create_engine')
+def test_sessions_share_one_pooled_engine(mock_create_engine, mock_base, mock_event, fresh_engine_state):
+    """
+    This test controls that sessions reuse one engine and the schema is created only once.
+    Args:
+        mock_create_engine:
+        mock_base:
+        mock_event:
+        fresh_engine_state:
+
+    Returns: Success/Fail statement
+
+    """
+    mock_create_engine.return_value = MagicMock()
+
+    first = db_models.create_db_and_table()
+    second = db_models.create_db_and_table()
+
+    assert first is not second
+    mock_create_engine.assert_called_once_with(
+        config.database_url,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+        pool_recycle=config.DB_POOL_RECYCLE_SECONDS,
+        pool_timeout=config.DB_POOL_TIMEOUT_SECONDS,
+        connect_args={"options": f"-c hnsw.ef_search={config.HNSW_EF_SEARCH} -c ivfflat.probes={config.IVFFLAT_PROBES}"},
+    )
+    assert mock_base.metadata.create_all.call_count == 1
+
+
+
+@patch('backend.database.db_models.event')
+@patch('backend.database.db_models.Base')
+@patch('backend.database.db_models.create_engine')
+def test_concurrent_first_sessions_create_the_schema_once(mock_create_engine, mock_base, mock_event,
+                                                          fresh_engine_state):
+    """
+    This test controls that concurrent first requests do not run the schema DDL more than once.
+    Args:
+        mock_create_engine:
+        mock_base:
+        mock_event:
+        fresh_engine_state:
+
+    Returns: Success/Fail statement
+
+    """
+    mock_engine = MagicMock()
+    mock_create_engine.return_value = mock_engine
+    mock_base.metadata.create_all.side_effect = lambda connection: time.sleep(0.05)
+
+    threads = [threading.Thread(target=db_models.create_db_and_table) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert mock_base.metadata.create_all.call_count == 1
+    connection = mock_engine.begin.return_value.__enter__.return_value
+    assert "pg_advisory_xact_lock" in str(connection.execute.call_args_list[0].args[0])
+
+@patch('backend.database.db_models.event')
+@patch('backend.database.db_models.create_engine')
+def test_pool_stats_reports_utilization(mock_create_engine, mock_event, fresh_engine_state):
+    """
+    This test controls the pool utilization metrics.
+    Args:
+        mock_create_engine:
+        mock_event:
+        fresh_engine_state:
+
+    Returns: Success/Fail statement
+
+    """
+    assert db_models.pool_stats()["initialized"] is False
+
+    mock_pool = mock_create_engine.return_value.pool
+    mock_pool.size.return_value = config.DB_POOL_SIZE
+    mock_pool.checkedin.return_value = 2
+    mock_pool.checkedout.return_value = 3
+    mock_pool.overflow.return_value = -2
+    db_models.get_engine()
+
+    stats = db_models.pool_stats()
+
+    assert stats["checked_out"] == 3
+    assert stats["overflow"] == 0
+    assert stats["utilization"] == round(3 / (config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW), 4)
+
+
+def _index_connection(mock_get_engine, current, row_count=0):
+    """Wire a mock AUTOCOMMIT connection answering the rows-per-document (ivfflat), lock and index queries."""
+    db_models._ivfflat_lists_checked = None
+    connection = mock_get_engine.return_value.connect.return_value.execution_options.return_value.__enter__.return_value
+    responses = iter([
+        *([MagicMock(scalar=MagicMock(return_value=row_count))] if config.VECTOR_INDEX_TYPE == "ivfflat" else []),
+        MagicMock(scalar=MagicMock(return_value=True)),
+        MagicMock(first=MagicMock(return_value=current)),
+    ])
+    connection.execute.side_effect = lambda *args, **kwargs: next(responses, MagicMock())
+    return connection
+
+
+def executed_sql(connection):
+    return [str(call.args[0]) for call in connection.execute.call_args_list]
+
+
+@patch.object(config, 'VECTOR_INDEX_TYPE', 'ivfflat')
+@patch('backend.database.db_models.get_engine')
+def test_ivfflat_is_rebuilt_when_lists_drift(mock_get_engine):
+    """
+    This test controls that an ivfflat index built with lists=100 is rebuilt for 5000 rows per document (lists=5).
+    Args:
+        mock_get_engine:
+
+    Returns: Success/Fail statement
+
+    """
+    current = MagicMock(amname="ivfflat", reloptions=["lists=100"],
+                        definition="CREATE INDEX idx_embedding ON public.tb_embeddings USING ivfflat (embedding vector_cosine_ops)")
+    connection = _index_connection(mock_get_engine, current, row_count=5000)
+
+    assert db_models.ensure_vector_index() is True
+
+    statements = executed_sql(connection)
+    assert any("CREATE INDEX idx_embedding ON tb_embeddings USING ivfflat" in sql and "lists = 5" in sql
+               for sql in statements)
+    assert "pg_advisory_unlock" in statements[-1]
+    assert statements[0] == "SELECT avg(chunk_count) FROM tb_documents WHERE partition_name IS NOT NULL"
+    assert not any("FROM tb_embeddings" in sql for sql in statements)
+
+    # Later ingests only read the catalog until the ideal lists drifts 2x from the built value
+    connection.execute.reset_mock(side_effect=True)
+    connection.execute.return_value = MagicMock(scalar=MagicMock(return_value=8000))
+    assert db_models.ensure_vector_index() is False
+    assert executed_sql(connection) == ["SELECT avg(chunk_count) FROM tb_documents WHERE partition_name IS NOT NULL"]
+
+
+@patch.object(config, 'VECTOR_INDEX_TYPE', 'ivfflat')
+@patch('backend.database.db_models.get_engine')
+def test_ivfflat_is_not_built_on_an_empty_table(mock_get_engine):
+    """
+    This test controls that ivfflat centroids are never computed from an empty table.
+    Args:
+        mock_get_engine:
+
+    Returns: Success/Fail statement
+
+    """
+    connection = _index_connection(mock_get_engine, None, row_count=0)
+
+    assert db_models.ensure_vector_index() is False
+    assert not any("CREATE INDEX" in sql for sql in executed_sql(connection))
+
+
+@patch.object(config, 'VECTOR_INDEX_TYPE', 'hnsw')
+@patch('backend.database.db_models.get_engine')
+def test_matching_hnsw_index_is_kept_and_metric_change_rebuilds(mock_get_engine):
+    """
+    This test controls that a matching HNSW index is left alone and one built for another metric is replaced.
+    Args:
+        mock_get_engine:
+
+    Returns: Success/Fail statement
+
+    """
+    options = [f"m={config.HNSW_M}", f"ef_construction={config.HNSW_EF_CONSTRUCTION}"]
+    matching = MagicMock(amname="hnsw", reloptions=options,
+                         definition="CREATE INDEX idx_embedding ON public.tb_embeddings USING hnsw (embedding vector_cosine_ops)")
+    _index_connection(mock_get_engine, matching)
+    assert db_models.ensure_vector_index() is False
+
+    other_metric = MagicMock(amname="hnsw", reloptions=options,
+                             definition="CREATE INDEX idx_embedding ON public.tb_embeddings USING hnsw (embedding vector_l2_ops)")
+    _index_connection(mock_get_engine, other_metric)
+    assert db_models.ensure_vector_index() is True
+
+
+@patch.object(config, 'VECTOR_INDEX_TYPE', 'hnsw')
+@patch.object(config, 'VECTOR_INDEX_QUANTIZATION', 'binary')
+@patch('backend.database.db_models.get_engine')
+def test_binary_quantization_builds_hamming_expression_index(mock_get_engine):
+    """
+    This test controls that switching a float32 index to binary quantization rebuilds it over binary_quantize(embedding).
+    Args:
+        mock_get_engine:
+
+    Returns: Success/Fail statement
+
+    """
+    current = MagicMock(amname="hnsw", reloptions=["m=16", "ef_construction=64"],
+                        definition="CREATE INDEX idx_embedding ON ONLY public.tb_embeddings USING hnsw (embedding vector_cosine_ops)")
+    connection = _index_connection(mock_get_engine, current)
+
+    assert db_models.ensure_vector_index() is True
+    assert any("USING hnsw ((binary_quantize(embedding)::bit(1024)) bit_hamming_ops)" in sql
+               for sql in executed_sql(connection))
+
+
+@patch.object(config, 'VECTOR_INDEX_QUANTIZATION', 'halfvec')
+@patch.object(config, 'VECTOR_RERANK_CANDIDATES', 50)
+def test_quantized_search_reranks_candidates_by_exact_distance():
+    """
+    This test controls the two-stage search: candidates ordered by the halfvec index expression, re-ranked in float32.
+    Returns: Success/Fail statement
+
+    """
+    statement = db_models.nearest_chunks([0.1, 0.2], [db_models.PdfEmbedding.chunk_text],
+                                         db_models.PdfEmbedding.filename == "a.pdf", limit=5)
+    compiled = statement.compile(dialect=postgresql.dialect())
+    sql = str(compiled)
+
+    assert "ORDER BY CAST(tb_embeddings.embedding AS HALFVEC(1024)) <=> CAST(" in sql
+    assert "ORDER BY candidates.candidate_embedding <=> " in sql
+    assert sorted(value for value in compiled.params.values() if isinstance(value, int)) == [5, 50]
+    assert db_models.search_settings()["hnsw.ef_search"] == str(max(config.HNSW_EF_SEARCH, 50))
+
+
+@patch.object(config, 'VECTOR_INDEX_QUANTIZATION', 'none')
+@patch.object(config, 'HYBRID_CANDIDATES', 40)
+def test_hybrid_search_fuses_vector_and_text_ranks_in_one_statement():
+    """
+    This test controls that hybrid search ranks by vector and full-text search and fuses both ranks in one query.
+    Returns: Success/Fail statement
+
+    """
+    statement = db_models.hybrid_chunks([0.1, 0.2], "termination notice", [db_models.PdfEmbedding.chunk_text],
+                                        db_models.PdfEmbedding.filename == "a.pdf", limit=5)
+    compiled = statement.compile(dialect=postgresql.dialect())
+    sql = str(compiled)
+
+    assert sql.startswith("WITH semantic AS")
+    assert "lexical AS" in sql
+    assert "UNION ALL" in sql
+    assert "websearch_to_tsquery" in sql
+    assert "ts_rank_cd(tb_embeddings.chunk_tsv" in sql
+    assert "tb_embeddings.chunk_tsv @@ " in sql
+    limits = [value for value in compiled.params.values() if isinstance(value, int)]
+    assert limits.count(40) == 2 and 5 in limits
+
+    keyword_sql = str(db_models.keyword_chunks("termination notice", [db_models.PdfEmbedding.chunk_text])
+                      .compile(dialect=postgresql.dialect()))
+    assert "<=>" not in keyword_sql
+    assert "ORDER BY ts_rank_cd(tb_embeddings.chunk_tsv" in keyword_sql
+
+
+def test_new_document_version_is_staged_then_published():
+    """
+    This test controls that a document is loaded into a fresh detached table, indexed before it is attached,
+    and that the previous partition is detached in the publishing transaction and dropped after it commits.
+    Returns: Success/Fail statement
+
+    """
+    mock_session = MagicMock()
+    statements = []
+
+    def execute(statement, *args):
+        statements.append(str(statement))
+        result = MagicMock()
+        if "pg_get_indexdef" in statements[-1]:
+            result.scalars.return_value.all.return_value = [
+                "CREATE INDEX idx_embedding ON ONLY public.tb_embeddings USING hnsw (embedding vector_cosine_ops)",
+                "CREATE INDEX idx_embeddings_pdf_id ON ONLY public.tb_embeddings USING btree (pdf_id)",
+            ]
+        else:
+            result.scalars.return_value.all.return_value = ["tb_embeddings_doc_3_deadbeef"]
+        result.scalar.return_value = "tb_embeddings_doc_3_0a1b2c3d"
+        return result
+
+    mock_session.execute.side_effect = execute
+    mock_session.commit.side_effect = lambda: statements.append("COMMIT")
+
+    name = db_models.stage_document_partition(mock_session, 3, "o'neil contract.pdf")
+    db_models.publish_document_partition(mock_session, 3, "o'neil contract.pdf", name, 12, "BAAI/bge-m3:mean")
+
+    assert name.startswith("tb_embeddings_doc_3_")
+    # Leftover of an interrupted load is dropped before staging
+    assert "DROP TABLE IF EXISTS tb_embeddings_doc_3_deadbeef" in statements
+    assert f"CREATE TABLE {name} (LIKE tb_embeddings INCLUDING DEFAULTS INCLUDING GENERATED)" in statements
+    # Indexes and constraints exist before the attach, so it adopts them instead of building them
+    attach = statements.index(
+        f"ALTER TABLE tb_embeddings ATTACH PARTITION {name} FOR VALUES IN ('o''neil contract.pdf')"
+    )
+    prepared = [
+        f"CREATE INDEX ON {name} USING hnsw (embedding vector_cosine_ops)",
+        f"CREATE INDEX ON {name} USING btree (pdf_id)",
+        f"ALTER TABLE {name} ADD PRIMARY KEY (id, filename)",
+        f"ALTER TABLE {name} ADD FOREIGN KEY (pdf_id) REFERENCES tb_documents (id) ON DELETE CASCADE",
+    ]
+    assert all(statements.index(statement) < attach for statement in prepared)
+    # The previous version is detached in the publishing transaction and dropped once it committed
+    detach = statements.index("ALTER TABLE tb_embeddings DETACH PARTITION tb_embeddings_doc_3_0a1b2c3d")
+    drop = statements.index("DROP TABLE IF EXISTS tb_embeddings_doc_3_0a1b2c3d")
+    publish_commit = statements.index("COMMIT", attach)
+    assert "COMMIT" not in statements[detach:attach]
+    assert any(statement.startswith("UPDATE tb_documents") for statement in statements[attach:publish_commit])
+    assert publish_commit < drop
+    assert statements[-1] == "COMMIT"
+
+
+def test_document_ids_default_to_the_sequence_server_side():
+    """
+    This test controls that tb_documents.id is filled by the server, as the migrations insert without an id.
+    Returns: Success/Fail statement
+
+    """
+    ddl = str(CreateTable(db_models.Document.__table__).compile(dialect=postgresql.dialect()))
+
+    assert "id INTEGER DEFAULT nextval('tb_documents_id_seq') NOT NULL" in ddl
+
+
+@pytest.mark.skipif(not os.getenv("MIGRATION_TEST_DATABASE_URL"),
+                    reason="needs a disposable Postgres with pgvector in MIGRATION_TEST_DATABASE_URL")
+def test_baseline_table_is_migrated_into_catalogued_partitions(fresh_engine_state):
+    """
+    This test controls the startup migration of a tb_embeddings shaped like the first release into
+    per-document partitions cataloged in tb_documents. It drops the tables of the database it runs on.
+    Returns: Success/Fail statement
+
+    """
+    engine = create_engine(os.environ["MIGRATION_TEST_DATABASE_URL"])
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS tb_embeddings, tb_documents, tb_embedding_cache CASCADE"))
+        connection.execute(text("DROP SEQUENCE IF EXISTS tb_documents_id_seq, tb_embeddings_unpartitioned_id_seq"))
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        connection.execute(text(
+            "CREATE TABLE tb_embeddings (id SERIAL PRIMARY KEY, pdf_id INTEGER, filename VARCHAR NOT NULL, "
+            "chunk_index INTEGER NOT NULL, chunk_text VARCHAR NOT NULL, embedding vector(1024) NOT NULL)"
+        ))
+        connection.execute(text(
+            "CREATE INDEX idx_embedding ON tb_embeddings USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100)"
+        ))
+        connection.execute(text(
+            "INSERT INTO tb_embeddings (pdf_id, filename, chunk_index, chunk_text, embedding) "
+            "SELECT 1, 'a.pdf', n, 'chunk ' || n, array_fill(0.1, ARRAY[1024])::vector FROM generate_series(0, 2) n "
+            "UNION ALL SELECT 2, 'b.pdf', 0, 'other', array_fill(0.2, ARRAY[1024])::vector"
+        ))
+
+    db_models._engine = engine
+    try:
+        db_models.init_db()
+        with engine.connect() as connection:
+            documents = connection.execute(text(
+                "SELECT filename, chunk_count, partition_name, status FROM tb_documents ORDER BY filename"
+            )).all()
+            partitions = connection.execute(text(
+                "SELECT count(*) FROM pg_inherits WHERE inhparent = 'tb_embeddings'::regclass"
+            )).scalar()
+            rows = connection.execute(text(
+                "SELECT count(*) FROM tb_embeddings e JOIN tb_documents d ON d.id = e.pdf_id"
+            )).scalar()
+    finally:
+        engine.dispose()
+
+    assert [(row.filename, row.chunk_count, row.status) for row in documents] == [("a.pdf", 3, "ready"),
+                                                                                  ("b.pdf", 1, "ready")]
+    assert all(row.partition_name for row in documents)
+    assert partitions == 2
+    assert rows == 4
+
+
+@patch('backend.database.db_models.get_engine')
+def test_document_ingest_lock_is_released_when_the_ingest_fails(mock_get_engine):
+    """
+    This test controls that the per-document ingest lock is taken on its own connection and released on failure.
+    Args:
+        mock_get_engine: Engine whose connection records the lock statements
+
+    Returns: Success/Fail statement
+
+    """
+    connection = mock_get_engine.return_value.connect.return_value.execution_options.return_value.__enter__.return_value
+
+    with pytest.raises(RuntimeError):
+        with db_models.document_ingest_lock(3):
+            raise RuntimeError("COPY failed")
+
+    calls = connection.execute.call_args_list
+    assert [str(call.args[0]) for call in calls] == ["SELECT pg_advisory_lock(:namespace, :id)",
+                                                    "SELECT pg_advisory_unlock(:namespace, :id)"]
+    assert all(call.args[1]["id"] == 3 for call in calls)
+
+
+def test_register_document_upserts_catalog_row():
+    """
+    This test controls that document ids come from the tb_documents upsert instead of max(pdf_id) + 1.
+    Returns: Success/Fail statement
+
+    """
+    mock_session = MagicMock()
+    mock_session.execute.return_value.scalar.return_value = 9
+
+    assert db_models.register_document(mock_session, "contract.pdf", "ab" * 32, 2048) == 9
+
+    sql = str(mock_session.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("INSERT INTO tb_documents")
+    assert "ON CONFLICT (filename) DO UPDATE" in sql
+    assert "RETURNING tb_documents.id" in sql
+    mock_session.commit.assert_called_once()
+
+
+def test_published_chunks_are_only_reused_from_the_same_embedding_model():
+    """
+    This test controls that deduplication and in-place updates only reuse embeddings of the current model id,
+    and that deduplication prefers the filename being ingested.
+    Returns: Success/Fail statement
+
+    """
+    mock_session = MagicMock()
+    db_models.find_indexed_document(mock_session, "ab" * 32, "BAAI/bge-m3:mean", "contract.pdf")
+    criteria = mock_session.query.return_value.filter.call_args.args
+    assert any(str(criterion.compile()).startswith("tb_documents.embedding_model = ") for criterion in criteria)
+    # The document being re-submitted wins over newer copies of the same content
+    ordering = mock_session.query.return_value.filter.return_value.order_by.call_args.args
+    assert str(ordering[0].compile(dialect=postgresql.dialect())).startswith("tb_documents.filename = ")
+
+    mock_session = MagicMock()
+    mock_session.execute.return_value.first.return_value = MagicMock(
+        partition_name="tb_embeddings_doc_5_0a1b2c3d", embedding_model="BAAI/bge-m3:mean:pytorch_bf16"
+    )
+    assert db_models.lock_published_chunks(mock_session, 5, "BAAI/bge-m3:mean") == (None, {})
+    mock_session.execute.assert_called_once()
+
+
+def test_copy_document_chunks_copies_rows_server_side():
+    """
+    This test controls that a duplicate PDF's chunks are copied with INSERT ... SELECT under the new filename.
+    Returns: Success/Fail statement
+
+    """
+    mock_session = MagicMock()
+    mock_session.execute.return_value.rowcount = 12
+
+    copied = db_models.copy_document_chunks(mock_session, "original.pdf", "tb_embeddings_doc_7_0a1b2c3d", 7, "copy.pdf")
+
+    assert copied == 12
+    statement, params = mock_session.execute.call_args.args
+    assert str(statement).startswith("INSERT INTO tb_embeddings_doc_7_0a1b2c3d")
+    assert "SELECT :document_id, :filename, chunk_index, chunk_text, page_start, page_end, embedding" in str(statement)
+    assert params == {"document_id": 7, "filename": "copy.pdf", "source_filename": "original.pdf"}
+    # The copy is part of the publish transaction
+    mock_session.commit.assert_not_called()
+
+
+def test_apply_chunk_update_renumbers_kept_rows_and_deletes_removed_ones():
+    """
+    This test controls that an in-place update renumbers kept rows, deletes removed rows and publishes in one commit.
+    Returns: Success/Fail statement
+
+    """
+    mock_session = MagicMock()
+
+    db_models.apply_chunk_update(mock_session, 5, "tb_embeddings_doc_5_0a1b2c3d",
+                                 [(10, 0, 1, 1), (12, 2, 2, 2)], {11}, 3)
+
+    renumber, delete, publish = [call.args for call in mock_session.execute.call_args_list]
+    assert str(renumber[0]).startswith("UPDATE tb_embeddings_doc_5_0a1b2c3d AS e SET chunk_index = m.chunk_index")
+    assert renumber[1] == {"ids": [10, 12], "chunk_indexes": [0, 2], "page_starts": [1, 2], "page_ends": [1, 2]}
+    assert str(delete[0]) == "DELETE FROM tb_embeddings_doc_5_0a1b2c3d WHERE id = ANY(:ids)"
+    assert delete[1] == {"ids": [11]}
+    sql = str(publish[0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("UPDATE tb_documents SET chunk_count")
+    mock_session.commit.assert_called_once()
+    assert db_models.chunk_text_hash("clause") == hashlib.sha256(b"clause").hexdigest()
@@ -0,0 +1,69 @@
+import threading
+
+import numpy as np
+import pytest
+
+from backend.services.embeddingBatcher import EmbeddingBatcher
+
+
+def test_concurrent_questions_share_one_forward_pass():
+    """
+    This test controls that concurrent callers are collected into one batch and get their own vectors back.
+    Returns: Success/Fail statement
+
+    """
+    calls = []
+
+    def embed_fn(texts):
+        calls.append(list(texts))
+        return np.array([[float(len(text))] for text in texts], dtype=np.float32)
+
+    batcher = EmbeddingBatcher(embed_fn, max_batch_size=4, max_wait_ms=2000)
+    questions = ["a", "bb", "ccc", "dddd"]
+    results = {}
+
+    def ask(question):
+        results[question] = batcher.embed(question)
+
+    threads = [threading.Thread(target=ask, args=(question,)) for question in questions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert sorted(calls[0]) == questions
+    assert {question: vector[0] for question, vector in results.items()} == {"a": 1, "bb": 2, "ccc": 3, "dddd": 4}
+    assert batcher.stats()["largest_batch"] == 4
+
+
+def test_single_question_is_flushed_after_max_wait():
+    """
+    This test controls that a lone caller is served after the wait window without filling the batch.
+    Returns: Success/Fail statement
+
+    """
+    batcher = EmbeddingBatcher(lambda texts: np.zeros((len(texts), 2), dtype=np.float32),
+                               max_batch_size=16, max_wait_ms=1)
+
+    vector = batcher.embed("termination clause")
+
+    assert vector.shape == (2,)
+    assert batcher.stats()["batches"] == 1
+
+
+def test_errors_reach_every_caller_in_the_batch():
+    """
+    This test controls that a failed forward pass is raised to the waiting callers and the batcher recovers.
+    Returns: Success/Fail statement
+
+    """
+    def failing(texts):
+        raise RuntimeError("CUDA out of memory")
+
+    batcher = EmbeddingBatcher(failing, max_batch_size=2, max_wait_ms=1)
+    with pytest.raises(RuntimeError):
+        batcher.embed("pricing")
+
+    batcher.embed_fn = lambda texts: np.ones((len(texts), 2), dtype=np.float32)
+    np.testing.assert_allclose(batcher.embed("pricing"), [1.0, 1.0])
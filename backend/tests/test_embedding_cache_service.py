@@ -0,0 +1,129 @@
+from unittest.mock import patch, MagicMock
+import numpy as np
+from sqlalchemy.dialects import postgresql
+
+from backend.services.embeddingCacheService import EmbeddingCache, text_hash
+
+
+def test_text_hash_normalizes_whitespace():
+    """
+    This test controls that whitespace differences map to the same cache key.
+    Returns: Success/Fail statement
+
+    """
+    assert text_hash("  summarize   the\npricing ") == text_hash("summarize the pricing")
+    assert text_hash("summarize the pricing") != text_hash("summarize the terms")
+
+
+def test_memory_tier_hit_miss_and_eviction():
+    """
+    This test controls the in-process LRU tier: hits, misses and size-bounded eviction.
+    Returns: Success/Fail statement
+
+    """
+    cache = EmbeddingCache(max_entries=2, use_db=False)
+
+    assert cache.get("first") is None
+    cache.put("first", [1.0, 2.0])
+    cache.put("second", [3.0, 4.0])
+    np.testing.assert_allclose(cache.get("first"), [1.0, 2.0])
+
+    cache.put("third", [5.0, 6.0])
+
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    stats = cache.stats()
+    assert stats["memory_hits"] == 2
+    assert stats["misses"] == 2
+    assert stats["evictions"] == 1
+    assert stats["size"] == 2
+
+
+@patch.object(EmbeddingCache, '_fetch_from_db')
+def test_db_tier_fills_memory_tier(mock_fetch_from_db):
+    """
+    This test controls that shared table hits are promoted to the in-process tier.
+    Args:
+        mock_fetch_from_db:
+
+    Returns: Success/Fail statement
+
+    """
+    cache = EmbeddingCache(max_entries=10, use_db=True)
+    mock_fetch_from_db.return_value = {text_hash("shared"): np.array([1.0], dtype=np.float32)}
+
+    results = cache.get_many(["shared", "unknown"])
+
+    np.testing.assert_allclose(results[0], [1.0])
+    assert results[1] is None
+    assert cache.get("shared") is not None
+    assert mock_fetch_from_db.call_count == 1
+    assert cache.stats()["db_hits"] == 1
+
+
+@patch.object(EmbeddingCache, '_fetch_from_db')
+def test_db_errors_are_treated_as_misses(mock_fetch_from_db):
+    """
+    This test controls that a database failure degrades to recomputing the embedding.
+    Args:
+        mock_fetch_from_db:
+
+    Returns: Success/Fail statement
+
+    """
+    cache = EmbeddingCache(max_entries=10, use_db=True)
+    mock_fetch_from_db.side_effect = Exception("connection refused")
+
+    assert cache.get("question") is None
+    assert cache.stats()["misses"] == 1
+
+
+@patch.object(EmbeddingCache, '_store_in_db')
+@patch.object(EmbeddingCache, '_fetch_from_db')
+def test_unshared_entries_stay_in_process(mock_fetch_from_db, mock_store_in_db):
+    """
+    This test controls that ingestion (shared=False) lookups and writes never touch the shared table.
+    Args:
+        mock_fetch_from_db:
+        mock_store_in_db:
+
+    Returns: Success/Fail statement
+
+    """
+    cache = EmbeddingCache(max_entries=10, use_db=True)
+
+    assert cache.get_many(["chunk"], shared=False) == [None]
+    cache.put_many(["chunk"], [[1.0, 2.0]], shared=False)
+
+    mock_fetch_from_db.assert_not_called()
+    mock_store_in_db.assert_not_called()
+    np.testing.assert_allclose(cache.get_many(["chunk"], shared=False)[0], [1.0, 2.0])
+
+
+@patch('backend.services.embeddingCacheService.create_db_and_table')
+@patch.object(EmbeddingCache, '_store_in_db')
+def test_shared_table_is_pruned_by_ttl_and_row_count(mock_store_in_db, mock_create_db_and_table):
+    """
+    This test controls that writes prune expired and least recently used rows, at most once per interval.
+    Args:
+        mock_store_in_db:
+        mock_create_db_and_table:
+
+    Returns: Success/Fail statement
+
+    """
+    mock_session = MagicMock()
+    mock_session.execute.return_value = MagicMock(rowcount=2)
+    mock_create_db_and_table.return_value = mock_session
+    cache = EmbeddingCache(max_entries=10, use_db=True, db_ttl_seconds=3600, db_max_rows=1000, prune_interval=60)
+
+    cache.put("question", [1.0])
+    cache.put("another question", [2.0])
+
+    statements = [str(call.args[0].compile(dialect=postgresql.dialect())) for call in mock_session.execute.call_args_list]
+    assert len(statements) == 2
+    assert statements[0].startswith("DELETE FROM tb_embedding_cache WHERE tb_embedding_cache.last_used_at < now() - ")
+    assert "IN (SELECT tb_embedding_cache.model_id, tb_embedding_cache.text_hash" in statements[1]
+    assert "ORDER BY tb_embedding_cache.last_used_at DESC" in statements[1]
+    mock_session.commit.assert_called_once()
+    assert cache.stats()["pruned_rows"] == 4
@@ -1,16 +1,18 @@
 
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from fastapi.testclient import TestClient
 from fastapi import FastAPI
+from backend.database.db_async import get_async_session
 from backend.routers.file_route import router
 
 app = FastAPI()
 app.include_router(router)
+app.dependency_overrides[get_async_session] = lambda: MagicMock()
 
 client = TestClient(app)
 
-@patch("backend.routers.file_route.delete_pdf_and_records")
+@patch("backend.routers.file_route.delete_pdf_and_records", new_callable=AsyncMock)
 def test_delete_pdf_and_records_route(mock_delete_pdf_and_records):
     """
     This test, controls pdf and records delete route's (/file/delete) behaviour under successful conditions.
@@ -34,7 +36,7 @@ def test_delete_pdf_and_records_route(mock_delete_pdf_and_records):
     mock_delete_pdf_and_records.assert_called_once_with(filename)
 
 
-@patch("backend.routers.file_route.delete_pdf_and_records")
+@patch("backend.routers.file_route.delete_pdf_and_records", new_callable=AsyncMock)
 def test_delete_pdf_and_records_route_failure(mock_delete_pdf_and_records):
     """
     This test, controls pdf and records delete route's /file/delete behaviour under failure conditions.
@@ -76,3 +78,23 @@ def test_list_files_route(mock_minio_list_files):
     assert response.status_code == 200
     assert response.json() == mock_file_list
     mock_minio_list_files.assert_called_once()
+
+
+@patch("backend.routers.file_route.list_indexed_files", new_callable=AsyncMock)
+def test_list_indexed_files_route(mock_list_indexed_files):
+    """
+    This test, controls indexed files (/file/indexed) behaviour under successful conditions.
+    Args:
+        mock_list_indexed_files:
+
+    Returns: Success/Fail statement
+
+    """
+
+    mock_list_indexed_files.return_value = [{"filename": "file1.pdf", "chunk_count": 12}]
+
+    response = client.get("/file/indexed")
+
+    assert response.status_code == 200
+    assert response.json() == {"files": [{"filename": "file1.pdf", "chunk_count": 12}]}
+    mock_list_indexed_files.assert_awaited_once()
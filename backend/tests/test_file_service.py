@@ -4,24 +4,31 @@ import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from unittest.mock import patch, MagicMock
+import asyncio
+from unittest.mock import patch, MagicMock, AsyncMock
 import pytest
 from backend.services.fileService import delete_pdf_and_records
 from backend.config import config
-from backend.database.db_models import PdfEmbedding
 from fastapi import HTTPException
 from minio.error import S3Error
 
 
+def mock_async_session(mock_create_async_session):
+    mock_session = AsyncMock()
+    mock_create_async_session.return_value.__aenter__.return_value = mock_session
+    return mock_session
 
-@patch('backend.services.fileService.create_db_and_table')
+
+@patch('backend.services.fileService.delete_records', new_callable=AsyncMock)
+@patch('backend.services.fileService.create_async_session')
 @patch('backend.services.fileService.Minio')
-def test_delete_pdf_and_records_success(mock_minio, mock_create_db_and_table):
+def test_delete_pdf_and_records_success(mock_minio, mock_create_async_session, mock_delete_records):
     """
     This test controls delete service's behaviour under successful conditions
     Args:
         mock_minio:
-        mock_create_db_and_table:
+        mock_create_async_session:
+        mock_delete_records:
 
     Returns: Success/Fail statement
 
@@ -34,34 +41,27 @@ def test_delete_pdf_and_records_success(mock_minio, mock_create_db_and_table):
 
     mock_minio_client.remove_object.return_value = None
 
-    mock_session = MagicMock()
-    mock_create_db_and_table.return_value = mock_session
-
-    mock_query = mock_session.query.return_value
-    mock_filter = mock_query.filter.return_value
-    mock_filter.delete.return_value = 1
+    mock_session = mock_async_session(mock_create_async_session)
+    mock_delete_records.return_value = 1
 
-    result = delete_pdf_and_records(filename)
+    result = asyncio.run(delete_pdf_and_records(filename))
 
     mock_minio_client.remove_object.assert_called_with(config.MINIO_BUCKET_NAME, filename)
-    mock_session.query.assert_called_with(PdfEmbedding)
-    mock_query.filter.assert_called()
-    mock_filter.delete.assert_called()
-    mock_session.commit.assert_called()
+    mock_delete_records.assert_awaited_once_with(mock_session, filename)
 
     assert result == {"status": "success", "message": f"Deleted {filename} from MinIO and PostgreSQL"}
 
 
-@patch('backend.services.fileService.create_db_and_table')
+@patch('backend.services.fileService.delete_records', new_callable=AsyncMock)
+@patch('backend.services.fileService.create_async_session')
 @patch('backend.services.fileService.Minio')
-
-
-def test_delete_pdf_and_records_minio_error(mock_minio, mock_create_db_and_table):
+def test_delete_pdf_and_records_minio_error(mock_minio, mock_create_async_session, mock_delete_records):
     """
     This test controls delete service's behaviour under failure conditions'
     Args:
         mock_minio:
-        mock_create_db_and_table:
+        mock_create_async_session:
+        mock_delete_records:
 
     Returns: Success/Fail statement
 
@@ -81,20 +81,23 @@ def test_delete_pdf_and_records_minio_error(mock_minio, mock_create_db_and_table
         response=None
     )
 
-    result = delete_pdf_and_records(filename)
+    result = asyncio.run(delete_pdf_and_records(filename))
 
     mock_minio_client.remove_object.assert_called_with(config.MINIO_BUCKET_NAME, filename)
+    mock_delete_records.assert_not_awaited()
     assert result == {"status": "error", "message": f"Failed to delete {filename} from MinIO"}
 
 
-@patch('backend.services.fileService.create_db_and_table')
+@patch('backend.services.fileService.delete_records', new_callable=AsyncMock)
+@patch('backend.services.fileService.create_async_session')
 @patch('backend.services.fileService.Minio')
-def test_delete_pdf_and_records_no_db_records(mock_minio, mock_create_db_and_table):
+def test_delete_pdf_and_records_no_db_records(mock_minio, mock_create_async_session, mock_delete_records):
     """
     This test controls delete service's behaviour under failure conditions (No Record)
     Args:
         mock_minio:
-        mock_create_db_and_table:
+        mock_create_async_session:
+        mock_delete_records:
 
     Returns: Success/Fail statement
 
@@ -106,28 +109,26 @@ def test_delete_pdf_and_records_no_db_records(mock_minio, mock_create_db_and_tab
     mock_minio.return_value = mock_minio_client
     mock_minio_client.remove_object.return_value = None
 
-    mock_session = MagicMock()
-    mock_create_db_and_table.return_value = mock_session
-
-    mock_query = mock_session.query.return_value
-    mock_filter = mock_query.filter.return_value
-    mock_filter.delete.return_value = 0
+    mock_async_session(mock_create_async_session)
+    mock_delete_records.return_value = 0
 
     with pytest.raises(HTTPException) as exc_info:
-        delete_pdf_and_records(filename)
+        asyncio.run(delete_pdf_and_records(filename))
 
     assert exc_info.value.status_code == 404
     assert exc_info.value.detail == f"No records found for filename {filename}"
 
 
-@patch('backend.services.fileService.create_db_and_table')
+@patch('backend.services.fileService.delete_records', new_callable=AsyncMock)
+@patch('backend.services.fileService.create_async_session')
 @patch('backend.services.fileService.Minio')
-def test_delete_pdf_and_records_db_exception(mock_minio, mock_create_db_and_table):
+def test_delete_pdf_and_records_db_exception(mock_minio, mock_create_async_session, mock_delete_records):
     """
     This test controls delete service's behaviour under failure conditions (Exception)
     Args:
         mock_minio:
-        mock_create_db_and_table:
+        mock_create_async_session:
+        mock_delete_records:
 
     Returns:
 
@@ -139,18 +140,73 @@ def test_delete_pdf_and_records_db_exception(mock_minio, mock_create_db_and_tabl
     mock_minio.return_value = mock_minio_client
     mock_minio_client.remove_object.return_value = None
 
-    mock_session = MagicMock()
-    mock_create_db_and_table.return_value = mock_session
-
-    mock_query = mock_session.query.return_value
-    mock_filter = mock_query.filter.return_value
-    mock_filter.delete.side_effect = Exception("Database error")
+    mock_session = mock_async_session(mock_create_async_session)
+    mock_delete_records.side_effect = Exception("Database error")
 
-    result = delete_pdf_and_records(filename)
+    result = asyncio.run(delete_pdf_and_records(filename))
 
-    mock_session.rollback.assert_called()
+    mock_session.rollback.assert_awaited()
     assert result == {"status": "error", "message": f"Failed to delete records for {filename} from PostgreSQL"}
 
 
+@patch('backend.services.fileService.query_result_cache')
+@patch('backend.services.fileService.delete_records', new_callable=AsyncMock)
+@patch('backend.services.fileService.create_async_session')
+@patch('backend.services.fileService.Minio')
+def test_delete_pdf_and_records_invalidates_query_cache(mock_minio, mock_create_async_session, mock_delete_records,
+                                                        mock_query_result_cache):
+    """
+    This test controls that deleting a file drops its cached query results
+    Args:
+        mock_minio:
+        mock_create_async_session:
+        mock_delete_records:
+        mock_query_result_cache:
+
+    Returns: Success/Fail statement
+
+    """
+
+    filename = 'testfile.pdf'
+
+    mock_async_session(mock_create_async_session)
+    mock_delete_records.return_value = 1
+
+    asyncio.run(delete_pdf_and_records(filename))
+
+    mock_query_result_cache.invalidate.assert_called_once_with(filename)
+
+
+@patch('backend.services.fileService.local_vector_cache')
+@patch('backend.services.fileService.query_result_cache')
+@patch('backend.services.fileService.delete_records', new_callable=AsyncMock)
+@patch('backend.services.fileService.create_async_session')
+@patch('backend.services.fileService.Minio')
+def test_delete_pdf_and_records_invalidates_caches_after_commit(mock_minio, mock_create_async_session,
+                                                                mock_delete_records, mock_query_result_cache,
+                                                                mock_local_vector_cache):
+    """
+    This test controls that cached query results and local vectors are invalidated only after the delete committed.
+    Args:
+        mock_minio:
+        mock_create_async_session:
+        mock_delete_records:
+        mock_query_result_cache:
+        mock_local_vector_cache:
+
+    Returns: Success/Fail statement
+
+    """
+    mock_async_session(mock_create_async_session)
+
+    async def delete(session, filename):
+        mock_query_result_cache.invalidate.assert_not_called()
+        mock_local_vector_cache.invalidate.assert_not_called()
+        return 1
+
+    mock_delete_records.side_effect = delete
 
+    asyncio.run(delete_pdf_and_records('testfile.pdf'))
 
+    mock_query_result_cache.invalidate.assert_called_once_with('testfile.pdf')
+    mock_local_vector_cache.invalidate.assert_called_once_with('testfile.pdf')
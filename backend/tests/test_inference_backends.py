@@ -0,0 +1,121 @@
+from unittest.mock import patch
+import pytest
+import torch
+from transformers import XLMRobertaConfig, XLMRobertaModel
+
+from backend.pretrainedModels.inferenceBackends import build_model, bf16_supported, effective_backend, export_onnx
+from backend.services.queryService import mean_pool
+
+# bge-m3 is an XLM-RoBERTa encoder; a small randomly initialized one keeps the test offline
+TINY_CONFIG = XLMRobertaConfig(vocab_size=256, hidden_size=64, num_hidden_layers=2, num_attention_heads=4,
+                               intermediate_size=128, max_position_embeddings=80)
+
+
+def tiny_model():
+    torch.manual_seed(0)
+    return XLMRobertaModel(TINY_CONFIG).eval()
+
+
+def sample_inputs():
+    generator = torch.Generator().manual_seed(1)
+    input_ids = torch.randint(5, TINY_CONFIG.vocab_size, (6, 24), generator=generator)
+    attention_mask = torch.ones_like(input_ids)
+    attention_mask[3:, 16:] = 0
+    return {"input_ids": input_ids, "attention_mask": attention_mask}
+
+
+def embed(model, inputs):
+    with torch.no_grad():
+        outputs = model(**inputs)
+    return mean_pool(outputs.last_hidden_state.float(), inputs["attention_mask"])
+
+
+def fake_tokenizer(texts, return_tensors):
+    return {key: value[:len(texts)] for key, value in sample_inputs().items()}
+
+
+@pytest.mark.parametrize("backend, min_cosine", [("pytorch_int8", 0.99), ("pytorch_bf16", 0.99), ("onnx", 0.9999)])
+def test_backend_embeddings_agree_with_fp32(backend, min_cosine, tmp_path):
+    """
+    This test controls that every inference backend produces embeddings with cosine agreement to the fp32 baseline.
+    Args:
+        backend: EMBEDDING_BACKEND value
+        min_cosine: lowest accepted per-vector cosine similarity to fp32
+
+    Returns: Success/Fail statement
+
+    """
+    if backend == "onnx":
+        pytest.importorskip("onnx")
+        pytest.importorskip("onnxruntime")
+    if backend == "pytorch_bf16" and not bf16_supported(torch.device("cpu")):
+        pytest.skip("bf16 is not supported on this CPU")
+
+    inputs = sample_inputs()
+    baseline = embed(tiny_model(), inputs)
+    candidate = build_model(tiny_model, fake_tokenizer, backend=backend, onnx_path=str(tmp_path / "model.onnx"))
+
+    cosine = torch.nn.functional.cosine_similarity(embed(candidate, inputs), baseline, dim=1)
+
+    assert cosine.min().item() >= min_cosine
+
+
+def test_unknown_backend_is_rejected():
+    """
+    This test controls that a misconfigured backend fails at load time instead of silently falling back.
+    Returns: Success/Fail statement
+
+    """
+    with pytest.raises(ValueError):
+        build_model(tiny_model, fake_tokenizer, backend="tensorrt")
+
+
+@patch('backend.pretrainedModels.inferenceBackends.bf16_supported', return_value=False)
+def test_bf16_fallback_reports_the_fp32_backend(mock_bf16_supported):
+    """
+    This test controls that a bf16 backend without native bf16 is reported, and built, as fp32 pytorch,
+    so its embeddings get the fp32 model id.
+    Args:
+        mock_bf16_supported: Hardware without native bf16
+
+    Returns: Success/Fail statement
+
+    """
+    assert effective_backend("pytorch_bf16", torch.device("cpu")) == "pytorch"
+    assert effective_backend("pytorch_int8", torch.device("cpu")) == "pytorch_int8"
+    model = build_model(tiny_model, fake_tokenizer, backend="pytorch_bf16")
+    assert isinstance(model, XLMRobertaModel)
+
+
+def test_failed_onnx_export_leaves_no_model_behind(tmp_path):
+    """
+    This test controls that an export that dies halfway leaves neither a truncated model nor staging files.
+    Returns: Success/Fail statement
+
+    """
+    path = tmp_path / "onnx" / "model.onnx"
+
+    def crash(model, args, staged_path, **kwargs):
+        with open(staged_path, "wb") as file:
+            file.write(b"truncated")
+        raise RuntimeError("killed during export")
+
+    with patch('backend.pretrainedModels.inferenceBackends.torch.onnx.export', side_effect=crash):
+        with pytest.raises(RuntimeError):
+            export_onnx(tiny_model(), fake_tokenizer, str(path))
+
+    assert list(path.parent.iterdir()) == []
+
+
+@patch('backend.pretrainedModels.inferenceBackends.importlib.util.find_spec', return_value=None)
+def test_onnx_backend_without_its_packages_fails_clearly(mock_find_spec, tmp_path):
+    """
+    This test controls that the onnx backend names its missing packages at load time.
+    Args:
+        mock_find_spec: Environment without onnx and onnxruntime
+
+    Returns: Success/Fail statement
+
+    """
+    with pytest.raises(ValueError, match="onnx, onnxruntime"):
+        build_model(tiny_model, fake_tokenizer, backend="onnx", onnx_path=str(tmp_path / "model.onnx"))
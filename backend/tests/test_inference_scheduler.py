@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from backend.services.inferenceScheduler import InferenceScheduler, INTERACTIVE, INGESTION
+
+
+def _occupy_dispatcher(scheduler):
+    """Start a long ingestion item so later submissions queue up behind it."""
+    started, release = threading.Event(), threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait(5)
+
+    thread = threading.Thread(target=scheduler.run, args=(INGESTION, blocker))
+    thread.start()
+    assert started.wait(5)
+    return release, thread
+
+
+def _wait_for_depth(scheduler, priority, depth):
+    deadline = time.monotonic() + 5
+    while scheduler.stats()[priority]["queue_depth"] < depth:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_interactive_work_preempts_queued_ingestion():
+    """
+    This test controls that queued interactive work runs before queued ingestion batches.
+    Returns: Success/Fail statement
+
+    """
+    scheduler = InferenceScheduler(interactive_depth=4, ingestion_depth=4)
+    release, blocker = _occupy_dispatcher(scheduler)
+    order = []
+
+    threads = [threading.Thread(target=scheduler.run, args=(INGESTION, order.append, "ingestion"))]
+    threads[0].start()
+    _wait_for_depth(scheduler, INGESTION, 1)
+    threads.append(threading.Thread(target=scheduler.run, args=(INTERACTIVE, order.append, "interactive")))
+    threads[1].start()
+    _wait_for_depth(scheduler, INTERACTIVE, 1)
+
+    release.set()
+    for thread in [blocker, *threads]:
+        thread.join(5)
+
+    assert order == ["interactive", "ingestion"]
+    stats = scheduler.stats()
+    assert stats[INTERACTIVE]["completed"] == 1
+    assert stats[INGESTION]["completed"] == 2
+    assert stats[INTERACTIVE]["queue_wait"]["max_ms"] > 0
+
+
+def test_full_interactive_queue_rejects_with_retry_after():
+    """
+    This test controls the 503 + Retry-After backpressure when the interactive queue is full.
+    Returns: Success/Fail statement
+
+    """
+    scheduler = InferenceScheduler(interactive_depth=1, ingestion_depth=1)
+    release, blocker = _occupy_dispatcher(scheduler)
+
+    queued = threading.Thread(target=scheduler.run, args=(INTERACTIVE, lambda: None))
+    queued.start()
+    _wait_for_depth(scheduler, INTERACTIVE, 1)
+
+    with pytest.raises(HTTPException) as exc_info:
+        scheduler.run(INTERACTIVE, lambda: None)
+
+    release.set()
+    blocker.join(5)
+    queued.join(5)
+
+    assert exc_info.value.status_code == 503
+    assert int(exc_info.value.headers["Retry-After"]) >= 1
+    assert scheduler.stats()[INTERACTIVE]["rejected"] == 1
+
+
+def test_errors_propagate_to_the_caller():
+    """
+    This test controls that a failing forward pass raises in the submitting thread and is counted.
+    Returns: Success/Fail statement
+
+    """
+    scheduler = InferenceScheduler(interactive_depth=1, ingestion_depth=1)
+
+    def failing():
+        raise RuntimeError("CUDA out of memory")
+
+    with pytest.raises(RuntimeError):
+        scheduler.run(INTERACTIVE, failing)
+
+    assert scheduler.run(INTERACTIVE, lambda value: value * 2, 21) == 42
+    assert scheduler.stats()[INTERACTIVE]["failed"] == 1
@@ -0,0 +1,97 @@
+from unittest.mock import patch
+import threading
+import pytest
+from fastapi import HTTPException
+
+from backend.services.ingestionJobService import IngestionJobManager
+
+
+@patch('backend.services.ingestionJobService.process_pdf_chunks')
+@patch('backend.services.ingestionJobService.upload_file')
+def test_job_runs_pipeline_and_reports_progress(mock_upload_file, mock_process_pdf_chunks):
+    """
+    This test controls that a submitted job runs download and processing off the caller's thread.
+    Args:
+        mock_upload_file:
+        mock_process_pdf_chunks:
+
+    Returns: Success/Fail statement
+
+    """
+    manager = IngestionJobManager(max_workers=1, max_pending=4, retention=10)
+
+    def process(pdf_path, minio_file_name, progress, content_hash):
+        progress.set_total(3)
+        progress.add_embedded(3)
+        progress.add_stored(3)
+
+    mock_process_pdf_chunks.side_effect = process
+    mock_upload_file.return_value.source = b'%PDF-1.4'
+    mock_upload_file.return_value.sha256 = "ab" * 32
+
+    job = manager.submit('http://example.com/test.pdf', 'test.pdf')
+    job.future.result(timeout=5)
+
+    mock_upload_file.assert_called_once_with('http://example.com/test.pdf', 'test.pdf')
+    # The digest computed during the download is reused for deduplication
+    mock_process_pdf_chunks.assert_called_once_with(b'%PDF-1.4', 'test.pdf', progress=job.progress,
+                                                    content_hash="ab" * 32)
+    mock_upload_file.return_value.cleanup.assert_called_once()
+    status = manager.get(job.id).to_dict()
+    assert status["status"] == "succeeded"
+    assert status["chunks_embedded"] == 3
+    assert status["chunks_stored"] == 3
+    assert "download" in status["stage_seconds"]
+    manager.shutdown()
+
+
+@patch('backend.services.ingestionJobService.process_pdf_chunks')
+@patch('backend.services.ingestionJobService.upload_file')
+def test_job_failure_is_recorded(mock_upload_file, mock_process_pdf_chunks):
+    """
+    This test controls that download errors fail the job with the original status code.
+    Args:
+        mock_upload_file:
+        mock_process_pdf_chunks:
+
+    Returns: Success/Fail statement
+
+    """
+    manager = IngestionJobManager(max_workers=1, max_pending=4, retention=10)
+    mock_upload_file.side_effect = HTTPException(status_code=400, detail="Error downloading the PDF")
+
+    job = manager.submit('http://example.com/missing.pdf', 'missing.pdf')
+    job.future.result(timeout=5)
+
+    assert job.status == "failed"
+    assert job.error_status_code == 400
+    assert job.error == "Error downloading the PDF"
+    mock_process_pdf_chunks.assert_not_called()
+    manager.shutdown()
+
+
+@patch('backend.services.ingestionJobService.process_pdf_chunks')
+@patch('backend.services.ingestionJobService.upload_file')
+def test_full_queue_is_rejected(mock_upload_file, mock_process_pdf_chunks):
+    """
+    This test controls backpressure: submissions beyond the pending limit get 503 with Retry-After.
+    Args:
+        mock_upload_file:
+        mock_process_pdf_chunks:
+
+    Returns: Success/Fail statement
+
+    """
+    manager = IngestionJobManager(max_workers=1, max_pending=1, retention=10)
+    release = threading.Event()
+    mock_upload_file.side_effect = lambda URL, name: release.wait(5)
+
+    job = manager.submit('http://example.com/a.pdf', 'a.pdf')
+    with pytest.raises(HTTPException) as exc_info:
+        manager.submit('http://example.com/b.pdf', 'b.pdf')
+
+    assert exc_info.value.status_code == 503
+    assert "Retry-After" in exc_info.value.headers
+    release.set()
+    job.future.result(timeout=5)
+    manager.shutdown()
@@ -0,0 +1,66 @@
+import threading
+import pytest
+
+from backend.services.ingestionPipeline import IngestionPipeline
+from backend.services.ingestionProgress import IngestionProgress
+
+
+def test_pipeline_streams_items_in_order_with_bounded_queues():
+    """
+    This test controls that items flow through the stages in order and that a slow consumer
+    throttles the producer to the queue depth.
+    Returns: Success/Fail statement
+
+    """
+    produced = []
+    progress = IngestionProgress()
+
+    def source():
+        for number in range(20):
+            produced.append(number)
+            yield number
+
+    with IngestionPipeline(progress, queue_depth=2) as pipeline:
+        numbers = pipeline.stage("extract", source())
+        doubled = pipeline.stage("double", (number * 2 for number in numbers), upstream=numbers)
+        results = []
+        for item in pipeline.drain("store", doubled):
+            # Two full queues plus the item held by each stage thread
+            assert len(produced) - len(results) <= 2 + 2 + 2
+            results.append(item)
+
+    assert results == [number * 2 for number in range(20)]
+    assert progress.stage_items == {"extract": 20, "double": 20, "store": 20}
+    assert progress.to_dict()["queues"]["extract"]["capacity"] == 2
+    assert progress.to_dict()["queues"]["extract"]["peak"] <= 2
+
+
+def test_pipeline_failure_stops_every_stage():
+    """
+    This test controls that an exception in one stage is raised to the reader and the other stages stop.
+    Returns: Success/Fail statement
+
+    """
+    endless_started = threading.Event()
+
+    def endless():
+        number = 0
+        endless_started.set()
+        while True:
+            yield number
+            number += 1
+
+    def failing(numbers):
+        for number in numbers:
+            if number == 3:
+                raise RuntimeError("embedding failed")
+            yield number
+
+    with pytest.raises(RuntimeError, match="embedding failed"):
+        with IngestionPipeline(queue_depth=2) as pipeline:
+            numbers = pipeline.stage("extract", endless())
+            checked = pipeline.stage("embed", failing(numbers), upstream=numbers)
+            list(pipeline.drain("store", checked))
+
+    assert endless_started.is_set()
+    assert not any(thread.is_alive() for thread in pipeline._threads)
@@ -0,0 +1,46 @@
+from unittest.mock import patch, MagicMock
+from fastapi.testclient import TestClient
+from fastapi import FastAPI
+from backend.routers.ingestion_route import router
+
+app = FastAPI()
+app.include_router(router)
+
+client = TestClient(app)
+
+
+@patch("backend.routers.ingestion_route.ingestion_jobs")
+def test_submit_ingestion_job_route(mock_ingestion_jobs):
+    """
+    This test controls that /ingestion/jobs accepts the job and returns its id right away.
+    Args:
+        mock_ingestion_jobs:
+
+    Returns: Success/Fail statement
+
+    """
+    mock_ingestion_jobs.submit.return_value = MagicMock(id="abc123")
+
+    response = client.post("/ingestion/jobs", json={"URL": "http://example.com/a.pdf", "minio_file_name": "a.pdf"})
+
+    assert response.status_code == 202
+    assert response.json() == {"status": "accepted", "job_id": "abc123"}
+    mock_ingestion_jobs.submit.assert_called_once_with("http://example.com/a.pdf", "a.pdf")
+
+
+@patch("backend.routers.ingestion_route.ingestion_jobs")
+def test_get_ingestion_job_route_not_found(mock_ingestion_jobs):
+    """
+    This test controls the status route for an unknown job id.
+    Args:
+        mock_ingestion_jobs:
+
+    Returns: Success/Fail statement
+
+    """
+    mock_ingestion_jobs.get.return_value = None
+
+    response = client.get("/ingestion/jobs/unknown")
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "No ingestion job found with id: unknown"}
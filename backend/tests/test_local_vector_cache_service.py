@@ -0,0 +1,124 @@
+import datetime
+from unittest.mock import patch, MagicMock
+import numpy as np
+
+from backend.services.localVectorCacheService import LocalVectorCache
+
+DIMENSIONS = 1024
+
+
+def mock_session_for(documents):
+    """Session whose catalog and export queries answer from ``documents``: {filename: (id, texts, matrix)}."""
+    def create_session():
+        session = MagicMock()
+        state = {}
+
+        def query(*columns):
+            return session.query_chain
+
+        def filter_(*criteria):
+            state["filename"] = criteria[0].right.value
+            return session.query_chain
+
+        def first():
+            document_id, texts, _ = documents[state["filename"]]
+            return MagicMock(id=document_id, partition_name=f"tb_embeddings_doc_{document_id}",
+                             ingest_finished_at=datetime.datetime(2026, 1, document_id), chunk_count=len(texts))
+
+        def all_():
+            _, texts, matrix = documents[state["filename"]]
+            return [MagicMock(chunk_text=text, embedding=row) for text, row in zip(texts, matrix)]
+
+        session.query.side_effect = query
+        session.query_chain.filter.side_effect = filter_
+        session.query_chain.first.side_effect = first
+        session.query_chain.order_by.return_value.all.side_effect = all_
+        return session
+    return create_session
+
+
+def make_document(document_id, chunks, seed):
+    rng = np.random.default_rng(seed)
+    return document_id, [f"chunk {index}" for index in range(chunks)], rng.normal(size=(chunks, DIMENSIONS))
+
+
+def test_hot_document_is_exported_once_and_searched_exactly(tmp_path):
+    """
+    This test controls promotion after repeated lookups, exact cosine top-k over the mapping and file sharing.
+    Returns: Success/Fail statement
+
+    """
+    documents = {"a.pdf": make_document(1, 50, seed=0)}
+    query = np.random.default_rng(1).normal(size=DIMENSIONS)
+    matrix = documents["a.pdf"][2]
+    cosine = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query))
+    expected = [f"chunk {index}" for index in np.argsort(-cosine)[:5]]
+
+    with patch('backend.services.localVectorCacheService.create_db_and_table',
+               side_effect=mock_session_for(documents)):
+        cache = LocalVectorCache(directory=str(tmp_path), max_bytes=10 * 1024 * 1024, min_lookups=2,
+                                 revalidate_seconds=60, enabled=True)
+        assert cache.search("a.pdf", query) is None
+        assert cache.search("a.pdf", query) == expected
+        assert cache.search("a.pdf", query) == expected
+        assert len(list(tmp_path.glob("*.npy"))) == 1
+
+        # Another worker maps the exported file instead of exporting again
+        sibling = LocalVectorCache(directory=str(tmp_path), max_bytes=10 * 1024 * 1024, min_lookups=1,
+                                   revalidate_seconds=60, enabled=True)
+        assert sibling.search("a.pdf", query) == expected
+
+    assert cache.stats()["exports"] == 1
+    assert sibling.stats()["exports"] == 0
+    assert cache.stats()["hits"] == 2
+
+
+def test_invalidate_deletes_files_for_every_worker(tmp_path):
+    """
+    This test controls that invalidation on delete/re-ingest unmaps the document here and in sibling workers.
+    Returns: Success/Fail statement
+
+    """
+    documents = {"a.pdf": make_document(1, 10, seed=0)}
+    query = np.ones(DIMENSIONS)
+
+    with patch('backend.services.localVectorCacheService.create_db_and_table',
+               side_effect=mock_session_for(documents)):
+        cache = LocalVectorCache(directory=str(tmp_path), min_lookups=1, revalidate_seconds=60, enabled=True)
+        sibling = LocalVectorCache(directory=str(tmp_path), min_lookups=1, revalidate_seconds=60, enabled=True)
+        assert cache.search("a.pdf", query) is not None
+        assert sibling.search("a.pdf", query) is not None
+
+        cache.invalidate("a.pdf")
+
+        assert list(tmp_path.iterdir()) == []
+        assert cache.stats()["documents"] == 0
+        # The sibling's file is gone, so it stops serving the old version
+        sibling.min_lookups = 2
+        assert sibling.search("a.pdf", query) is None
+        assert sibling.stats()["documents"] == 0
+
+
+def test_documents_are_evicted_lru_by_byte_budget(tmp_path):
+    """
+    This test controls that mapped documents beyond the byte budget are evicted least recently used first.
+    Returns: Success/Fail statement
+
+    """
+    documents = {name: make_document(index + 1, 20, seed=index) for index, name in enumerate(["a.pdf", "b.pdf"])}
+    query = np.ones(DIMENSIONS)
+    # Room for one document: 20 x 1024 float32 plus its texts
+    budget = 20 * DIMENSIONS * 4 + 4096
+
+    with patch('backend.services.localVectorCacheService.create_db_and_table',
+               side_effect=mock_session_for(documents)):
+        cache = LocalVectorCache(directory=str(tmp_path), max_bytes=budget, min_lookups=1,
+                                 revalidate_seconds=60, enabled=True)
+        cache.search("a.pdf", query)
+        cache.search("b.pdf", query)
+
+    stats = cache.stats()
+    assert stats["documents"] == 1
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= budget
+    assert "b.pdf" in cache._documents
@@ -1,4 +1,4 @@
-
+import hashlib
 import sys
 import os
 
@@ -11,9 +11,10 @@ os.environ['DEV_MINIO_SECRET_KEY'] = 'test_secret_key'
 os.environ['DEV_MINIO_BUCKET_NAME'] = 'test_bucket'
 os.environ['DEV_MINIO_ENDPOINT'] = 'localhost:9000'
 
-from unittest.mock import patch, MagicMock, mock_open
+from unittest.mock import patch, MagicMock, ANY
 import pytest
-from backend.services.minioClientService import list_files, upload_file
+from backend.config import config as app_config
+from backend.services.minioClientService import list_files, upload_file, download_pdf
 from backend.minioConfig import MinioConfig
 from minio.error import S3Error
 from fastapi import HTTPException
@@ -120,7 +121,8 @@ def test_upload_file_success(mock_minio_config, mock_minio, mock_requests_get):
     pdf_content = b'%PDF-1.4 test pdf content'
 
     mock_response = MagicMock()
-    mock_response.content = pdf_content
+    mock_response.headers = {}
+    mock_response.iter_content.return_value = [pdf_content[:10], pdf_content[10:]]
     mock_response.raise_for_status.return_value = None
     mock_requests_get.return_value = mock_response
 
@@ -135,20 +137,80 @@ def test_upload_file_success(mock_minio_config, mock_minio, mock_requests_get):
 
     mock_minio_client.bucket_exists.return_value = True
 
-    mock_minio_client.fput_object.return_value = None
+    mock_minio_client.put_object.return_value = None
 
-    with patch('builtins.open', mock_open()) as mocked_file:
-        upload_file(URL, minio_file_name)
+    pdf = upload_file(URL, minio_file_name)
 
-    mock_requests_get.assert_called_with(URL)
+    mock_requests_get.assert_called_with(URL, stream=True, timeout=app_config.PDF_DOWNLOAD_TIMEOUT_SECONDS)
     mock_minio_client.bucket_exists.assert_called_with('test_bucket')
-    mock_minio_client.fput_object.assert_called_with(
+    mock_minio_client.put_object.assert_called_with(
         bucket_name='test_bucket',
         object_name=minio_file_name,
-        file_path='/tmp/temp_pdf.pdf',
-        content_type='application/pdf'
+        data=ANY,
+        length=len(pdf_content),
+        part_size=app_config.MINIO_PART_SIZE,
+        content_type='application/pdf',
+        metadata={"sha256": hashlib.sha256(pdf_content).hexdigest()},
     )
-    mocked_file().write.assert_called_with(pdf_content)
+    mock_response.close.assert_called()
+    assert pdf.source == pdf_content
+    assert pdf.path is None
+    # The digest is computed while the chunks stream in
+    assert pdf.sha256 == hashlib.sha256(pdf_content).hexdigest()
+
+
+@patch('backend.services.minioClientService.requests.get')
+def test_download_pdf_too_large(mock_requests_get):
+    """
+    This test control download behaviour when the PDF exceeds the size limit.
+    Args:
+        mock_requests_get:
+
+    Returns: Success/Fail statement
+
+    """
+    mock_response = MagicMock()
+    mock_response.headers = {}
+    mock_response.iter_content.return_value = [b'x' * 6, b'x' * 6]
+    mock_requests_get.return_value = mock_response
+
+    with patch.object(app_config, 'MAX_PDF_DOWNLOAD_BYTES', 10):
+        with pytest.raises(HTTPException) as exc_info:
+            download_pdf('http://example.com/huge.pdf')
+
+    assert exc_info.value.status_code == 413
+    mock_response.close.assert_called()
+
+
+@patch('backend.services.minioClientService.requests.get')
+def test_download_pdf_spills_to_private_temp_file(mock_requests_get):
+    """
+    This test control that large downloads go to a per-request temporary file.
+    Args:
+        mock_requests_get:
+
+    Returns: Success/Fail statement
+
+    """
+    mock_response = MagicMock()
+    mock_response.headers = {}
+    mock_response.iter_content.return_value = [b'%PDF', b'-1.4 large content']
+    mock_requests_get.return_value = mock_response
+
+    with patch.object(app_config, 'PDF_IN_MEMORY_MAX_BYTES', 8):
+        first = download_pdf('http://example.com/large.pdf')
+        second = download_pdf('http://example.com/large.pdf')
+
+    try:
+        assert first.path != second.path
+        with open(first.path, 'rb') as pdf_file:
+            assert pdf_file.read() == b'%PDF-1.4 large content'
+        assert first.size == len(b'%PDF-1.4 large content')
+    finally:
+        first.cleanup()
+        second.cleanup()
+
+    assert not os.path.exists(first.path)
 
 
 @patch('backend.services.minioClientService.requests.get')
@@ -170,7 +232,8 @@ def test_upload_file_bucket_error(mock_minio_config, mock_minio, mock_requests_g
     pdf_content = b'%PDF-1.4 test pdf content'
 
     mock_response = MagicMock()
-    mock_response.content = pdf_content
+    mock_response.headers = {}
+    mock_response.iter_content.return_value = [pdf_content]
     mock_response.raise_for_status.return_value = None
     mock_requests_get.return_value = mock_response
 
@@ -192,9 +255,8 @@ def test_upload_file_bucket_error(mock_minio_config, mock_minio, mock_requests_g
         response=None
     )
 
-    with patch('builtins.open', mock_open()):
-        with pytest.raises(HTTPException) as exc_info:
-            upload_file(URL, minio_file_name)
+    with pytest.raises(HTTPException) as exc_info:
+        upload_file(URL, minio_file_name)
 
     assert exc_info.value.status_code == 500
     assert 'Error creating bucket' in exc_info.value.detail
@@ -221,7 +283,8 @@ def test_upload_file_upload_error(mock_minio_config, mock_minio, mock_requests_g
     pdf_content = b'%PDF-1.4 test pdf content'
 
     mock_response = MagicMock()
-    mock_response.content = pdf_content
+    mock_response.headers = {}
+    mock_response.iter_content.return_value = [pdf_content]
     mock_response.raise_for_status.return_value = None
     mock_requests_get.return_value = mock_response
 
@@ -236,7 +299,7 @@ def test_upload_file_upload_error(mock_minio_config, mock_minio, mock_requests_g
 
     mock_minio_client.bucket_exists.return_value = True
 
-    mock_minio_client.fput_object.side_effect = S3Error(
+    mock_minio_client.put_object.side_effect = S3Error(
         code='MockedCode',
         message='Mocked error message',
         resource='Mocked resource',
@@ -245,9 +308,8 @@ def test_upload_file_upload_error(mock_minio_config, mock_minio, mock_requests_g
         response=None
     )
 
-    with patch('builtins.open', mock_open()):
-        with pytest.raises(HTTPException) as exc_info:
-            upload_file(URL, minio_file_name)
+    with pytest.raises(HTTPException) as exc_info:
+        upload_file(URL, minio_file_name)
 
     assert exc_info.value.status_code == 500
     assert 'Error uploading the PDF to MinIO' in exc_info.value.detail
@@ -0,0 +1,188 @@
+from unittest.mock import patch, MagicMock
+import threading
+import time
+import pytest
+
+from backend.pretrainedModels.bge3_embedding import ModelManager
+
+
+@pytest.fixture
+def mock_singleton_model():
+    with patch('backend.pretrainedModels.bge3_embedding.SingletonModel') as mock_singleton:
+        mock_singleton._instance = None
+
+        def load():
+            mock_singleton._instance = MagicMock()
+            return mock_singleton._instance
+
+        mock_singleton.side_effect = load
+        yield mock_singleton
+
+
+def test_model_stays_resident_between_calls(mock_singleton_model):
+    """
+    This test controls that the model is loaded once and reused by later requests.
+    Args:
+        mock_singleton_model:
+
+    Returns: Success/Fail statement
+
+    """
+    manager = ModelManager(idle_timeout=60, memory_watermark_mb=0, check_interval=1)
+
+    with manager.use() as first:
+        pass
+    with manager.use() as second:
+        pass
+
+    assert first is second
+    assert mock_singleton_model.call_count == 1
+    assert manager.stats()["load_count"] == 1
+    assert manager.stats()["evict_count"] == 0
+
+
+def test_idle_model_is_evicted_and_reloaded(mock_singleton_model):
+    """
+    This test controls idle timeout eviction and the reload on the next request.
+    Args:
+        mock_singleton_model:
+
+    Returns: Success/Fail statement
+
+    """
+    manager = ModelManager(idle_timeout=0.01, memory_watermark_mb=0, check_interval=1)
+    manager.get()
+    time.sleep(0.02)
+
+    assert manager.check() == "idle"
+    assert mock_singleton_model._instance is None
+
+    manager.get()
+
+    stats = manager.stats()
+    assert stats["load_count"] == 2
+    assert stats["evict_count"] == 1
+    assert stats["idle_evictions"] == 1
+
+
+@patch('backend.pretrainedModels.bge3_embedding.process_memory_mb')
+def test_model_in_use_is_not_evicted(mock_process_memory_mb, mock_singleton_model):
+    """
+    This test controls that the memory watermark never evicts a model during a forward pass.
+    Args:
+        mock_process_memory_mb:
+        mock_singleton_model:
+
+    Returns: Success/Fail statement
+
+    """
+    mock_process_memory_mb.return_value = 4096
+    manager = ModelManager(idle_timeout=0, memory_watermark_mb=1024, check_interval=1)
+
+    with manager.use():
+        assert manager.check() is None
+        assert manager.is_loaded
+
+    assert manager.check() == "watermark"
+    assert manager.stats()["watermark_evictions"] == 1
+
+
+def test_idle_eviction_is_skipped_when_the_model_was_used_while_waiting(mock_singleton_model):
+    """
+    This test controls that an idle eviction waiting for a forward pass re-checks the idle timeout afterwards.
+    Args:
+        mock_singleton_model:
+
+    Returns: Success/Fail statement
+
+    """
+    manager = ModelManager(idle_timeout=60, memory_watermark_mb=0, check_interval=1)
+    results = []
+    with manager.use():
+        # The reaper decided "idle" just before this request took the model
+        evictor = threading.Thread(target=lambda: results.append(manager.evict("idle")))
+        evictor.start()
+        time.sleep(0.05)
+        assert evictor.is_alive()
+    evictor.join(timeout=5)
+
+    assert results == [False]
+    assert manager.is_loaded
+    assert manager.stats()["idle_evictions"] == 0
+
+
+def test_warm_up_loads_in_background(mock_singleton_model):
+    """
+    This test controls that warm up loads the model off the calling thread.
+    Args:
+        mock_singleton_model:
+
+    Returns: Success/Fail statement
+
+    """
+    manager = ModelManager(idle_timeout=60, memory_watermark_mb=0, check_interval=1)
+
+    manager.warm_up()
+    manager.get()
+
+    assert mock_singleton_model.call_count == 1
+    assert manager.is_loaded
+
+
+@patch('backend.pretrainedModels.bge3_embedding.process_memory_mb')
+def test_watermark_eviction_reloads_in_background(mock_process_memory_mb, mock_singleton_model):
+    """
+    This test controls that a watermark eviction reloads the model off the request path once memory is back down.
+    Args:
+        mock_process_memory_mb:
+        mock_singleton_model:
+
+    Returns: Success/Fail statement
+
+    """
+    # Checked by the reaper, again by evict, before the reload and by stats
+    mock_process_memory_mb.side_effect = [4096, 4096, 512, 512]
+    manager = ModelManager(idle_timeout=0, memory_watermark_mb=1024, check_interval=1, reload_after_eviction=True)
+    manager.get()
+
+    assert manager.check() == "watermark"
+    deadline = time.monotonic() + 5
+    while manager.load_count < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert manager.is_loaded
+    stats_after = manager.stats()
+    assert stats_after["background_reloads"] == 1
+    assert stats_after["load_count"] == 2
+
+
+def test_stats_do_not_wait_for_a_model_load(mock_singleton_model):
+    """
+    This test controls that stats (the metrics route) answer while a load is in progress.
+    Args:
+        mock_singleton_model:
+
+    Returns: Success/Fail statement
+
+    """
+    loading = threading.Event()
+    release = threading.Event()
+
+    def slow_load():
+        loading.set()
+        release.wait(5)
+        mock_singleton_model._instance = MagicMock()
+        return mock_singleton_model._instance
+
+    mock_singleton_model.side_effect = slow_load
+    manager = ModelManager(idle_timeout=60, memory_watermark_mb=0, check_interval=1)
+    manager.warm_up()
+    assert loading.wait(5)
+
+    try:
+        assert manager.stats()["loaded"] is False
+    finally:
+        release.set()
+    with manager.use() as instance:
+        assert instance is mock_singleton_model._instance
+        assert manager.stats()["active_users"] == 1
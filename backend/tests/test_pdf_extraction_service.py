@@ -0,0 +1,90 @@
+import glob
+import os
+import tempfile
+import fitz
+import pytest
+
+from backend.services.pdfExtractionService import PageExtractor, page_ranges
+
+
+def make_pdf(pages):
+    doc = fitz.open()
+    for number in range(pages):
+        doc.new_page().insert_text((72, 72), f"page {number} text")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def test_page_ranges_cover_every_page_once():
+    """
+    This test controls that page ranges are contiguous, cover every page and differ by at most one page.
+    Returns: Success/Fail statement
+
+    """
+    ranges = page_ranges(10, 4)
+
+    assert ranges == [(0, 3), (3, 6), (6, 8), (8, 10)]
+    assert page_ranges(2, 8) == [(0, 1), (1, 2)]
+
+
+@pytest.mark.parametrize("in_memory", [True, False])
+def test_parallel_extraction_matches_serial_order(tmp_path, in_memory):
+    """
+    This test controls that worker processes return the same page texts, in order, as in-process extraction.
+    Args:
+        in_memory: Whether the PDF is passed as bytes or as a path
+
+    Returns: Success/Fail statement
+
+    """
+    pdf_bytes = make_pdf(9)
+    source = pdf_bytes
+    if not in_memory:
+        source = str(tmp_path / "doc.pdf")
+        with open(source, "wb") as f:
+            f.write(pdf_bytes)
+
+    serial = list(PageExtractor(max_workers=2, min_pages=100).iter_pages(source))
+    extractor = PageExtractor(max_workers=2, min_pages=2)
+    try:
+        parallel = list(extractor.iter_pages(source))
+        assert extractor._executor is not None
+    finally:
+        extractor.shutdown()
+
+    assert [text.strip() for text in serial] == [f"page {number} text" for number in range(9)]
+    assert parallel == serial
+
+
+def test_large_in_memory_pdf_is_spilled_to_one_temp_file(monkeypatch):
+    """
+    This test controls that PDF bytes above INLINE_MAX_BYTES reach the workers as a temp file path
+    rather than being pickled into every task, and that the file is removed afterwards.
+    Returns: Success/Fail statement
+
+    """
+    pdf_bytes = make_pdf(9)
+    pattern = os.path.join(tempfile.gettempdir(), "pdf_*.pdf")
+    before = set(glob.glob(pattern))
+    extractor = PageExtractor(max_workers=2, min_pages=2)
+    monkeypatch.setattr(extractor, "INLINE_MAX_BYTES", len(pdf_bytes) - 1)
+    submitted = []
+    real_executor = extractor._get_executor
+
+    def recording_executor():
+        executor = real_executor()
+        submit = executor.submit
+        executor.submit = lambda fn, source, *args: submitted.append(source) or submit(fn, source, *args)
+        return executor
+
+    monkeypatch.setattr(extractor, "_get_executor", recording_executor)
+    try:
+        pages = list(extractor.iter_pages(pdf_bytes))
+    finally:
+        extractor.shutdown()
+
+    assert [text.strip() for text in pages] == [f"page {number} text" for number in range(9)]
+    assert len(set(submitted)) == 1 and isinstance(submitted[0], str)
+    assert not os.path.exists(submitted[0])
+    assert set(glob.glob(pattern)) == before
@@ -0,0 +1,62 @@
+from unittest.mock import patch
+
+from backend.services.queryCacheService import QueryResultCache
+
+
+def test_hit_after_put_and_lru_eviction():
+    """
+    This test controls cached result lookups and size-bounded LRU eviction.
+    Returns: Success/Fail statement
+
+    """
+    cache = QueryResultCache(max_entries=2, ttl_seconds=60)
+
+    assert cache.get("a.pdf", "pricing") is None
+    cache.put("a.pdf", "pricing", ["chunk 1"])
+    cache.put("a.pdf", "terms", ["chunk 2"])
+    assert cache.get("a.pdf", "pricing") == ["chunk 1"]
+
+    cache.put("b.pdf", "pricing", ["chunk 3"])
+
+    assert cache.get("a.pdf", "terms") is None
+    assert cache.get("a.pdf", "pricing") == ["chunk 1"]
+    assert cache.stats()["evictions"] == 1
+
+
+@patch('backend.services.queryCacheService.time.monotonic')
+def test_entries_expire_after_ttl(mock_monotonic):
+    """
+    This test controls that results are not served after their TTL.
+    Args:
+        mock_monotonic:
+
+    Returns: Success/Fail statement
+
+    """
+    cache = QueryResultCache(max_entries=10, ttl_seconds=5)
+
+    mock_monotonic.return_value = 100.0
+    cache.put("a.pdf", "pricing", ["chunk 1"])
+    mock_monotonic.return_value = 104.0
+    assert cache.get("a.pdf", "pricing") == ["chunk 1"]
+    mock_monotonic.return_value = 106.0
+    assert cache.get("a.pdf", "pricing") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_invalidate_drops_results_and_rejects_stale_puts():
+    """
+    This test controls invalidation on delete/re-ingest, including results computed before it.
+    Returns: Success/Fail statement
+
+    """
+    cache = QueryResultCache(max_entries=10, ttl_seconds=60)
+    cache.put("a.pdf", "pricing", ["old chunk"])
+    cache.put("b.pdf", "pricing", ["other chunk"])
+    version_before = cache.version("a.pdf")
+
+    cache.invalidate("a.pdf")
+    cache.put("a.pdf", "pricing", ["old chunk"], version=version_before)
+
+    assert cache.get("a.pdf", "pricing") is None
+    assert cache.get("b.pdf", "pricing") == ["other chunk"]
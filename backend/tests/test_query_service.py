@@ -1,224 +1,670 @@
+import hashlib
 import sys
 import os
 
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 
-from unittest.mock import patch, MagicMock, mock_open
+import asyncio
+from unittest.mock import patch, MagicMock, AsyncMock, mock_open
+import numpy as np
 import pytest
+import torch
 
 from backend.services.queryService import (
     generate_embedding,
+    generate_embeddings,
+    mean_pool,
     process_pdf_chunks,
-    get_related_chunks,
-    get_related_chunks_by_filename,
-    unload_model
+    get_related_chunks_async,
+    get_related_chunks_by_filename_async,
+    get_related_chunks_for_questions_async,
+    search_documents_async,
+    _embed_query_batch
 )
 
+from backend.services.ingestionProgress import IngestionProgress
+from backend.services.chunkingService import Chunk
+from backend.database.db_models import chunk_text_hash
+from backend.pretrainedModels.bge3_embedding import EMBEDDING_MODEL_ID
 from fastapi import HTTPException
 
-@patch('backend.services.queryService.SingletonModel')
-def test_generate_embedding_success(mock_singleton_model):
+@patch('backend.services.queryService.embedding_cache')
+@patch('backend.services.queryService.query_embedding_batcher')
+def test_generate_embedding_success(mock_batcher, mock_embedding_cache):
     text = "This is a test sentence."
+    mock_embedding_cache.get.return_value = None
+    mock_batcher.embed.return_value = np.array([0.1, 0.2, 0.3], dtype=np.float32)
 
-    mock_tokenizer = MagicMock()
-    mock_model = MagicMock()
+    embeddings = generate_embedding(text)
+
+    np.testing.assert_allclose(embeddings, [0.1, 0.2, 0.3], rtol=1e-6)
+    mock_batcher.embed.assert_called_once_with(text)
+    mock_embedding_cache.put.assert_called_once()
 
-    mock_singleton_instance = MagicMock()
-    mock_singleton_instance.tokenizer = mock_tokenizer
-    mock_singleton_instance.model = mock_model
-    mock_singleton_model.return_value = mock_singleton_instance
 
-    mock_inputs = MagicMock()
-    mock_tokenizer.return_value = mock_inputs
+@patch('backend.services.queryService.inference_scheduler')
+@patch('backend.services.queryService.model_manager')
+def test_embed_query_batch_runs_one_interactive_forward_pass(mock_model_manager, mock_scheduler):
+    texts = ["short question", "a somewhat longer question"]
+
+    mock_tokenizer = MagicMock()
+    mock_tokenizer.return_value = {"input_ids": [[1, 2], [1, 2, 3, 4]], "attention_mask": [[1, 1], [1, 1, 1, 1]]}
+    mock_tokenizer.pad.return_value.to.return_value = {"attention_mask": torch.tensor([[1, 1, 0, 0], [1, 1, 1, 1]])}
+    mock_model_manager.use.return_value.__enter__.return_value = MagicMock(tokenizer=mock_tokenizer)
 
     mock_outputs = MagicMock()
-    mock_last_hidden_state = MagicMock()
-    mock_outputs.last_hidden_state = mock_last_hidden_state
+    mock_outputs.last_hidden_state = torch.ones(2, 4, 3)
+    mock_scheduler.run.return_value = mock_outputs
 
-    mock_last_hidden_state.mean.return_value.squeeze.return_value.cpu.return_value.numpy.return_value.tolist.return_value = [0.1, 0.2, 0.3]
+    embeddings = _embed_query_batch(texts)
 
-    mock_model.return_value = mock_outputs
+    assert embeddings.shape == (2, 3)
+    mock_scheduler.run.assert_called_once()
+    assert mock_scheduler.run.call_args.args[0] == "interactive"
 
-    embeddings = generate_embedding(text)
 
-    assert embeddings == [0.1, 0.2, 0.3]
-    mock_tokenizer.assert_called_with(text, return_tensors="pt", truncation=True, padding=True)
-    mock_model.assert_called_once_with(**mock_inputs)
+@patch('backend.services.queryService.embedding_cache')
+@patch('backend.services.queryService.model_manager')
+def test_generate_embedding_cache_hit(mock_model_manager, mock_embedding_cache):
+    mock_embedding_cache.get.return_value = np.array([0.1, 0.2, 0.3], dtype=np.float32)
 
-@patch('backend.services.queryService.SingletonModel')
-def test_generate_embedding_exception(mock_singleton_model):
+    embeddings = generate_embedding("What is the termination clause?")
+
+    np.testing.assert_allclose(embeddings, [0.1, 0.2, 0.3], rtol=1e-6)
+    mock_model_manager.use.assert_not_called()
+
+@patch('backend.services.queryService.embedding_cache')
+@patch('backend.services.queryService.model_manager')
+def test_generate_embedding_exception(mock_model_manager, mock_embedding_cache):
 
     text = "This is a test sentence."
+    mock_embedding_cache.get.return_value = None
 
-    mock_singleton_model.side_effect = Exception("Model loading error")
+    mock_model_manager.use.side_effect = Exception("Model loading error")
 
     with pytest.raises(Exception) as exc_info:
         generate_embedding(text)
 
     assert "Model loading error" in str(exc_info.value)
 
-@patch('backend.services.queryService.generate_embedding')
+@patch('backend.services.queryService.document_ingest_lock')
+@patch('backend.services.queryService.iter_chunks')
+@patch('backend.services.queryService.copy_chunk_batches')
+@patch('backend.services.queryService._content_fingerprint', return_value=("ab" * 32, 2048))
+@patch('backend.services.queryService.register_document', return_value=5)
+@patch('backend.services.queryService.publish_document_partition')
+@patch('backend.services.queryService.stage_document_partition')
+@patch('backend.services.queryService.ensure_vector_index')
+@patch('backend.services.queryService.query_result_cache')
+@patch('backend.services.queryService.model_manager')
+@patch('backend.services.queryService.generate_embeddings')
 @patch('backend.services.queryService.create_db_and_table')
-@patch('backend.services.queryService.fitz.open')
-def test_process_pdf_chunks_success(mock_fitz_open, mock_create_db_and_table, mock_generate_embedding):
+@patch('backend.services.queryService.page_extractor')
+@patch('backend.services.queryService.lock_published_chunks', return_value=(None, {}))
+@patch('backend.services.queryService.find_indexed_document', return_value=None)
+def test_process_pdf_chunks_success(mock_find_indexed_document, mock_lock_published_chunks, mock_page_extractor,
+                                    mock_create_db_and_table, mock_generate_embeddings, mock_model_manager,
+                                    mock_query_result_cache, mock_ensure_vector_index, mock_stage_document_partition,
+                                    mock_publish_document_partition, mock_register_document, mock_content_fingerprint,
+                                    mock_copy_chunk_batches, mock_iter_chunks, mock_document_ingest_lock):
     pdf_path = '/path/to/test.pdf'
     minio_file_name = 'test.pdf'
-    batch_size = 2
+    flush_rows = 2
 
-    mock_doc = MagicMock()
-    mock_page = MagicMock()
-    mock_page.get_text.return_value = "Word " * 200
-    mock_doc.__iter__.return_value = [mock_page]
-    mock_fitz_open.return_value = mock_doc
+    mock_page_extractor.iter_pages.return_value = iter(["Word " * 200])
 
-    mock_generate_embedding.return_value = [0.1, 0.2, 0.3]
+    chunks = [Chunk("Word " * 99 + "Word", [0, 11, 2], 1, 1), Chunk("Word " * 99 + "Word", [0, 12, 2], 1, 2)]
+    mock_iter_chunks.return_value = chunks
+    mock_generate_embeddings.return_value = np.full((2, 3), 0.1, dtype=np.float32)
 
     mock_session = MagicMock()
     mock_create_db_and_table.return_value = mock_session
-    mock_session.query.return_value.scalar.return_value = 1
+    mock_stage_document_partition.return_value = "tb_embeddings_doc_5_0a1b2c3d"
 
-    with patch('os.remove') as mock_os_remove:
-        process_pdf_chunks(pdf_path, minio_file_name, batch_size)
+    copied = []
+
+    def copy_batches(session, table_name, document_id, filename, batches, flush_rows, on_flush):
+        for batch_chunks, embeddings in batches:
+            copied.append((batch_chunks, embeddings))
+            on_flush(len(batch_chunks))
+        return sum(len(batch_chunks) for batch_chunks, _ in copied)
 
-    mock_fitz_open.assert_called_with(pdf_path)
-    assert mock_generate_embedding.call_count > 0
-    mock_session.bulk_save_objects.assert_called()
-    mock_session.commit.assert_called()
+    mock_copy_chunk_batches.side_effect = copy_batches
+    progress = IngestionProgress()
+
+    with patch('os.remove') as mock_os_remove:
+        document_id = process_pdf_chunks(pdf_path, minio_file_name, flush_rows, progress=progress)
+
+    mock_page_extractor.iter_pages.assert_called_once_with(pdf_path)
+    # Pages are chunked with the model's tokenizer and the chunk input ids are reused for embedding
+    tokenizer = mock_model_manager.use.return_value.__enter__.return_value.tokenizer
+    assert mock_iter_chunks.call_args.args[1] is tokenizer
+    mock_generate_embeddings.assert_called_once_with(["Word " * 99 + "Word"] * 2, on_progress=progress.add_embedded,
+                                                     input_ids=[[0, 11, 2], [0, 12, 2]])
+    assert progress.chunks_total == 2
+    assert progress.chunks_stored == 2
+    # Stages run concurrently; each reports its busy time, items and queue occupancy
+    assert set(progress.stage_seconds) == {"pipeline", "extract", "chunk", "embed", "store"}
+    assert progress.stage_items == {"extract": 1, "chunk": 2, "embed": 2, "store": 2}
+    assert set(progress.to_dict()["queues"]) == {"extract", "chunk", "embed"}
+    # The document id comes from the catalog, not from max(pdf_id) + 1
+    assert document_id == 5
+    mock_register_document.assert_called_once_with(mock_session, minio_file_name, "ab" * 32, 2048)
+    # Staging, loading and publishing run under the document's ingest lock
+    mock_document_ingest_lock.assert_called_once_with(5)
+    mock_stage_document_partition.assert_called_once_with(mock_session, 5, minio_file_name)
+    # One COPY into the staged partition, fed with the embedded batches as the float32 matrix
+    mock_copy_chunk_batches.assert_called_once()
+    assert mock_copy_chunk_batches.call_args.args[:4] == (mock_session, "tb_embeddings_doc_5_0a1b2c3d", 5,
+                                                          minio_file_name)
+    assert mock_copy_chunk_batches.call_args.kwargs["flush_rows"] == flush_rows
+    assert len(copied) == 1 and copied[0][0] == chunks
+    assert copied[0][1] is mock_generate_embeddings.return_value
+    mock_publish_document_partition.assert_called_once_with(
+        mock_session, 5, minio_file_name, "tb_embeddings_doc_5_0a1b2c3d", 2, EMBEDDING_MODEL_ID
+    )
     mock_session.close.assert_called()
     mock_os_remove.assert_called_with(pdf_path)
+    mock_ensure_vector_index.assert_called_once()
 
-@patch('backend.services.queryService.generate_embedding')
+@patch('backend.services.queryService.document_ingest_lock')
+@patch('backend.services.queryService.iter_chunks', return_value=[Chunk("Word " * 100, [0, 11, 2], 1, 1)])
+@patch('backend.services.queryService.model_manager')
+@patch('backend.services.queryService.ensure_vector_index')
+@patch('backend.services.queryService.generate_embeddings')
 @patch('backend.services.queryService.create_db_and_table')
-@patch('backend.services.queryService.fitz.open')
-def test_process_pdf_chunks_not_enough_words(mock_fitz_open, mock_create_db_and_table, mock_generate_embedding):
+@patch('backend.services.queryService.page_extractor')
+@patch('backend.services.queryService.lock_published_chunks', return_value=(None, {}))
+@patch('backend.services.queryService.find_indexed_document', return_value=None)
+def test_process_pdf_chunks_from_memory(mock_find_indexed_document, mock_lock_published_chunks, mock_page_extractor,
+                                        mock_create_db_and_table, mock_generate_embeddings, mock_ensure_vector_index,
+                                        mock_model_manager, mock_iter_chunks, mock_document_ingest_lock):
+    pdf_bytes = b'%PDF-1.4 test pdf content'
+
+    mock_page_extractor.iter_pages.return_value = iter(["Word " * 100])
+    mock_generate_embeddings.return_value = np.full((1, 3), 0.1, dtype=np.float32)
+
+    with patch('os.remove') as mock_os_remove, \
+            patch('backend.services.queryService.register_document', return_value=1) as mock_register_document, \
+            patch('backend.services.queryService.stage_document_partition'), \
+            patch('backend.services.queryService.copy_chunk_batches'), \
+            patch('backend.services.queryService.publish_document_partition'):
+        process_pdf_chunks(pdf_bytes, 'test.pdf')
+
+    mock_page_extractor.iter_pages.assert_called_once_with(pdf_bytes)
+    mock_os_remove.assert_not_called()
+    content_hash, byte_size = mock_register_document.call_args.args[2:]
+    assert content_hash == hashlib.sha256(pdf_bytes).hexdigest()
+    assert byte_size == len(pdf_bytes)
+
+
+def test_mean_pool_ignores_padding():
+    hidden = torch.tensor([[[1.0, 2.0], [3.0, 4.0], [100.0, 100.0]]])
+    mask = torch.tensor([[1, 1, 0]])
+
+    pooled = mean_pool(hidden, mask)
+
+    assert torch.allclose(pooled, torch.tensor([[2.0, 3.0]]))
+
+
+@patch('backend.services.queryService.embedding_cache')
+@patch('backend.services.queryService.model_manager')
+def test_generate_embeddings_batches_by_length_and_keeps_order(mock_model_manager, mock_embedding_cache):
+    texts = ["a b c", "a", "a b"]
+    mock_embedding_cache.get_many.return_value = [None, None, None]
+
+    mock_tokenizer = MagicMock()
+    mock_model = MagicMock()
+    mock_model_manager.use.return_value.__enter__.return_value = MagicMock(tokenizer=mock_tokenizer, model=mock_model)
+
+    mock_tokenizer.return_value = {
+        "input_ids": [[3, 3, 3], [1], [2, 2]],
+        "attention_mask": [[1, 1, 1], [1], [1, 1]],
+    }
+
+    def pad(features, return_tensors):
+        width = max(len(ids) for ids in features["input_ids"])
+        batch = MagicMock()
+        ids = torch.tensor([ids + [0] * (width - len(ids)) for ids in features["input_ids"]])
+        mask = torch.tensor([m + [0] * (width - len(m)) for m in features["attention_mask"]])
+        batch.to.return_value = {"input_ids": ids, "attention_mask": mask}
+        return batch
+
+    mock_tokenizer.pad.side_effect = pad
+
+    def forward(input_ids, attention_mask):
+        return MagicMock(last_hidden_state=input_ids.unsqueeze(-1).float().repeat(1, 1, 2))
+
+    mock_model.side_effect = forward
+
+    embeddings = generate_embeddings(texts, batch_size=2)
+
+    assert embeddings.dtype == np.float32
+    assert embeddings.shape == (3, 2)
+    np.testing.assert_allclose(embeddings[:, 0], [3.0, 1.0, 2.0])
+    padded_batches = [call.args[0]["input_ids"] for call in mock_tokenizer.pad.call_args_list]
+    assert padded_batches == [[[1], [2, 2]], [[3, 3, 3]]]
+
+
+@patch('backend.services.queryService._embed_batches')
+@patch('backend.services.queryService.embedding_cache')
+def test_generate_embeddings_only_embeds_uncached_unique_texts(mock_embedding_cache, mock_embed_batches):
+    texts = ["boilerplate", "cached", "boilerplate", "fresh"]
+    mock_embedding_cache.get_many.return_value = [None, np.array([9.0, 9.0], dtype=np.float32), None, None]
+    mock_embed_batches.return_value = np.array([[1.0, 1.0], [2.0, 2.0]], dtype=np.float32)
+
+    embeddings = generate_embeddings(texts)
+
+    mock_embed_batches.assert_called_once_with(["boilerplate", "fresh"], 32, on_batch=None, priority="ingestion",
+                                               input_ids=None)
+    # Ingestion chunks are not written to (or looked up in) the shared cache table
+    mock_embedding_cache.get_many.assert_called_once_with(texts, shared=False)
+    mock_embedding_cache.put_many.assert_called_once()
+    assert mock_embedding_cache.put_many.call_args.kwargs == {"shared": False}
+    np.testing.assert_allclose(embeddings, [[1.0, 1.0], [9.0, 9.0], [1.0, 1.0], [2.0, 2.0]])
+
+
+def test_generate_embeddings_empty_input():
+    assert generate_embeddings([]).shape == (0, 0)
+
+
+@patch('backend.services.queryService.generate_embeddings')
+@patch('backend.services.queryService.create_db_and_table')
+@patch('backend.services.queryService.page_extractor')
+@patch('backend.services.queryService.find_indexed_document', return_value=None)
+def test_process_pdf_chunks_not_enough_words(mock_find_indexed_document, mock_page_extractor, mock_create_db_and_table,
+                                             mock_generate_embeddings):
     pdf_path = '/path/to/test.pdf'
     minio_file_name = 'test.pdf'
 
-    mock_doc = MagicMock()
-    mock_page = MagicMock()
-    mock_page.get_text.return_value = "Word " * 50
-    mock_doc.__iter__.return_value = [mock_page]
-    mock_fitz_open.return_value = mock_doc
+    mock_page_extractor.iter_pages.return_value = iter(["Word " * 50])
 
-    with patch('os.remove') as mock_os_remove:
+    with patch('os.remove') as mock_os_remove, \
+            patch('backend.services.queryService._content_fingerprint', return_value=("ab" * 32, 2048)):
         with pytest.raises(ValueError) as exc_info:
             process_pdf_chunks(pdf_path, minio_file_name)
 
     assert f"PDF {minio_file_name} does not contain enough words to create a chunk." in str(exc_info.value)
     mock_os_remove.assert_called_with(pdf_path)
 
-@patch('backend.services.queryService.generate_embedding')
+@patch('backend.services.queryService.document_ingest_lock')
+@patch('backend.services.queryService.iter_chunks', return_value=[Chunk("Word " * 100, [0, 11, 2], 1, 1)] * 3)
+@patch('backend.services.queryService.model_manager')
+@patch('backend.services.queryService.discard_document_partition')
+@patch('backend.services.queryService.copy_chunk_batches', side_effect=Exception("COPY failed"))
+@patch('backend.services.queryService._content_fingerprint', return_value=("ab" * 32, 2048))
+@patch('backend.services.queryService.register_document', return_value=1)
+@patch('backend.services.queryService.publish_document_partition')
+@patch('backend.services.queryService.ensure_vector_index')
+@patch('backend.services.queryService.stage_document_partition')
+@patch('backend.services.queryService.generate_embeddings')
 @patch('backend.services.queryService.create_db_and_table')
-@patch('backend.services.queryService.fitz.open')
-def test_process_pdf_chunks_chunk_exception(mock_fitz_open, mock_create_db_and_table, mock_generate_embedding):
+@patch('backend.services.queryService.page_extractor')
+@patch('backend.services.queryService.lock_published_chunks', return_value=(None, {}))
+@patch('backend.services.queryService.find_indexed_document', return_value=None)
+def test_process_pdf_chunks_copy_failure_discards_staged_partition(
+        mock_find_indexed_document, mock_lock_published_chunks, mock_page_extractor, mock_create_db_and_table,
+        mock_generate_embeddings, mock_stage_document_partition, mock_ensure_vector_index, mock_publish_document_partition, mock_register_document, mock_content_fingerprint,
+        mock_copy_chunk_batches, mock_discard_document_partition, mock_model_manager, mock_iter_chunks,
+        mock_document_ingest_lock):
     pdf_path = '/path/to/test.pdf'
     minio_file_name = 'test.pdf'
-    batch_size = 2
-
-    mock_doc = MagicMock()
-    mock_page = MagicMock()
-    mock_page.get_text.return_value = "Word " * 200
-    mock_doc.__iter__.return_value = [mock_page]
-    mock_fitz_open.return_value = mock_doc
 
-    def side_effect(*args, **kwargs):
-        if mock_generate_embedding.call_count == 2:
-            raise Exception("Embedding generation error")
-        return [0.1, 0.2, 0.3]
+    mock_page_extractor.iter_pages.return_value = iter(["Word " * 300])
 
-    mock_generate_embedding.side_effect = side_effect
+    mock_generate_embeddings.return_value = np.full((3, 3), 0.1, dtype=np.float32)
+    mock_stage_document_partition.return_value = "tb_embeddings_doc_1_0a1b2c3d"
 
     mock_session = MagicMock()
     mock_create_db_and_table.return_value = mock_session
-    mock_session.query.return_value.scalar.return_value = 1
 
-    with patch('os.remove') as mock_os_remove:
-        process_pdf_chunks(pdf_path, minio_file_name, batch_size)
+    with patch('os.remove'), pytest.raises(Exception, match="COPY failed"):
+        process_pdf_chunks(pdf_path, minio_file_name)
 
-    assert mock_generate_embedding.call_count >= 2
-    mock_session.bulk_save_objects.assert_called()
-    mock_session.commit.assert_called()
+    # The whole document is one transaction: nothing is published, the staged table is dropped
+    mock_publish_document_partition.assert_not_called()
+    mock_discard_document_partition.assert_called_once_with(mock_session, 1, "tb_embeddings_doc_1_0a1b2c3d")
+    mock_document_ingest_lock.return_value.__exit__.assert_called_once()
     mock_session.close.assert_called()
-    mock_os_remove.assert_called_with(pdf_path)
-
-@patch('backend.services.queryService.generate_embedding')
+    mock_ensure_vector_index.assert_not_called()
+
+@patch('backend.services.queryService.document_ingest_lock')
+@patch('backend.services.queryService.ensure_vector_index')
+@patch('backend.services.queryService.publish_document_partition')
+@patch('backend.services.queryService.copy_document_chunks', return_value=42)
+@patch('backend.services.queryService.stage_document_partition', return_value="tb_embeddings_doc_7_0a1b2c3d")
+@patch('backend.services.queryService.register_document', return_value=7)
+@patch('backend.services.queryService.generate_embeddings')
+@patch('backend.services.queryService.page_extractor')
 @patch('backend.services.queryService.create_db_and_table')
-def test_get_related_chunks_success(mock_create_db_and_table, mock_generate_embedding):
-    question = "What is the capital of France?"
-    mock_embedding = [0.1, 0.2, 0.3]
-    mock_generate_embedding.return_value = mock_embedding
-
+@patch('backend.services.queryService.find_indexed_document')
+def test_process_pdf_chunks_reuses_indexed_content(
+        mock_find_indexed_document, mock_create_db_and_table, mock_page_extractor, mock_generate_embeddings,
+        mock_register_document, mock_stage_document_partition, mock_copy_document_chunks,
+        mock_publish_document_partition, mock_ensure_vector_index, mock_document_ingest_lock):
+    """
+    This test controls that a PDF already indexed under another name is copied server-side instead of re-embedded.
+    Returns: Success/Fail statement
+
+    """
+    pdf_bytes = b'%PDF-1.4 test pdf content'
+    content_hash = hashlib.sha256(pdf_bytes).hexdigest()
     mock_session = MagicMock()
     mock_create_db_and_table.return_value = mock_session
-    mock_session.query.return_value.scalar.return_value = 1
+    mock_find_indexed_document.return_value = MagicMock(id=3, filename="original.pdf")
+    progress = IngestionProgress()
+
+    document_id = process_pdf_chunks(pdf_bytes, "copy.pdf", progress=progress, content_hash=content_hash)
+
+    assert document_id == 7
+    mock_find_indexed_document.assert_called_once_with(mock_session, content_hash, EMBEDDING_MODEL_ID, "copy.pdf")
+    mock_page_extractor.iter_pages.assert_not_called()
+    mock_generate_embeddings.assert_not_called()
+    mock_register_document.assert_called_once_with(mock_session, "copy.pdf", content_hash, len(pdf_bytes))
+    mock_copy_document_chunks.assert_called_once_with(
+        mock_session, "original.pdf", "tb_embeddings_doc_7_0a1b2c3d", 7, "copy.pdf"
+    )
+    mock_publish_document_partition.assert_called_once_with(
+        mock_session, 7, "copy.pdf", "tb_embeddings_doc_7_0a1b2c3d", 42, EMBEDDING_MODEL_ID
+    )
+    assert progress.to_dict()["deduplicated_from"] == "original.pdf"
+    assert progress.chunks_stored == 42
+    mock_session.close.assert_called()
 
-    mock_query = mock_session.query.return_value.filter.return_value.order_by.return_value.limit.return_value
-    mock_query.all.return_value = [MagicMock(chunk_text="Paris is the capital of France.")]
 
+@patch('backend.services.queryService.ensure_vector_index')
+@patch('backend.services.queryService.register_document')
+@patch('backend.services.queryService.page_extractor')
+@patch('backend.services.queryService.create_db_and_table')
+@patch('backend.services.queryService.find_indexed_document')
+def test_process_pdf_chunks_skips_same_content_same_name(mock_find_indexed_document, mock_create_db_and_table,
+                                                         mock_page_extractor, mock_register_document,
+                                                         mock_ensure_vector_index):
+    """
+    This test controls that re-submitting an indexed PDF under its own name keeps the existing document.
+    Returns: Success/Fail statement
+
+    """
+    mock_find_indexed_document.return_value = MagicMock(id=3, filename="original.pdf")
+
+    document_id = process_pdf_chunks(b'%PDF-1.4 test pdf content', "original.pdf")
+
+    assert document_id == 3
+    mock_page_extractor.iter_pages.assert_not_called()
+    mock_register_document.assert_not_called()
+
+
+@patch('backend.services.queryService.ensure_vector_index')
+@patch('backend.services.queryService.discard_document_partition')
+@patch('backend.services.queryService.stage_document_partition')
+@patch('backend.services.queryService.apply_chunk_update')
+@patch('backend.services.queryService.copy_chunk_batches')
+@patch('backend.services.queryService.register_document', return_value=5)
+@patch('backend.services.queryService.iter_chunks')
+@patch('backend.services.queryService.model_manager')
+@patch('backend.services.queryService.generate_embeddings')
+@patch('backend.services.queryService.page_extractor')
+@patch('backend.services.queryService.create_db_and_table')
+@patch('backend.services.queryService.lock_published_chunks')
+@patch('backend.services.queryService.find_indexed_document', return_value=None)
+def test_process_pdf_chunks_updates_published_document_in_place(
+        mock_find_indexed_document, mock_lock_published_chunks, mock_create_db_and_table, mock_page_extractor,
+        mock_generate_embeddings, mock_model_manager, mock_iter_chunks, mock_register_document,
+        mock_copy_chunk_batches, mock_apply_chunk_update, mock_stage_document_partition,
+        mock_discard_document_partition, mock_ensure_vector_index):
+    """
+    This test controls that a revised document only embeds new chunks, keeps unchanged rows and deletes removed ones.
+    Returns: Success/Fail statement
+
+    """
+    mock_session = MagicMock()
+    mock_create_db_and_table.return_value = mock_session
+    mock_page_extractor.iter_pages.return_value = iter(["Word " * 200])
+    unchanged_a = Chunk("clause a", [0, 1, 2], 1, 1)
+    revised = Chunk("clause b, revised", [0, 9, 2], 1, 2)
+    unchanged_c = Chunk("clause c", [0, 3, 2], 2, 2)
+    mock_iter_chunks.return_value = [unchanged_a, revised, unchanged_c]
+    # Stored rows of the published version: a, the old b and c
+    mock_lock_published_chunks.return_value = ("tb_embeddings_doc_5_0a1b2c3d", {
+        chunk_text_hash("clause a"): [10], chunk_text_hash("clause b"): [11], chunk_text_hash("clause c"): [12],
+    })
+    mock_generate_embeddings.return_value = np.full((1, 3), 0.1, dtype=np.float32)
+    copied = []
+
+    def copy_batches(session, table_name, document_id, filename, batches, flush_rows, on_flush):
+        copied.extend(batches)
+        return sum(len(batch[0]) for batch in copied)
+
+    mock_copy_chunk_batches.side_effect = copy_batches
+    progress = IngestionProgress()
+
+    with patch('os.remove'), \
+            patch('backend.services.queryService._content_fingerprint', return_value=("cd" * 32, 4096)):
+        document_id = process_pdf_chunks('/path/to/contract.pdf', 'contract.pdf', progress=progress, incremental=True)
+
+    assert document_id == 5
+    # Only the revised chunk is embedded and copied into the published partition, under its new index
+    mock_generate_embeddings.assert_called_once()
+    assert mock_generate_embeddings.call_args.args[0] == ["clause b, revised"]
+    assert mock_copy_chunk_batches.call_args.args[1] == "tb_embeddings_doc_5_0a1b2c3d"
+    assert len(copied) == 1 and copied[0][0] == [revised] and copied[0][2] == [1]
+    mock_stage_document_partition.assert_not_called()
+    mock_apply_chunk_update.assert_called_once_with(
+        mock_session, 5, "tb_embeddings_doc_5_0a1b2c3d", [(10, 0, 1, 1), (12, 2, 2, 2)], {11}, 3
+    )
+    mock_discard_document_partition.assert_not_called()
+    assert progress.chunks_reused == 2
+    assert progress.chunks_stored == 2
+
+
+@patch('backend.services.queryService.vectorStoreService')
+@patch('backend.services.queryService.generate_embedding')
+def test_get_related_chunks_async_searches_latest_document(mock_generate_embedding, mock_vector_store):
+    question = "What is the capital of France?"
+    mock_generate_embedding.return_value = [0.1, 0.2, 0.3]
+    mock_vector_store.get_document = AsyncMock(return_value=MagicMock(filename="latest.pdf"))
+    mock_vector_store.search_chunks = AsyncMock(return_value=["Paris is the capital of France."])
+    mock_session = AsyncMock()
 
-    related_chunks = get_related_chunks(question)
+    related_chunks = asyncio.run(get_related_chunks_async(question, mock_session))
 
     mock_generate_embedding.assert_called_with(question)
+    mock_vector_store.get_document.assert_awaited_once_with(mock_session, None)
+    mock_vector_store.search_chunks.assert_awaited_once_with(mock_session, [0.1, 0.2, 0.3], filename="latest.pdf")
     assert related_chunks == ["Paris is the capital of France."]
-    mock_session.close.assert_called()
 
+@patch('backend.services.queryService.vectorStoreService')
 @patch('backend.services.queryService.generate_embedding')
-@patch('backend.services.queryService.create_db_and_table')
-def test_get_related_chunks_exception(mock_create_db_and_table, mock_generate_embedding):
-    question = "What is the capital of France?"
+def test_get_related_chunks_async_exception(mock_generate_embedding, mock_vector_store):
     mock_generate_embedding.side_effect = Exception("Embedding error")
 
     with pytest.raises(Exception) as exc_info:
-        get_related_chunks(question)
+        asyncio.run(get_related_chunks_async("What is the capital of France?", AsyncMock()))
 
     assert "Embedding error" in str(exc_info.value)
 
+@patch('backend.services.queryService.query_result_cache')
+@patch('backend.services.queryService.vectorStoreService')
 @patch('backend.services.queryService.generate_embedding')
-@patch('backend.services.queryService.create_db_and_table')
-def test_get_related_chunks_by_filename_success(mock_create_db_and_table, mock_generate_embedding):
-    query = "What is the capital of France?"
-    filename = "test.pdf"
-    mock_embedding = [0.1, 0.2, 0.3]
-    mock_generate_embedding.return_value = mock_embedding
+def test_get_related_chunks_by_filename_async_cache_hit(mock_generate_embedding, mock_vector_store,
+                                                        mock_query_result_cache):
+    mock_query_result_cache.get.return_value = ["Paris is the capital of France."]
+    mock_vector_store.file_exists = AsyncMock()
 
-    mock_session = MagicMock()
-    mock_create_db_and_table.return_value = mock_session
-
-    mock_session.query.return_value.filter.return_value.first.return_value = True
+    related_chunks = asyncio.run(get_related_chunks_by_filename_async("What is the capital of France?", "test.pdf",
+                                                                      AsyncMock()))
 
+    assert related_chunks == ["Paris is the capital of France."]
+    mock_generate_embedding.assert_not_called()
+    mock_vector_store.file_exists.assert_not_awaited()
 
-    mock_query = mock_session.query.return_value.filter.return_value.order_by.return_value.limit.return_value
-    mock_query.all.return_value = [MagicMock(chunk_text="Paris is the capital of France.")]
+@patch('backend.services.queryService.query_result_cache')
+@patch('backend.services.queryService.vectorStoreService')
+@patch('backend.services.queryService.generate_embedding')
+def test_get_related_chunks_by_filename_async_success(mock_generate_embedding, mock_vector_store,
+                                                      mock_query_result_cache):
+    query = "What is the capital of France?"
+    filename = "test.pdf"
+    mock_generate_embedding.return_value = [0.1, 0.2, 0.3]
+    mock_query_result_cache.get.return_value = None
+    mock_query_result_cache.version.return_value = 0
+    mock_vector_store.file_exists = AsyncMock(return_value=True)
+    mock_vector_store.search_chunks = AsyncMock(return_value=["Paris is the capital of France."])
+    mock_session = AsyncMock()
 
+    related_chunks = asyncio.run(get_related_chunks_by_filename_async(query, filename, mock_session))
 
-    related_chunks = get_related_chunks_by_filename(query, filename)
+    assert related_chunks == ["Paris is the capital of France."]
+    mock_generate_embedding.assert_called_once_with(query)
+    mock_vector_store.search_chunks.assert_awaited_once_with(mock_session, [0.1, 0.2, 0.3], filename=filename,
+                                                             ef_search=None, probes=None)
+    mock_query_result_cache.put.assert_called_once_with(filename, query, related_chunks, version=0, mode="vector")
+
+@patch('backend.services.queryService.local_vector_cache')
+@patch('backend.services.queryService.query_result_cache')
+@patch('backend.services.queryService.vectorStoreService')
+@patch('backend.services.queryService.generate_embedding')
+def test_get_related_chunks_by_filename_async_served_by_local_vector_cache(mock_generate_embedding, mock_vector_store,
+                                                                           mock_query_result_cache,
+                                                                           mock_local_vector_cache):
+    query = "What is the capital of France?"
+    filename = "test.pdf"
+    mock_generate_embedding.return_value = [0.1, 0.2, 0.3]
+    mock_query_result_cache.get.return_value = None
+    mock_query_result_cache.version.return_value = 2
+    mock_local_vector_cache.enabled = True
+    mock_local_vector_cache.search.return_value = ["Paris is the capital of France."]
+    mock_vector_store.file_exists = AsyncMock()
+    mock_vector_store.search_chunks = AsyncMock()
 
+    related_chunks = asyncio.run(get_related_chunks_by_filename_async(query, filename, AsyncMock()))
 
-    mock_generate_embedding.assert_called_with(query)
     assert related_chunks == ["Paris is the capital of France."]
-    mock_session.close.assert_called()
+    mock_local_vector_cache.search.assert_called_once_with(filename, [0.1, 0.2, 0.3])
+    mock_vector_store.file_exists.assert_not_awaited()
+    mock_vector_store.search_chunks.assert_not_awaited()
+    mock_query_result_cache.put.assert_called_once_with(filename, query, related_chunks, version=2, mode="vector")
 
+@patch('backend.services.queryService.query_result_cache')
+@patch('backend.services.queryService.vectorStoreService')
 @patch('backend.services.queryService.generate_embedding')
-@patch('backend.services.queryService.create_db_and_table')
-def test_get_related_chunks_by_filename_not_found(mock_create_db_and_table, mock_generate_embedding):
+def test_get_related_chunks_by_filename_async_keyword_mode_skips_the_model(mock_generate_embedding, mock_vector_store,
+                                                                           mock_query_result_cache):
+    query = "termination notice"
+    filename = "test.pdf"
+    mock_query_result_cache.get.return_value = None
+    mock_query_result_cache.version.return_value = 1
+    mock_vector_store.file_exists = AsyncMock(return_value=True)
+    mock_vector_store.search_chunks = AsyncMock()
+    mock_vector_store.search_chunks_hybrid = AsyncMock(return_value=["Either party may terminate."])
+    mock_session = AsyncMock()
+
+    related_chunks = asyncio.run(get_related_chunks_by_filename_async(query, filename, mock_session, mode="keyword"))
+
+    assert related_chunks == ["Either party may terminate."]
+    mock_generate_embedding.assert_not_called()
+    mock_vector_store.search_chunks.assert_not_awaited()
+    mock_vector_store.search_chunks_hybrid.assert_awaited_once_with(mock_session, query, None, filename=filename,
+                                                                    ef_search=None, probes=None)
+    mock_query_result_cache.get.assert_called_once_with(filename, query, "keyword")
+    mock_query_result_cache.put.assert_called_once_with(filename, query, related_chunks, version=1, mode="keyword")
+
+@patch('backend.services.queryService.query_result_cache')
+@patch('backend.services.queryService.vectorStoreService')
+@patch('backend.services.queryService.generate_embedding')
+def test_get_related_chunks_by_filename_async_hybrid_mode_passes_text_and_embedding(mock_generate_embedding,
+                                                                                    mock_vector_store,
+                                                                                    mock_query_result_cache):
+    query = "termination notice"
+    filename = "test.pdf"
+    mock_generate_embedding.return_value = [0.1, 0.2, 0.3]
+    mock_query_result_cache.get.return_value = None
+    mock_query_result_cache.version.return_value = 0
+    mock_vector_store.file_exists = AsyncMock(return_value=True)
+    mock_vector_store.search_chunks_hybrid = AsyncMock(return_value=["Either party may terminate."])
+    mock_session = AsyncMock()
 
-    query = "What is the capital of France?"
-    filename = "nonexistent.pdf"
-    mock_embedding = [0.1, 0.2, 0.3]
-    mock_generate_embedding.return_value = mock_embedding
+    asyncio.run(get_related_chunks_by_filename_async(query, filename, mock_session, mode="hybrid"))
 
+    mock_generate_embedding.assert_called_once_with(query)
+    mock_vector_store.search_chunks_hybrid.assert_awaited_once_with(mock_session, query, [0.1, 0.2, 0.3],
+                                                                    filename=filename, ef_search=None, probes=None)
 
-    mock_session = MagicMock()
-    mock_create_db_and_table.return_value = mock_session
-
+@patch('backend.services.queryService.query_result_cache')
+@patch('backend.services.queryService.vectorStoreService')
+@patch('backend.services.queryService.generate_embedding')
+def test_get_related_chunks_by_filename_async_not_found(mock_generate_embedding, mock_vector_store,
+                                                        mock_query_result_cache):
+    filename = "nonexistent.pdf"
+    mock_generate_embedding.return_value = [0.1, 0.2, 0.3]
+    mock_query_result_cache.get.return_value = None
+    mock_vector_store.file_exists = AsyncMock(return_value=False)
+    mock_vector_store.search_chunks = AsyncMock()
 
-    mock_session.query.return_value.filter.return_value.first.return_value = None
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(get_related_chunks_by_filename_async("question", filename, AsyncMock()))
 
+    assert exc_info.value.status_code == 404
+    mock_vector_store.search_chunks.assert_not_awaited()
+
+@patch('backend.services.queryService.query_result_cache')
+@patch('backend.services.queryService.vectorStoreService')
+@patch('backend.services.queryService.generate_embeddings')
+def test_get_related_chunks_for_questions_async_embeds_only_uncached(mock_generate_embeddings, mock_vector_store,
+                                                                     mock_query_result_cache):
+    queries = ["pricing?", "termination?", "renewal?"]
+    filename = "test.pdf"
+    mock_query_result_cache.version.return_value = 3
+    mock_query_result_cache.get.side_effect = [None, ["cached chunk"], None]
+    mock_generate_embeddings.return_value = np.zeros((2, 3), dtype=np.float32)
+    mock_vector_store.search_chunks_batch = AsyncMock(return_value=[["price chunk"], ["renewal chunk"]])
+    mock_session = AsyncMock()
+
+    results = asyncio.run(get_related_chunks_for_questions_async(queries, filename, mock_session))
+
+    assert results == [["price chunk"], ["cached chunk"], ["renewal chunk"]]
+    mock_generate_embeddings.assert_called_once_with(["pricing?", "renewal?"], 2, None, "interactive")
+    mock_vector_store.search_chunks_batch.assert_awaited_once()
+    assert mock_query_result_cache.put.call_count == 2
+    mock_query_result_cache.put.assert_any_call(filename, "renewal?", ["renewal chunk"], version=3)
+
+
+@patch('backend.services.queryService.query_result_cache')
+@patch('backend.services.queryService.vectorStoreService')
+@patch('backend.services.queryService.generate_embeddings')
+def test_get_related_chunks_for_questions_async_not_found(mock_generate_embeddings, mock_vector_store,
+                                                          mock_query_result_cache):
+    mock_query_result_cache.get.return_value = None
+    mock_generate_embeddings.return_value = np.zeros((2, 3), dtype=np.float32)
+    mock_vector_store.search_chunks_batch = AsyncMock(return_value=[[], []])
 
     with pytest.raises(HTTPException) as exc_info:
-        get_related_chunks_by_filename(query, filename)
+        asyncio.run(get_related_chunks_for_questions_async(["a?", "b?"], "nonexistent.pdf", AsyncMock()))
 
     assert exc_info.value.status_code == 404
-    assert f"No records found for filename: {filename}" in exc_info.value.detail
-    mock_session.close.assert_called()
+    mock_query_result_cache.put.assert_not_called()
+
+
+@patch('backend.services.queryService.vectorStoreService')
+@patch('backend.services.queryService.generate_embedding')
+def test_search_documents_async_global_and_per_document(mock_generate_embedding, mock_vector_store):
+    mock_generate_embedding.return_value = [0.1, 0.2, 0.3]
+    candidates = [
+        {"filename": "a.pdf", "chunk_index": 1, "chunk_text": "a1", "score": 0.1},
+        {"filename": "a.pdf", "chunk_index": 7, "chunk_text": "a7", "score": 0.2},
+        {"filename": "b.pdf", "chunk_index": 3, "chunk_text": "b3", "score": 0.3},
+        {"filename": "a.pdf", "chunk_index": 2, "chunk_text": "a2", "score": 0.4},
+    ]
+    mock_vector_store.search_corpus = AsyncMock(return_value=candidates)
+    mock_session = AsyncMock()
+
+    results = asyncio.run(search_documents_async("termination?", mock_session, filenames=["a.pdf", "b.pdf"],
+                                                 top_k=3, per_document_k=1))
+
+    mock_generate_embedding.assert_called_once_with("termination?")
+    mock_vector_store.search_corpus.assert_awaited_once_with(
+        mock_session, [0.1, 0.2, 0.3], ["a.pdf", "b.pdf"], None, per_document_limit=3, ef_search=None, probes=None)
+    assert [hit["chunk_text"] for hit in results["hits"]] == ["a1", "a7", "b3"]
+    assert {name: [hit["chunk_text"] for hit in hits] for name, hits in results["documents"].items()} == {
+        "a.pdf": ["a1"], "b.pdf": ["b3"]}
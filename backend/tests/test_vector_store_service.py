@@ -0,0 +1,205 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.dialects import postgresql
+
+from backend.services.vectorStoreService import (
+    search_chunks, search_chunks_batch, search_chunks_hybrid, search_corpus, file_exists, delete_records, get_document
+)
+
+
+def compiled_sql(mock_session):
+    statement = mock_session.execute.await_args.args[0]
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def test_search_chunks_scoped_to_filename():
+    """
+    This test controls the async similarity search statement and its result mapping.
+    Returns: Success/Fail statement
+
+    """
+    mock_session = AsyncMock()
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = ["chunk 1", "chunk 2"]
+    mock_session.execute.return_value = mock_result
+
+    chunks = asyncio.run(search_chunks(mock_session, [0.1, 0.2, 0.3], filename="test.pdf", limit=2))
+
+    sql = compiled_sql(mock_session)
+    assert chunks == ["chunk 1", "chunk 2"]
+    assert "tb_embeddings.filename = " in sql
+    # Cosine is the configured metric, so the search must use the operator idx_embedding is built for
+    assert "<=>" in sql
+    assert "LIMIT" in sql
+
+
+
+def test_search_chunks_hybrid_without_embedding_runs_full_text_only():
+    """
+    This test controls that a hybrid search without a query vector is a single full-text query.
+    Returns: Success/Fail statement
+
+    """
+    mock_session = AsyncMock()
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = ["Either party may terminate."]
+    mock_session.execute.return_value = mock_result
+
+    chunks = asyncio.run(search_chunks_hybrid(mock_session, "termination notice", filename="test.pdf"))
+
+    sql = compiled_sql(mock_session)
+    assert chunks == ["Either party may terminate."]
+    mock_session.execute.assert_awaited_once()
+    assert "websearch_to_tsquery" in sql
+    assert "tb_embeddings.filename = " in sql
+    assert "<=>" not in sql
+
+def test_file_exists_and_delete_records():
+    """
+    This test controls the catalog existence check and that deleting drops the document's partition and catalog row.
+    Returns: Success/Fail statement
+
+    """
+    mock_session = AsyncMock()
+    mock_session.execute.return_value = MagicMock(first=MagicMock(return_value=None))
+    assert asyncio.run(file_exists(mock_session, "missing.pdf")) is False
+    assert "tb_documents.partition_name IS NOT NULL" in compiled_sql(mock_session)
+
+    mock_session = AsyncMock()
+    document = MagicMock(id=7, chunk_count=4, partition_name="tb_embeddings_doc_7_0a1b2c3d")
+    mock_session.execute.return_value = MagicMock(
+        scalars=MagicMock(return_value=MagicMock(first=MagicMock(return_value=document)))
+    )
+    mock_connection = AsyncMock()
+    mock_connection.execute.return_value = MagicMock(scalar=MagicMock(return_value=False))
+    mock_session.connection.return_value = mock_connection
+
+    assert asyncio.run(delete_records(mock_session, "test.pdf")) == 4
+    assert mock_session.commit.await_count == 3
+
+    statements = [str(call.args[0]) for call in mock_session.execute.await_args_list]
+    assert "FOR UPDATE" in statements[0]
+    # Marked deleting and committed before the partition is touched, so it leaves search first
+    assert statements[1].startswith("UPDATE tb_documents SET status")
+    assert statements[2].startswith("DELETE FROM tb_documents")
+    # The partition is detached concurrently outside a transaction, then dropped
+    mock_session.connection.assert_awaited_once_with(execution_options={"isolation_level": "AUTOCOMMIT"})
+    ddl = [str(call.args[0]) for call in mock_connection.execute.await_args_list]
+    assert ddl[1:] == [
+        "ALTER TABLE tb_embeddings DETACH PARTITION tb_embeddings_doc_7_0a1b2c3d CONCURRENTLY",
+        "DROP TABLE IF EXISTS tb_embeddings_doc_7_0a1b2c3d",
+    ]
+
+
+def test_get_document_defaults_to_latest_ingested():
+    """
+    This test controls that the default document is the most recently published one rather than max(pdf_id).
+    Returns: Success/Fail statement
+
+    """
+    mock_session = AsyncMock()
+    mock_session.execute.return_value = MagicMock()
+    asyncio.run(get_document(mock_session))
+    sql = compiled_sql(mock_session)
+    assert "ORDER BY tb_documents.ingest_finished_at DESC" in sql
+    assert "max(" not in sql
+
+    asyncio.run(get_document(mock_session, 3))
+    assert "tb_documents.id = " in compiled_sql(mock_session)
+
+
+def test_search_chunks_batch_uses_one_lateral_query():
+    """
+    This test controls the multi-question search: one statement, results grouped per question in input order.
+    Returns: Success/Fail statement
+
+    """
+    mock_session = AsyncMock()
+    mock_session.execute.return_value = [
+        MagicMock(position=1, chunk_text="chunk a1"),
+        MagicMock(position=1, chunk_text="chunk a2"),
+        MagicMock(position=2, chunk_text="chunk b1"),
+    ]
+
+    chunks = asyncio.run(search_chunks_batch(mock_session, [[0.1, 0.2], [0.3, 0.4], [0.5, 0.6]], "test.pdf", limit=2))
+
+    sql = compiled_sql(mock_session)
+    mock_session.execute.assert_awaited_once()
+    assert chunks == [["chunk a1", "chunk a2"], ["chunk b1"], []]
+    assert "unnest" in sql and "WITH ORDINALITY" in sql
+    assert "JOIN LATERAL" in sql
+    assert "tb_embeddings.filename = " in sql
+
+
+def test_search_corpus_global_top_k_over_prefix():
+    """
+    This test controls the corpus search scoped to a filename prefix, returning filename, chunk_index and score.
+    Returns: Success/Fail statement
+
+    """
+    mock_session = AsyncMock()
+    matching = MagicMock()
+    matching.scalars.return_value.all.return_value = ["contracts/a.pdf"]
+    mock_session.execute.side_effect = [
+        matching,
+        [MagicMock(filename="contracts/a.pdf", chunk_index=4, chunk_text="chunk", page_start=2, page_end=3, score=0.25)],
+    ]
+
+    hits = asyncio.run(search_corpus(mock_session, [0.1, 0.2], prefix="contracts/", limit=3))
+
+    catalog_sql, search_sql = [
+        str(call.args[0].compile(dialect=postgresql.dialect())) for call in mock_session.execute.await_args_list
+    ]
+    assert hits == [{"filename": "contracts/a.pdf", "chunk_index": 4, "chunk_text": "chunk",
+                     "page_start": 2, "page_end": 3, "score": 0.25}]
+    # The prefix is resolved on the catalog, the search itself filters on concrete filenames
+    assert "tb_documents.filename LIKE" in catalog_sql
+    assert "tb_embeddings.filename IN" in search_sql
+    assert "LATERAL" not in search_sql
+
+    mock_session.execute.side_effect = None
+    mock_session.execute.reset_mock()
+    mock_session.execute.return_value = matching
+    matching.scalars.return_value.all.return_value = []
+    assert asyncio.run(search_corpus(mock_session, [0.1, 0.2], prefix="missing/")) == []
+    mock_session.execute.assert_awaited_once()
+
+
+def test_search_corpus_per_document_uses_lateral_join():
+    """
+    This test controls the per-document top-k variant over a list of filenames.
+    Returns: Success/Fail statement
+
+    """
+    mock_session = AsyncMock()
+    mock_session.execute.return_value = []
+
+    asyncio.run(search_corpus(mock_session, [0.1, 0.2], filenames=["a.pdf", "b.pdf"], per_document_limit=2))
+
+    sql = compiled_sql(mock_session)
+    mock_session.execute.assert_awaited_once()
+    assert "FROM tb_documents" in sql
+    assert "JOIN LATERAL" in sql
+    assert "tb_documents.filename IN" in sql
+
+
+def test_search_params_override_ann_knobs_per_transaction():
+    """
+    This test controls the per-request ef_search/probes override and that ef_search is never below the limit.
+    Returns: Success/Fail statement
+
+    """
+    mock_session = AsyncMock()
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = []
+    mock_session.execute.return_value = mock_result
+
+    asyncio.run(search_chunks(mock_session, [0.1, 0.2], filename="test.pdf", limit=20, ef_search=10, probes=4))
+
+    set_config = mock_session.execute.await_args_list[0].args[0].compile(dialect=postgresql.dialect())
+    assert "set_config" in str(set_config)
+    assert set(set_config.params.values()) >= {"hnsw.ef_search", "20", "ivfflat.probes", "4"}
+
+    mock_session.execute.reset_mock()
+    asyncio.run(search_chunks(mock_session, [0.1, 0.2], filename="test.pdf"))
+    mock_session.execute.assert_awaited_once()